@@ -0,0 +1,44 @@
+# analytics.py
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional, Sequence
+
+from database import SENSOR_NAMES, SeriesRow
+
+
+@dataclass
+class SensorStats:
+    count: int = 0
+    mean: float = 0.0
+    m2: float = 0.0                 # sum of squared deviations (Welford)
+    min: Optional[float] = None
+    max: Optional[float] = None
+
+    def add(self, v: float) -> None:
+        self.count += 1
+        d = v - self.mean
+        self.mean += d / self.count
+        self.m2 += d * (v - self.mean)
+        self.min = v if self.min is None or v < self.min else self.min
+        self.max = v if self.max is None or v > self.max else self.max
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else 0.0
+
+
+def summarize(rows: Iterable[SeriesRow], sensors: Sequence[str] = SENSOR_NAMES) -> Dict[str, SensorStats]:
+    """
+    One pass over (ts, temp, humidity, light, rain, soil) rows, in constant memory:
+    feed it db.iter_range(...) rather than a fetched list.
+    """
+    idx = [(s, SENSOR_NAMES.index(s) + 1) for s in sensors]
+    out = {s: SensorStats() for s in sensors}
+    for row in rows:
+        for s, i in idx:
+            v = row[i]
+            if v is not None:
+                out[s].add(float(v))
+    return out
@@ -3,12 +3,114 @@
 DB_NAME = "smart_greenhouse.db"
 LOG_FILE = "greenhouse.log"
 
+# ----------------------------
+# DATABASE
+# ----------------------------
+DB_MAX_READERS = 4               # thread-local reader connections kept open
+DB_CACHED_STATEMENTS = 128       # prepared statements cached per connection
+DB_BUSY_TIMEOUT_SEC = 10.0
+
+# background writer (group commit)
+WRITER_BATCH_ROWS = 500          # commit after N queued items...
+WRITER_FLUSH_MS = 250            # ...or after M ms, whichever comes first
+WRITER_QUEUE_MAX = 10000         # producers block when the queue is full
+
+BULK_CHUNK_ROWS = 5000           # insert_readings_bulk() consumes its input in chunks
+
+# online migration of the old text-keyed 'readings' table into 'series'
+MIGRATION_CHUNK_ROWS = 2000
+MIGRATION_PAUSE_SEC = 0.05       # pause between chunks so live writes get the lock
+
+# rollup tiers (bucket width in seconds): 1 min / 15 min / 1 h / 1 day
+ROLLUP_TIERS_SEC = (60, 15 * 60, 60 * 60, 24 * 60 * 60)
+GRAPH_MIN_POINTS = 300           # coarsest tier that still gives this many points wins
+ROLLUP_RETAINED_MIN_SEC = 60 * 60   # past the retention horizon only tiers this coarse are kept
+
+# newest rows kept in memory (ring buffer); 4096 ticks = ~42 sim days at 15 min/tick
+HOT_TIER_ROWS = 4096
+
+# ingest compression: per-sensor (dead-band, swinging-door deviation) in sensor units;
+# only the points needed to redraw the signal within dead-band + deviation are stored,
+# reads interpolate between them. Sensors missing here are stored as-is.
+# Lossy, so opt-in: the raw SQL views show NULL for every sample that was dropped.
+COMPRESSION_ENABLED = False
+COMPRESSION = {
+    "temp": (0.05, 0.1),
+    "humidity": (0.2, 0.5),
+    "light": (2.0, 5.0),
+    "rain": (0.0, 0.05),
+    "soil": (0.1, 0.2),
+}
+COMPRESSION_MAX_GAP_SEC = 6 * 60 * 60   # a point is stored at least this often per sensor
+
+ITER_CHUNK_ROWS = 2000           # rows per query when streaming history (iter_range / export)
+
+# month partitions (series_YYYYMM / reading_YYYYMM) and background housekeeping
+RETENTION_MONTHS = 60            # months of history kept, whole months are dropped (0 = keep all)
+ARCHIVE_AFTER_MONTHS = 3         # older months move to the compressed block archive (0 = never)
+ARCHIVE_BLOCK_POINTS = 1024      # points per archive block (per sensor)
+HOUSEKEEPING_INTERVAL_SEC = 600  # retention + incremental vacuum every N seconds
+VACUUM_STEP_PAGES = 256          # free pages released per incremental_vacuum step
+VACUUM_PAUSE_SEC = 0.05          # pause between steps so live writes get the lock
+
+# online backups (sqlite3 backup API, copied in small steps while the app runs)
+BACKUP_DIR = "backups"
+BACKUP_KEEP = 5                  # rotating snapshots kept
+BACKUP_INTERVAL_SEC = 6 * 60 * 60  # housekeeping takes one when the newest is older (0 = manual only)
+BACKUP_STEP_PAGES = 256          # pages copied per step
+BACKUP_PAUSE_SEC = 0.02          # sleep between steps
+
+# WAL checkpoints from a background thread instead of inside a commit
+CHECKPOINT_ENABLED = True
+WAL_AUTOCHECKPOINT_PAGES = 1000           # SQLite's own checkpoints, used when CHECKPOINT_ENABLED is off
+CHECKPOINT_SAFETY_PAGES = 16384           # ...and only past this (~64 MB) when it is on, as a safety net
+CHECKPOINT_POLL_SEC = 0.2                 # how often the -wal size is checked
+CHECKPOINT_IDLE_SEC = 0.5                 # no write for this long = idle window
+CHECKPOINT_PASSIVE_BYTES = 4 * 1024 * 1024   # PASSIVE checkpoint once the WAL is this big
+CHECKPOINT_TRUNCATE_BYTES = 1024 * 1024      # TRUNCATE in an idle window once the WAL is this big
+CHECKPOINT_BUSY_TIMEOUT_SEC = 0.05        # TRUNCATE gives up after this instead of holding up a write
+
+# greenhouse / zone the single-greenhouse setup (and databases from before zones) belong to
+DEFAULT_GREENHOUSE_NAME = "Greenhouse"
+DEFAULT_ZONE_NAME = "Main"
+
+# ----------------------------
+# LOGGING
+# ----------------------------
+LOG_BUFFERED = True              # log() only queues; a background thread appends in batches
+LOG_QUEUE_MAX = 2000             # lines held in memory before the overflow policy applies
+LOG_OVERFLOW = "coalesce"        # "drop" | "block" | "coalesce" (repeats of a line are counted)
+LOG_FLUSH_MS = 500               # a batch collects for up to this long
+LOG_ROTATE_BYTES = 1024 * 1024   # move the log aside before it grows past this (0 = no size limit)
+LOG_ROTATE_DAY = "wall"          # also start a new segment each day: "" (off) | "wall" | "sim" (simulated clock,
+                                 # opt-in: a sim day passes in minutes, so LOG_KEEP segments hold little history)
+LOG_KEEP = 14                    # rotated segments kept (greenhouse.log.<stamp>.gz), older ones are deleted
+LOG_COMPRESS = True              # gzip rotated segments on a background thread
+LOG_COALESCE_REPEATS = True      # a message identical to the last one of its key is only counted
+LOG_REPEAT_SUMMARY_SEC = 300     # while a streak lasts, write its "(repeated xN ...)" line this often
+LOG_RATE_LIMITS_SEC = {          # per log key: at most one line this often, whatever the message
+    "anomaly": 60.0,
+    "reasons": 60.0,
+}
+LOG_STRUCTURED = True            # also write every line as a typed JSON record (queryable by time / category)
+LOG_EVENTS_FILE = "greenhouse.events.jsonl"
+LOG_EVENTS_INDEX_EVERY = 256     # sparse index: one (time, byte offset) entry per this many records
+
+# ----------------------------
+# HEADLESS (python -m headless)
+# ----------------------------
+HEADLESS_DB_NAME = "smart_greenhouse_sim.db"   # fast-forward runs do not write into the app's database
+HEADLESS_MINUTES_PER_TICK = 15
+HEADLESS_ANOMALY_HOURS = 3.0     # how long an anomaly lasts once set (as in the GUI)
+
 # ----------------------------
 # UI / LOOPS
 # ----------------------------
 AUTO_INSERT_INTERVAL_SEC = 2.0   # simulation tick every N seconds
 UI_FPS = 60                      # smooth UI refresh
 GRAPH_REFRESH_SEC = 1.0          # refresh open graphs ~1/sec
+LOG_VIEW_REFRESH_SEC = 0.25      # the log window appends new lines this often
+LOG_VIEW_MAX_LINES = 1000        # ...and trims the oldest beyond this many
 
 # ----------------------------
 # CONTROL BANDS (targets ± band)
@@ -198,6 +300,7 @@ I18N = {
         "diagnostics": "Диагностика",
         "enable_faults": "Случайни повреди",
         "open_log": "Отвори лог",
+        "backup_now": "Резервно копие",
         "manual": "Ръчни входове",
         "manual_enable": "Ръчни входове (override)",
         "graphs": "Графики",
@@ -207,11 +310,16 @@ I18N = {
         "show_light": "Покажи: Светлина",
         "show_soil": "Покажи: Почва",
         "show_rain": "Покажи: Дъжд",
+        "export_csv": "Експорт CSV",
         "status_title": "Статус на оранжерията",
         "day": "ДЕН ☀️",
         "night": "НОЩ 🌙",
         "no_warnings": "Няма предупреждения.",
         "log_title": "Лог (последни записи)",
+        "log_level": "Ниво:",
+        "log_category": "Категория:",
+        "log_all": "всички",
+        "log_skipped": "пропуснати редове",
     },
     "en": {
         "app_title": "Smart Greenhouse - Course Project",
@@ -235,6 +343,7 @@ I18N = {
         "diagnostics": "Diagnostics",
         "enable_faults": "Random faults",
         "open_log": "Open log",
+        "backup_now": "Backup now",
         "manual": "Manual inputs",
         "manual_enable": "Manual inputs (override)",
         "graphs": "Graphs",
@@ -244,10 +353,15 @@ I18N = {
         "show_light": "Show: Light",
         "show_soil": "Show: Soil",
         "show_rain": "Show: Rain",
+        "export_csv": "Export CSV",
         "status_title": "Greenhouse Status",
         "day": "DAY ☀️",
         "night": "NIGHT 🌙",
         "no_warnings": "No warnings.",
         "log_title": "Log (latest entries)",
+        "log_level": "Level:",
+        "log_category": "Category:",
+        "log_all": "all",
+        "log_skipped": "lines skipped",
     },
 }
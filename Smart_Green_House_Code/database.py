@@ -1,139 +1,1690 @@
 from __future__ import annotations
 
+import heapq
+import os
 import sqlite3
+import threading
+import time
+import weakref
+from bisect import bisect_right
 import datetime as dt
-from typing import Optional, List, Tuple
+from contextlib import contextmanager
+from itertools import islice
+from operator import itemgetter
+from typing import Callable, Dict, Iterable, Iterator, Optional, List, Sequence, Tuple
 
-class DatabaseManager:
+from config import (
+    DB_MAX_READERS, DB_CACHED_STATEMENTS, DB_BUSY_TIMEOUT_SEC, BULK_CHUNK_ROWS,
+    MIGRATION_CHUNK_ROWS, MIGRATION_PAUSE_SEC,
+    ROLLUP_TIERS_SEC, GRAPH_MIN_POINTS, ROLLUP_RETAINED_MIN_SEC,
+    HOT_TIER_ROWS, ITER_CHUNK_ROWS,
+    COMPRESSION_ENABLED, COMPRESSION, COMPRESSION_MAX_GAP_SEC,
+    RETENTION_MONTHS, HOUSEKEEPING_INTERVAL_SEC, VACUUM_STEP_PAGES, VACUUM_PAUSE_SEC,
+    ARCHIVE_AFTER_MONTHS, ARCHIVE_BLOCK_POINTS,
+    BACKUP_DIR, BACKUP_INTERVAL_SEC,
+    CHECKPOINT_ENABLED, CHECKPOINT_PASSIVE_BYTES, CHECKPOINT_SAFETY_PAGES, WAL_AUTOCHECKPOINT_PAGES,
+    DEFAULT_GREENHOUSE_NAME, DEFAULT_ZONE_NAME,
+)
+from db_writer import BackgroundWriter, WriteItem
+from db_backup import BackupJob, snapshots
+from db_checkpoint import CheckpointManager
+from db_compress import SwingingDoor
+from db_hot import HotTier
+from db_partitions import PartitionRouter, reading_table, series_table
+from db_zones import DEFAULT_ZONE_ID
+import db_actuators
+import db_archive
+import db_partitions
+import db_rollups
+import db_zones
+
+try:
+    import numpy as np
+except ImportError:  # optional: only fetch_columns() needs it (matplotlib pulls it in for the GUI)
+    np = None
+
+# (epoch seconds, temp, humidity, light, rain, soil) -- what the write path carries
+ReadingRow = Tuple[int, float, float, float, float, float]
+# (timestamp, temp, humidity, light, rain, soil) -- what fetch_* return
+SeriesRow = Tuple[dt.datetime, float, float, float, float, float]
+# (bucket start, min, max, avg, first, last, count) -- what fetch_bucketed returns
+BucketRow = Tuple[dt.datetime, float, float, float, float, float, int]
+# (zone id, epoch seconds, temp, humidity, light, rain, soil) -- one zone's tick
+ZoneRow = Tuple[int, int, float, float, float, float, float]
+
+# sensor names in 'readings' column order
+SENSOR_NAMES = ("temp", "humidity", "light", "rain", "soil")
+# (name, sensor_type, unit) of the sensors every zone has
+_SENSOR_SPECS = (
+    ("temp", "temperature", "°C"),
+    ("humidity", "humidity", "%"),
+    ("light", "light", "lux"),
+    ("rain", "rain", "mm"),
+    ("soil", "soil", "%"),
+)
+_SERIES_COLS = "t, " + ", ".join(SENSOR_NAMES)
+
+_EPOCH = dt.datetime(1970, 1, 1)
+_SECOND = dt.timedelta(seconds=1)
+_MIN_T = -(2 ** 62)
+_MAX_T = 2 ** 62
+
+
+def to_epoch(ts: Optional[object] = None) -> int:
+    """
+    Epoch seconds for a timestamp. Naive datetimes (the sim clock) are stored
+    as if they were UTC, so SQLite's datetime(t, 'unixepoch') gives back the
+    same wall-clock text.
+    """
+    if ts is None:
+        ts = dt.datetime.now()
+    if isinstance(ts, (int, float)) and not isinstance(ts, bool):
+        return int(ts)
+    if isinstance(ts, str):
+        ts = dt.datetime.fromisoformat(ts.strip())
+    if isinstance(ts, dt.datetime):
+        if ts.tzinfo is not None:
+            ts = ts.astimezone(dt.timezone.utc).replace(tzinfo=None)
+        return (ts - _EPOCH) // _SECOND
+    raise TypeError(f"Unsupported ts type: {type(ts)}")
+
+
+def from_epoch(t: int) -> dt.datetime:
+    return _EPOCH + dt.timedelta(seconds=t)
+
+
+class ConnectionManager:
     """
-    Keeps your original 'readings' table for graphs (do not break).
-    Also adds Sensor/Reading tables (optional, helps for expansion).
+    One long-lived writer connection (serialized by a lock) plus a small pool
+    of thread-local reader connections. PRAGMAs run once per connection and
+    sqlite3's per-connection statement cache keeps our SQL prepared.
+    last_write is the monotonic time the writer last committed.
     """
 
-    def __init__(self, db_name: str):
+    def __init__(self, db_name: str, max_readers: int = DB_MAX_READERS,
+                 cached_statements: int = DB_CACHED_STATEMENTS, timeout: float = DB_BUSY_TIMEOUT_SEC,
+                 wal_autocheckpoint: int = WAL_AUTOCHECKPOINT_PAGES):
         self.db_name = db_name
-        self._init_db()
+        self.max_readers = max(1, int(max_readers))
+        self.cached_statements = int(cached_statements)
+        self.timeout = float(timeout)
+
+        self._closed = False
+        self._wlock = threading.RLock()
+        self._plock = threading.Lock()
+        self._local = threading.local()
+        # (owner thread, connection) so readers of finished threads can be reclaimed
+        self._readers: List[Tuple[weakref.ref, sqlite3.Connection]] = []
+        self.last_write = time.monotonic()
+
+        self._writer = self._open()
+        # only takes effect on a new file (before WAL and the first table); older files are switched by VACUUM
+        self._writer.execute("PRAGMA auto_vacuum=INCREMENTAL;")
+        self._writer.execute("PRAGMA journal_mode=WAL;")
+        self._writer.execute("PRAGMA synchronous=NORMAL;")
+        # with a CheckpointManager this is only a safety net, far above where it checkpoints
+        self._writer.execute(f"PRAGMA wal_autocheckpoint={int(wal_autocheckpoint)};")
 
-    def _conn(self) -> sqlite3.Connection:
-        conn = sqlite3.connect(self.db_name)
-        conn.execute("PRAGMA journal_mode=WAL;")
+    def _open(self, readonly: bool = False) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.db_name,
+            timeout=self.timeout,
+            check_same_thread=False,
+            cached_statements=self.cached_statements,
+        )
         conn.execute("PRAGMA foreign_keys = ON;")
+        if readonly:
+            conn.execute("PRAGMA query_only = ON;")
         return conn
 
+    def _check_open(self) -> None:
+        if self._closed:
+            raise RuntimeError("Database connections are closed")
+
+    @contextmanager
+    def writer(self) -> Iterator[sqlite3.Connection]:
+        """Exclusive access to the writer; commits on success, rolls back on error."""
+        with self._wlock:
+            self._check_open()
+            conn = self._writer
+            try:
+                yield conn
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+            finally:
+                self.last_write = time.monotonic()
+
+    def execute_outside_txn(self, *statements: str) -> None:
+        """Run statements that refuse to run inside a transaction (VACUUM, ...) on the writer."""
+        with self._wlock:
+            self._check_open()
+            self._writer.commit()
+            for sql in statements:
+                self._writer.execute(sql).fetchall()
+
+    @contextmanager
+    def reader(self) -> Iterator[sqlite3.Connection]:
+        self._check_open()
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            yield conn
+            return
+
+        conn = self._acquire_reader()
+        if conn is not None:
+            yield conn
+            return
+
+        # pool exhausted: fall back to a short-lived connection
+        conn = self._open(readonly=True)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def _acquire_reader(self) -> Optional[sqlite3.Connection]:
+        with self._plock:
+            self._check_open()
+            self._reap_readers()
+            if len(self._readers) >= self.max_readers:
+                return None
+            conn = self._open(readonly=True)
+            self._readers.append((weakref.ref(threading.current_thread()), conn))
+            self._local.conn = conn
+            return conn
+
+    def _reap_readers(self) -> None:
+        alive = []
+        for ref, conn in self._readers:
+            thread = ref()
+            if thread is None or not thread.is_alive():
+                conn.close()
+            else:
+                alive.append((ref, conn))
+        self._readers = alive
+
+    def close(self) -> None:
+        with self._wlock, self._plock:
+            if self._closed:
+                return
+            self._closed = True
+            for _, conn in self._readers:
+                conn.close()
+            self._readers = []
+            try:
+                self._writer.commit()
+            finally:
+                self._writer.close()
+
+
+class DatabaseManager:
+    """
+    Time series live in month partitions (series_YYYYMM: epoch-second key, WITHOUT ROWID);
+    'series' is a UNION ALL view over them and 'readings' stays available as a view
+    with the original columns (do not break). The normalized Sensor/Reading schema is
+    kept too: 'Reading' is a view over reading_YYYYMM partitions.
+
+    Databases created before this layout are migrated: a monolithic 'series' table is
+    split at startup, while the old 'readings' and 'Reading' tables are copied online
+    by a background thread in chunks (new rows are written to both until the copy is
+    done), then replaced by the views.
+
+    Months older than ARCHIVE_AFTER_MONTHS are packed into Gorilla-compressed blocks
+    (db_archive) and their partitions dropped; range queries decode only the blocks
+    they overlap. Retention drops whole months (RETENTION_MONTHS) and the freed
+    pages are returned with incremental vacuum, all on a background housekeeping thread.
+
+    With compression on (COMPRESSION), each sensor goes through a dead-band +
+    swinging-door compressor before it is stored: series rows hold NULL where a
+    sensor had nothing to keep, and reads interpolate those back. Rollups and the
+    hot tier still see every raw row.
+
+    Many greenhouses / zones: every zone has its own Sensor rows and the normalized
+    reading_YYYYMM partitions are keyed (zone_id, sensor_id, t), so one zone's range
+    is an index range scan whatever the number of zones. The original greenhouse is
+    zone DEFAULT_ZONE_ID; only its readings also feed 'series', rollups and the hot
+    tier. insert_zone_readings() / record_zone_tick() write many zones in one transaction.
+
+    With async_writes=True, submit_reading() goes through a BackgroundWriter
+    (group commit); insert_reading() always writes synchronously.
+
+    The newest HOT_TIER_ROWS rows are also kept in an in-memory ring buffer
+    (HotTier); range queries that fall inside it never touch SQLite.
+
+    With checkpoints=True, WAL checkpoints run on a CheckpointManager thread instead
+    of inside whichever commit crosses SQLite's auto-checkpoint threshold.
+    """
+
+    def __init__(self, db_name: str, async_writes: bool = False, housekeeping: bool = True,
+                 compress: bool = COMPRESSION_ENABLED, checkpoints: bool = CHECKPOINT_ENABLED):
+        self.db_name = db_name
+        self.pool = ConnectionManager(
+            db_name, wal_autocheckpoint=CHECKPOINT_SAFETY_PAGES if checkpoints else WAL_AUTOCHECKPOINT_PAGES
+        )
+
+        # online migration of the legacy 'readings' / 'Reading' tables
+        self._migrated = True
+        self._legacy_reading = False
+        self._stop = threading.Event()
+        self._migration_thread: Optional[threading.Thread] = None
+        self.migration_copied = 0
+        self.migration_skipped = 0
+        self.migration_error: Optional[BaseException] = None
+
+        # month partitions (sorted keys, replaced - never mutated - under the writer lock)
+        self._parts: List[int] = []
+        self._router = PartitionRouter()
+        # everything before this t has been moved to the block archive (None: nothing archived)
+        self._archive_until: Optional[int] = None
+        self._housekeeping_thread: Optional[threading.Thread] = None
+        self.housekeeping_error: Optional[BaseException] = None
+        self.backup_job: Optional[BackupJob] = None
+
+        # in-memory hot tier, (re)loaded lazily on first read
+        self.hot = HotTier(HOT_TIER_ROWS, len(SENSOR_NAMES))
+
+        # ingest compression: column index -> compressor (sensors without one are stored as-is)
+        self._compress_on = bool(compress)
+        self._compressors = self._new_compressors()
+        # the same per zone, created on a zone's first write
+        self._zone_compressors: Dict[int, Dict[int, SwingingDoor]] = {}
+
+        # rollups: smallest gap between readings seen (the tick), and the last reading of this session
+        self._tick_sec: Optional[int] = None
+        self._session_t: Optional[int] = None
+
+        # actuator -> on_t of its open interval; only transitions reach the database
+        self._actuator_on: Dict[str, int] = {}
+        self._actuator_last_t: Optional[int] = None
+
+        self._init_db()
+
+        # kind -> handler(conn, payloads), all run inside one writer transaction
+        self._batch_handlers: Dict[str, Callable[[sqlite3.Connection, list], None]] = {
+            "reading": self._insert_rows,
+            "actuators": self._apply_actuator_states,
+            "runtime": self._add_runtime,
+            "zones": self._insert_zone_ticks,
+        }
+        self.writer: Optional[BackgroundWriter] = BackgroundWriter(self._write_batch) if async_writes else None
+        self.checkpointer: Optional[CheckpointManager] = (
+            CheckpointManager(db_name, lambda: self.pool.last_write) if checkpoints else None
+        )
+
+        if not self.migration_done:
+            self._migration_thread = threading.Thread(target=self._run_migration, name="series-migration", daemon=True)
+            self._migration_thread.start()
+        if housekeeping:
+            self._housekeeping_thread = threading.Thread(target=self._run_housekeeping, name="db-housekeeping", daemon=True)
+            self._housekeeping_thread.start()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait for queued writes to be committed (no-op without async writes)."""
+        if self.writer is None:
+            return True
+        return self.writer.flush(timeout)
+
+    def close(self) -> None:
+        self._stop.set()
+        if self.backup_job is not None:
+            self.backup_job.cancel()
+            self.backup_job.wait()
+        for thread in (self._migration_thread, self._housekeeping_thread):
+            if thread is not None:
+                thread.join()
+        if self.writer is not None:
+            self.writer.close()
+        self._flush_compressors()
+        if self.checkpointer is not None:
+            self.checkpointer.close()
+        self.pool.close()
+
     def _init_db(self) -> None:
-        with self._conn() as conn:
-            # original table (graphs rely on this)
-            conn.execute(
-                """
-                CREATE TABLE IF NOT EXISTS readings (
-                    ts TEXT PRIMARY KEY,
-                    temp REAL NOT NULL,
-                    humidity REAL NOT NULL,
-                    light REAL NOT NULL,
-                    rain REAL NOT NULL,
-                    soil REAL NOT NULL
-                )
-                """
-            )
+        with self.pool.writer() as conn:
+            db_zones.create_tables(conn, DEFAULT_GREENHOUSE_NAME, DEFAULT_ZONE_NAME)
+            outdated = db_zones.sensor_table_outdated(conn)
+        if outdated:
+            # Sensor names become unique per zone: rebuild the table with foreign keys off
+            # (a legacy 'Reading' table references it), the pragma only applies outside a transaction
+            self.pool.execute_outside_txn("PRAGMA foreign_keys = OFF")
+            try:
+                with self.pool.writer() as conn:
+                    db_zones.upgrade_sensor_table(conn)
+            finally:
+                self.pool.execute_outside_txn("PRAGMA foreign_keys = ON")
 
-            # optional normalized schema
-            conn.execute(
-                """
-                CREATE TABLE IF NOT EXISTS Sensor (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name TEXT NOT NULL UNIQUE,
-                    sensor_type TEXT NOT NULL,
-                    unit TEXT,
-                    created_at TEXT DEFAULT (datetime('now'))
-                )
-                """
-            )
+        with self.pool.writer() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+
+            # compact time-series storage (graphs read this), one table per month
+            if self._object_type(conn, "series") == "table":
+                self._split_series_table(conn)
+            self._legacy_reading = self._object_type(conn, "Reading") == "table"
+            self._parts = db_partitions.load_keys(conn)
+            if not self._legacy_reading:
+                conn.execute("DROP VIEW IF EXISTS Reading")
+            # normalized partitions from before zones: everything was the default zone
+            db_partitions.upgrade_readings(conn, self._parts, DEFAULT_ZONE_ID)
+            db_partitions.rebuild_views(conn, self._parts, SENSOR_NAMES, with_reading=not self._legacy_reading)
+
+            # cold history, Gorilla-compressed blocks
+            db_archive.create_tables(conn)
+            until = self._meta_get(conn, "archive_until")
+            self._archive_until = int(until) if until is not None else None
+
+            # min/max/avg rollups, seeded once from existing history then maintained incrementally
+            db_rollups.create_tables(conn, SENSOR_NAMES)
+            if self._meta_get(conn, "rollups_built") != "1":
+                db_rollups.rebuild(conn, SENSOR_NAMES, ROLLUP_TIERS_SEC)
+                self._meta_set(conn, "rollups_built", "1")
+            newest = self._edge_t(conn, newest=True)
+            self._max_t: int = _MIN_T if newest is None else newest
+            tick = self._meta_get(conn, "tick_sec")
+            self._tick_sec = int(tick) if tick is not None else None
+
+            # actuator ON intervals
+            db_actuators.create_tables(conn)
+            self._load_actuators(conn)
+
+            # maintenance runtime counters: one row per actuator, bumped in place
             conn.execute(
-                """
-                CREATE TABLE IF NOT EXISTS Reading (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    sensor_id INTEGER NOT NULL,
-                    value REAL NOT NULL,
-                    recorded_at TEXT DEFAULT (datetime('now')),
-                    FOREIGN KEY(sensor_id) REFERENCES Sensor(id) ON DELETE CASCADE
-                )
-                """
+                "CREATE TABLE IF NOT EXISTS runtime_counter (name TEXT PRIMARY KEY, hours REAL NOT NULL DEFAULT 0)"
             )
-            conn.execute("CREATE INDEX IF NOT EXISTS idx_reading_sensor_time ON Reading(sensor_id, recorded_at)")
-            conn.commit()
 
-            # ensure sensors exist
-            self._ensure_sensor(conn, "temp", "temperature", "°C")
-            self._ensure_sensor(conn, "humidity", "humidity", "%")
-            self._ensure_sensor(conn, "light", "light", "lux")
-            self._ensure_sensor(conn, "rain", "rain", "mm")
-            self._ensure_sensor(conn, "soil", "soil", "%")
+            # original 'readings' table: migrate if it is still a real table, else expose the view
+            if self._object_type(conn, "readings") == "table":
+                self._migrated = False
+            else:
+                self._create_readings_view(conn)
+
+            # optional normalized schema ('Reading' is the partition view created above),
+            # one set of sensors per zone
+            db_zones.create_sensor_table(conn)
+            db_zones.ensure_sensors(conn, DEFAULT_ZONE_ID, _SENSOR_SPECS)
+
+            self._zone_sensor_ids = self._load_sensor_ids(conn)
+            self._sensor_ids = self._zone_sensor_ids[DEFAULT_ZONE_ID]
+
+    @staticmethod
+    def _object_type(conn: sqlite3.Connection, name: str) -> Optional[str]:
+        row = conn.execute("SELECT type FROM sqlite_master WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
 
     @staticmethod
-    def _ensure_sensor(conn: sqlite3.Connection, name: str, sensor_type: str, unit: str) -> None:
+    def _create_readings_view(conn: sqlite3.Connection) -> None:
         conn.execute(
-            "INSERT OR IGNORE INTO Sensor(name, sensor_type, unit) VALUES(?,?,?)",
-            (name, sensor_type, unit),
+            """
+            CREATE VIEW IF NOT EXISTS readings AS
+            SELECT datetime(t, 'unixepoch') AS ts, temp, humidity, light, rain, soil FROM series
+            """
         )
 
     @staticmethod
-    def _ts_to_str(ts: Optional[object]) -> str:
-        if ts is None:
-            ts = dt.datetime.now()
-        if isinstance(ts, str):
-            return ts
-        if isinstance(ts, dt.datetime):
-            return ts.isoformat(sep=" ", timespec="seconds")
-        raise TypeError(f"Unsupported ts type: {type(ts)}")
-
-    def _sensor_id(self, conn: sqlite3.Connection, name: str) -> int:
-        cur = conn.execute("SELECT id FROM Sensor WHERE name = ?", (name,))
-        row = cur.fetchone()
-        if not row:
-            raise RuntimeError(f"Sensor missing: {name}")
-        return int(row[0])
+    def _split_series_table(conn: sqlite3.Connection) -> None:
+        # databases from before partitioning: one 'series' table -> series_YYYYMM
+        conn.execute("DROP VIEW IF EXISTS readings")
+        lo, hi = conn.execute("SELECT min(t), max(t) FROM series").fetchone()
+        if lo is not None:
+            key, last = db_partitions.month_key(lo), db_partitions.month_key(hi)
+            while key <= last:
+                a, b = db_partitions.month_bounds(key)
+                if conn.execute("SELECT 1 FROM series WHERE t >= ? AND t < ? LIMIT 1", (a, b)).fetchone():
+                    db_partitions.create(conn, key, SENSOR_NAMES)
+                    conn.execute(
+                        f"INSERT INTO {series_table(key)} ({_SERIES_COLS}) "
+                        f"SELECT {_SERIES_COLS} FROM series WHERE t >= ? AND t < ?",
+                        (a, b),
+                    )
+                key = db_partitions.add_months(key, 1)
+        conn.execute("DROP TABLE series")
 
-    def insert_reading(self, temp: float, humidity: float, light: float, rain: float, soil: float, ts=None) -> None:
-        ts_str = self._ts_to_str(ts)
-        with self._conn() as conn:
-            conn.execute(
-                "INSERT OR REPLACE INTO readings (ts, temp, humidity, light, rain, soil) VALUES (?, ?, ?, ?, ?, ?)",
-                (ts_str, float(temp), float(humidity), float(light), float(rain), float(soil)),
+    @staticmethod
+    def _meta_get(conn: sqlite3.Connection, key: str) -> Optional[str]:
+        row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    @staticmethod
+    def _meta_set(conn: sqlite3.Connection, key: str, value: Optional[str]) -> None:
+        if value is None:
+            conn.execute("DELETE FROM meta WHERE key = ?", (key,))
+        else:
+            conn.execute("INSERT OR REPLACE INTO meta(key, value) VALUES(?, ?)", (key, value))
+
+    # ---------------- partitions ----------------
+    def _ensure_partition(self, conn: sqlite3.Connection, key: int) -> None:
+        if key in self._parts:
+            return
+        db_partitions.create(conn, key, SENSOR_NAMES)
+        self._parts = sorted(self._parts + [key])
+        db_partitions.rebuild_views(conn, self._parts, SENSOR_NAMES, with_reading=not self._legacy_reading)
+
+    def _reload_partitions(self) -> None:
+        # after a rollback: a partition created in that transaction is gone again
+        with self.pool.writer() as conn:
+            self._parts = db_partitions.load_keys(conn)
+
+    def _write_failed(self) -> None:
+        # rolled back: the hot tier (and the open actuator intervals) may hold rows that never reached disk
+        self.hot.invalidate()
+        for c in self._compressors.values():
+            c.reset()
+        self._zone_compressors = {}
+        self._reload_partitions()
+        with self.pool.writer() as conn:
+            self._load_actuators(conn)
+
+    def _write_series(self, conn: sqlite3.Connection, rows: Sequence[ReadingRow], verb: str = "REPLACE") -> None:
+        # REPLACE merges column by column: a compressed row carries NULL for sensors with nothing to store
+        for key, part in self._router.split(rows).items():
+            self._ensure_partition(conn, key)
+            if verb == "REPLACE":
+                sets = ", ".join(f"{s} = coalesce(excluded.{s}, {s})" for s in SENSOR_NAMES)
+                sql = (f"INSERT INTO {series_table(key)} ({_SERIES_COLS}) VALUES (?, ?, ?, ?, ?, ?) "
+                       f"ON CONFLICT(t) DO UPDATE SET {sets}")
+            else:
+                sql = f"INSERT OR {verb} INTO {series_table(key)} ({_SERIES_COLS}) VALUES (?, ?, ?, ?, ?, ?)"
+            conn.executemany(sql, part)
+
+    def _write_normalized(self, conn: sqlite3.Connection, rows: Sequence[Tuple[int, int, int, float]],
+                          verb: str = "REPLACE") -> None:
+        # rows are (zone_id, sensor_id, t, value)
+        for key, part in self._router.split(rows, t_index=2).items():
+            self._ensure_partition(conn, key)
+            conn.executemany(
+                f"INSERT OR {verb} INTO {reading_table(key)} (zone_id, sensor_id, t, value) VALUES (?, ?, ?, ?)",
+                part,
             )
 
-            # also insert normalized readings
-            sid_temp = self._sensor_id(conn, "temp")
-            sid_hum = self._sensor_id(conn, "humidity")
-            sid_light = self._sensor_id(conn, "light")
-            sid_rain = self._sensor_id(conn, "rain")
-            sid_soil = self._sensor_id(conn, "soil")
+    @staticmethod
+    def _query_part(conn: sqlite3.Connection, sql: str, params: Sequence = ()) -> Optional[sqlite3.Cursor]:
+        try:
+            return conn.execute(sql, params)
+        except sqlite3.OperationalError as e:
+            # dropped by retention after the partition list was taken
+            if "no such table" in str(e):
+                return None
+            raise
+
+    def _scan(self, conn: sqlite3.Connection, t0: int, t1: int, cols: str = _SERIES_COLS,
+              desc: bool = False, limit: Optional[int] = None) -> Iterator[tuple]:
+        """
+        Rows in [t0, t1] in time order (newest first with desc): the month partitions,
+        merged with the block archive for the part of the range that has been archived.
+        Reading the tables directly lets every query use its primary key; the
+        'series' view would have to sort the whole union.
+        """
+        rows = self._scan_parts(conn, t0, t1, cols, desc)
+        if self._archive_until is not None and t0 < self._archive_until:
+            names = [c.strip() for c in cols.split(",")[1:]]
+            cold = self._scan_archive(conn, names, t0, min(t1, self._archive_until - 1), desc)
+            rows = self._merge_rows(rows, cold, desc)
+        held = self._held_rows(cols, t0, t1, desc)
+        if held:
+            rows = self._merge_held(rows, held, desc)
+        if limit is not None:
+            rows = islice(rows, max(0, int(limit)))
+        yield from rows
 
-            conn.execute("INSERT INTO Reading(sensor_id, value, recorded_at) VALUES(?,?,?)", (sid_temp, float(temp), ts_str))
-            conn.execute("INSERT INTO Reading(sensor_id, value, recorded_at) VALUES(?,?,?)", (sid_hum, float(humidity), ts_str))
-            conn.execute("INSERT INTO Reading(sensor_id, value, recorded_at) VALUES(?,?,?)", (sid_light, float(light), ts_str))
-            conn.execute("INSERT INTO Reading(sensor_id, value, recorded_at) VALUES(?,?,?)", (sid_rain, float(rain), ts_str))
-            conn.execute("INSERT INTO Reading(sensor_id, value, recorded_at) VALUES(?,?,?)", (sid_soil, float(soil), ts_str))
+    def _scan_parts(self, conn: sqlite3.Connection, t0: int, t1: int, cols: str, desc: bool) -> Iterator[tuple]:
+        keys = db_partitions.overlapping(self._parts, t0, t1)
+        order = "DESC" if desc else "ASC"
+        for key in (reversed(keys) if desc else keys):
+            cur = self._query_part(
+                conn,
+                f"SELECT {cols} FROM {series_table(key)} WHERE t >= ? AND t <= ? ORDER BY t {order}",
+                (t0, t1),
+            )
+            if cur is not None:
+                yield from cur
 
-            conn.commit()
+    @staticmethod
+    def _scan_archive(conn: sqlite3.Connection, names: Sequence[str], t0: int, t1: int,
+                      desc: bool) -> Iterator[tuple]:
+        # one lazily decoded stream per sensor, zipped back into rows by t
+        def stream(j: int, name: str) -> Iterator[Tuple[int, int, float]]:
+            for t, v in db_archive.points(conn, name, t0, t1, desc):
+                yield t, j, v
 
-    def fetch_all(self) -> List[Tuple[str, float, float, float, float, float]]:
-        with self._conn() as conn:
-            cur = conn.execute("SELECT ts, temp, humidity, light, rain, soil FROM readings ORDER BY ts ASC")
-            return cur.fetchall()
+        streams = [stream(j, name) for j, name in enumerate(names, start=1)]
+        row = None
+        for t, j, v in heapq.merge(*streams, key=itemgetter(0), reverse=desc):
+            if row is None or row[0] != t:
+                if row is not None:
+                    yield tuple(row)
+                row = [t] + [None] * len(names)
+            row[j] = v
+        if row is not None:
+            yield tuple(row)
 
-    def fetch_since(self, since_ts: str) -> List[Tuple[str, float, float, float, float, float]]:
-        with self._conn() as conn:
-            cur = conn.execute(
-                "SELECT ts, temp, humidity, light, rain, soil FROM readings WHERE ts >= ? ORDER BY ts ASC",
-                (since_ts,),
+    def _held(self, sensor: str) -> Optional[Tuple[int, float]]:
+        """The default zone's newest sample of one sensor that its compressor has not stored yet."""
+        c = self._compressors.get(SENSOR_NAMES.index(sensor) + 1)
+        return c.pending() if c is not None else None
+
+    def _held_rows(self, cols: str, t0: int, t1: int, desc: bool) -> List[tuple]:
+        # the held points in [t0, t1] as rows shaped like the scanned ones
+        names = [c.strip() for c in cols.split(",")[1:]]
+        out: Dict[int, list] = {}
+        for j, name in enumerate(names, start=1):
+            p = self._held(name)
+            if p is not None and t0 <= p[0] <= t1:
+                out.setdefault(p[0], [p[0]] + [None] * len(names))[j] = p[1]
+        return [tuple(out[t]) for t in sorted(out, reverse=desc)]
+
+    @staticmethod
+    def _merge_held(rows: Iterator[tuple], held: List[tuple], desc: bool) -> Iterator[tuple]:
+        # a held point can share its t with another sensor's stored one: merge column by column
+        prev = None
+        for row in heapq.merge(rows, held, key=itemgetter(0), reverse=desc):
+            if prev is not None and prev[0] == row[0]:
+                prev = tuple(a if a is not None else b for a, b in zip(prev, row))
+                continue
+            if prev is not None:
+                yield prev
+            prev = row
+        if prev is not None:
+            yield prev
+
+    @staticmethod
+    def _merge_rows(hot: Iterator[tuple], cold: Iterator[tuple], desc: bool) -> Iterator[tuple]:
+        # partitions win over the archive (rows rewritten into an archived month)
+        last = None
+        for row in heapq.merge(hot, cold, key=itemgetter(0), reverse=desc):
+            if row[0] != last:
+                last = row[0]
+                yield row
+
+    def _edge_t(self, conn: sqlite3.Connection, newest: bool) -> Optional[int]:
+        found = None
+        for key in (reversed(self._parts) if newest else self._parts):
+            cur = self._query_part(conn, f"SELECT {'max' if newest else 'min'}(t) FROM {series_table(key)}")
+            row = cur.fetchone() if cur is not None else None
+            if row and row[0] is not None:
+                found = int(row[0])
+                break
+        if self._archive_until is not None:
+            lo, hi = db_archive.bounds(conn)
+            edge = hi if newest else lo
+            if edge is not None and (found is None or (edge > found if newest else edge < found)):
+                found = int(edge)
+        held = [p[0] for p in map(self._held, SENSOR_NAMES) if p is not None]
+        if held:
+            edge = max(held) if newest else min(held)
+            if found is None or (edge > found if newest else edge < found):
+                found = edge
+        return found
+
+    def _neighbor(self, conn: sqlite3.Connection, sensor: str, t: int, before: bool) -> Optional[Tuple[int, float]]:
+        """Nearest stored (or held) value of one sensor strictly before / after t."""
+        if before:
+            keys = reversed(db_partitions.overlapping(self._parts, _MIN_T, t))
+            cond, order = "t < ?", "DESC"
+        else:
+            keys = db_partitions.overlapping(self._parts, t, _MAX_T)
+            cond, order = "t > ?", "ASC"
+        best = None
+        for key in keys:
+            cur = self._query_part(
+                conn,
+                f"SELECT t, {sensor} FROM {series_table(key)} WHERE {cond} AND {sensor} IS NOT NULL "
+                f"ORDER BY t {order} LIMIT 1",
+                (t,),
             )
-            return cur.fetchall()
+            row = cur.fetchone() if cur is not None else None
+            if row:
+                best = int(row[0]), float(row[1])
+                break
+
+        until = self._archive_until
+        if until is not None and (t < until if not before else best is None or best[0] < until):
+            if before:
+                p = next(db_archive.points(conn, sensor, _MIN_T, t - 1, desc=True), None)
+            else:
+                p = next(db_archive.points(conn, sensor, t + 1, _MAX_T), None)
+            if p is not None and (best is None or (p[0] > best[0] if before else p[0] < best[0])):
+                best = p
+        p = self._held(sensor)
+        if p is not None and (p[0] < t if before else p[0] > t):
+            if best is None or (p[0] > best[0] if before else p[0] < best[0]):
+                best = p
+        return best
+
+    def _fill(self, conn: sqlite3.Connection, rows: List[tuple], names: Sequence[str] = SENSOR_NAMES) -> List[tuple]:
+        """Interpolate the NULLs left by ingest compression (rows oldest first)."""
+        out: Optional[List[list]] = None
+        for j, name in enumerate(names, start=1):
+            known = [(r[0], r[j]) for r in rows if r[j] is not None]
+            if len(known) == len(rows):
+                continue
+            if out is None:
+                out = [list(r) for r in rows]
+            if rows[0][j] is None:
+                p = self._neighbor(conn, name, rows[0][0], before=True)
+                if p is not None:
+                    known.insert(0, p)
+            if rows[-1][j] is None:
+                p = self._neighbor(conn, name, rows[-1][0], before=False)
+                if p is not None:
+                    known.append(p)
+            if not known:
+                continue
+            kt = [k[0] for k in known]
+            for r in out:
+                if r[j] is not None:
+                    continue
+                i = bisect_right(kt, r[0])
+                if i == 0 or i == len(known):
+                    r[j] = known[0][1] if i == 0 else known[-1][1]
+                else:
+                    (ta, va), (tb, vb) = known[i - 1], known[i]
+                    r[j] = va + (vb - va) * (r[0] - ta) / (tb - ta)
+        return rows if out is None else [tuple(r) for r in out]
 
-    def fetch_last_n(self, n: int) -> List[Tuple[str, float, float, float, float, float]]:
-        with self._conn() as conn:
+    def _fill_array(self, conn: sqlite3.Connection, sensor: str, t: "np.ndarray", col: "np.ndarray") -> None:
+        """_fill() for one column of fetch_columns(), in place."""
+        missing = np.isnan(col)
+        if not missing.any():
+            return
+        kt, kv = t[~missing], col[~missing]
+        if missing[0]:
+            p = self._neighbor(conn, sensor, int(t[0]), before=True)
+            if p is not None:
+                kt, kv = np.concatenate([[p[0]], kt]), np.concatenate([[p[1]], kv])
+        if missing[-1]:
+            p = self._neighbor(conn, sensor, int(t[-1]), before=False)
+            if p is not None:
+                kt, kv = np.concatenate([kt, [p[0]]]), np.concatenate([kv, [p[1]]])
+        if len(kt):
+            col[missing] = np.interp(t[missing], kt, kv)
+
+    def archive_old_partitions(self, months: int = ARCHIVE_AFTER_MONTHS) -> List[int]:
+        """
+        Pack every month partition older than `months` months before the newest row
+        into Gorilla blocks (one stream per sensor) and drop it, a month per transaction.
+        The normalized reading_YYYYMM rows of those months go with it. Returns the
+        archived month keys (YYYYMM).
+        """
+        if months <= 0 or not self.migration_done:
+            return []
+        names = {sid: SENSOR_NAMES[i] for sids in self._zone_sensor_ids.values() for i, sid in enumerate(sids)}
+        done = []
+        for key in db_partitions.expired(self._parts, self._newest_t(), months):
+            if self._stop.is_set():
+                break
+            lo, hi = db_partitions.month_bounds(key)
+            with self.pool.writer() as conn:
+                for name in SENSOR_NAMES:
+                    self._archive_month(conn, name, lo, hi, conn.execute(
+                        f"SELECT t, {name} FROM {series_table(key)} WHERE {name} IS NOT NULL ORDER BY t"
+                    ))
+                # the other zones only live in the normalized partition
+                for zone_id, sid in conn.execute(
+                    f"SELECT DISTINCT zone_id, sensor_id FROM {reading_table(key)} WHERE zone_id != ?",
+                    (DEFAULT_ZONE_ID,),
+                ).fetchall():
+                    stream = self._archive_stream(zone_id, names.get(sid, str(sid)))
+                    self._archive_month(conn, stream, lo, hi, conn.execute(
+                        f"SELECT t, value FROM {reading_table(key)} WHERE zone_id = ? AND sensor_id = ? ORDER BY t",
+                        (zone_id, sid),
+                    ))
+                db_partitions.drop(conn, key)
+                self._parts = [k for k in self._parts if k != key]
+                db_partitions.rebuild_views(conn, self._parts, SENSOR_NAMES)
+                self._archive_until = max(self._archive_until or hi, hi)
+                self._meta_set(conn, "archive_until", str(self._archive_until))
+                self.hot.invalidate()
+            done.append(key)
+        return done
+
+    @staticmethod
+    def _archive_month(conn: sqlite3.Connection, stream: str, lo: int, hi: int,
+                       rows: Iterable[Tuple[int, float]]) -> None:
+        # a month archived before and written to again: merge, the partition wins
+        merged = dict(db_archive.points(conn, stream, lo, hi - 1))
+        merged.update(rows)
+        ts = sorted(merged)
+        db_archive.write_range(conn, stream, lo, hi, ts, [merged[t] for t in ts], ARCHIVE_BLOCK_POINTS)
+
+    @staticmethod
+    def _archive_stream(zone_id: int, name: str) -> str:
+        # the default zone keeps the plain sensor names
+        return name if zone_id == DEFAULT_ZONE_ID else f"{name}@{zone_id}"
+
+    def _newest_t(self) -> Optional[int]:
+        """Newest row for housekeeping, any zone: at least the start of the newest partition's month."""
+        newest = None if self._max_t == _MIN_T else self._max_t
+        if self._parts:
+            start = db_partitions.month_bounds(self._parts[-1])[0]
+            newest = start if newest is None else max(newest, start)
+        return newest
+
+    def apply_retention(self, months: int = RETENTION_MONTHS) -> List[int]:
+        """
+        Drop every month older than `months` months before the newest stored row
+        (0 keeps everything): whole partitions and whole archive blocks, with the
+        buckets of the rollup tiers finer than ROLLUP_RETAINED_MIN_SEC (their detail
+        goes with the rows). The coarser tiers are kept, so long-range graphs still
+        cover the dropped months. Returns the dropped partition keys (YYYYMM).
+        """
+        if months <= 0 or not self.migration_done:
+            # legacy rows still being copied would recreate old months
+            return []
+        with self.pool.writer() as conn:
+            newest = self._newest_t()
+            if newest is None:
+                return []
+            keep_from = db_partitions.add_months(db_partitions.month_key(newest), -(months - 1))
+            horizon = db_partitions.month_bounds(keep_from)[0]
+            if self._archive_until is not None:
+                db_archive.delete_before(conn, horizon)
+            fine = [w for w in ROLLUP_TIERS_SEC if w < ROLLUP_RETAINED_MIN_SEC]
+            db_rollups.delete(conn, fine, before=horizon)
+            dropped = db_partitions.expired(self._parts, newest, months)
+            if not dropped:
+                return []
+            for key in dropped:
+                db_partitions.drop(conn, key)
+            self._parts = [k for k in self._parts if k not in dropped]
+            db_partitions.rebuild_views(conn, self._parts, SENSOR_NAMES)
+            self.hot.invalidate()
+        return dropped
+
+    def vacuum_step(self, pages: int = VACUUM_STEP_PAGES) -> int:
+        """
+        Return up to `pages` free pages to the filesystem. Files created before
+        auto_vacuum=INCREMENTAL are rebuilt once with VACUUM first. Returns the
+        number of free pages left.
+        """
+        # ask the writer: a reader connection keeps the mode it saw when it opened
+        with self.pool.writer() as conn:
+            mode = conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+        if mode != 2:
+            if not self.migration_done:
+                return 0
+            self.pool.execute_outside_txn("PRAGMA auto_vacuum = INCREMENTAL", "VACUUM")
+        with self.pool.writer() as conn:
+            conn.execute(f"PRAGMA incremental_vacuum({max(1, int(pages))})").fetchall()
+            return int(conn.execute("PRAGMA freelist_count").fetchone()[0])
+
+    def housekeeping(self) -> None:
+        """Archive, retention, then incremental vacuum in small steps so writers are never blocked for long."""
+        self.archive_old_partitions()
+        self.apply_retention()
+        while self.vacuum_step() > 0 and not self._stop.wait(VACUUM_PAUSE_SEC):
+            pass
+
+    def _run_housekeeping(self) -> None:
+        while not self._stop.wait(HOUSEKEEPING_INTERVAL_SEC):
+            try:
+                self.housekeeping()
+                if self._backup_due():
+                    self.backup()
+            except Exception as e:
+                self.housekeeping_error = e
+
+    # ---------------- backups ----------------
+    def backup(self, dest_dir: str = BACKUP_DIR,
+               on_progress: Optional[Callable[[BackupJob], None]] = None) -> BackupJob:
+        """
+        Start a background snapshot into dest_dir (rotating, see BackupJob) and
+        return the job; if one is already running, return that one instead.
+        """
+        if self.backup_job is not None and self.backup_job.running:
+            return self.backup_job
+        self.flush()
+        self.backup_job = BackupJob(self.db_name, dest_dir, on_progress=on_progress).start()
+        return self.backup_job
+
+    def _backup_due(self) -> bool:
+        if BACKUP_INTERVAL_SEC <= 0 or (self.backup_job is not None and self.backup_job.running):
+            return False
+        stem = os.path.splitext(os.path.basename(self.db_name))[0]
+        existing = snapshots(BACKUP_DIR, stem)
+        return not existing or time.time() - os.path.getmtime(existing[-1]) >= BACKUP_INTERVAL_SEC
+
+    def checkpoint_stats(self) -> Dict[str, object]:
+        """WAL size (as of the last poll) and checkpoint metrics, durations in ms; only wal_bytes without a CheckpointManager."""
+        c = self.checkpointer
+        if c is None:
+            try:
+                return {"wal_bytes": os.path.getsize(self.db_name + "-wal")}
+            except OSError:
+                return {"wal_bytes": 0}
+        return {
+            "wal_bytes": c.wal_bytes,
+            "passive": c.checkpoints.get("PASSIVE", 0),
+            "truncate": c.checkpoints.get("TRUNCATE", 0),
+            "gave_up": c.gave_up,
+            "last_mode": c.last_mode,
+            "last_ms": c.last_ms,
+            "max_ms": c.max_ms,
+            "total_ms": c.total_ms,
+            "lagging": c.wal_bytes >= 2 * CHECKPOINT_PASSIVE_BYTES,
+            "error": c.last_error,
+        }
+
+    # ---------------- online migration ----------------
+    @property
+    def migration_done(self) -> bool:
+        return self._migrated and not self._legacy_reading
+
+    def wait_for_migration(self, timeout: Optional[float] = None) -> bool:
+        if self._migration_thread is not None:
+            self._migration_thread.join(timeout)
+        return self.migration_done
+
+    def _run_migration(self) -> None:
+        try:
+            for step in (self._migration_step, self._reading_migration_step):
+                while not self._stop.is_set() and step(MIGRATION_CHUNK_ROWS):
+                    # give the tick loop / background writer a turn at the writer lock
+                    self._stop.wait(MIGRATION_PAUSE_SEC)
+        except Exception as e:
+            self.migration_error = e
+
+    def _migration_step(self, chunk_rows: int) -> bool:
+        """Copy one chunk of the legacy 'readings' table into the partitions. Returns False when finished."""
+        if self._migrated:
+            return False
+        try:
+            with self.pool.writer() as conn:
+                cursor = self._meta_get(conn, "series_migration_cursor") or ""
+                rows = conn.execute(
+                    "SELECT ts, temp, humidity, light, rain, soil FROM readings WHERE ts > ? ORDER BY ts LIMIT ?",
+                    (cursor, int(chunk_rows)),
+                ).fetchall()
+                if not rows:
+                    conn.execute("DROP TABLE readings")
+                    self._create_readings_view(conn)
+                    self._meta_set(conn, "series_migration_cursor", None)
+                    # flipped while we still hold the writer lock, so no write can miss it
+                    self._migrated = True
+                    self.hot.invalidate()
+                    return False
+
+                out = []
+                for r in rows:
+                    try:
+                        out.append((to_epoch(r[0]), r[1], r[2], r[3], r[4], r[5]))
+                    except (TypeError, ValueError):
+                        self.migration_skipped += 1
+                # rows written since the migration started are already there and newer: keep them
+                self._write_series(conn, out, "IGNORE")
+                if out:
+                    t_lo = min(r[0] for r in out)
+                    t_hi = max(r[0] for r in out)
+                    db_rollups.rebuild(conn, SENSOR_NAMES, self._rollup_tiers(), t_lo, t_hi)
+                    self._max_t = max(self._max_t, t_hi)
+                self._meta_set(conn, "series_migration_cursor", rows[-1][0])
+                self.migration_copied += len(out)
+            return True
+        except BaseException:
+            # the swap was rolled back (or never happened): keep dual-writing
+            self._migrated = False
+            self._reload_partitions()
+            raise
+
+    def _reading_migration_step(self, chunk_rows: int) -> bool:
+        """Copy one chunk of the legacy 'Reading' table into reading_YYYYMM. Returns False when finished."""
+        if not self._legacy_reading:
+            return False
+        try:
+            with self.pool.writer() as conn:
+                cursor = int(self._meta_get(conn, "reading_migration_cursor") or 0)
+                rows = conn.execute(
+                    "SELECT id, sensor_id, value, recorded_at FROM Reading WHERE id > ? ORDER BY id LIMIT ?",
+                    (cursor, int(chunk_rows)),
+                ).fetchall()
+                if not rows:
+                    conn.execute("DROP TABLE Reading")
+                    self._meta_set(conn, "reading_migration_cursor", None)
+                    self._legacy_reading = False
+                    db_partitions.rebuild_views(conn, self._parts, SENSOR_NAMES)
+                    return False
+
+                out = []
+                for _, sid, value, recorded_at in rows:
+                    try:
+                        # everything from before zones belongs to the default zone
+                        out.append((DEFAULT_ZONE_ID, int(sid), to_epoch(recorded_at), float(value)))
+                    except (TypeError, ValueError):
+                        self.migration_skipped += 1
+                self._write_normalized(conn, out, "IGNORE")
+                self._meta_set(conn, "reading_migration_cursor", str(rows[-1][0]))
+                self.migration_copied += len(out)
+            return True
+        except BaseException:
+            self._legacy_reading = True
+            self._reload_partitions()
+            raise
+
+    @staticmethod
+    def _load_sensor_ids(conn: sqlite3.Connection) -> Dict[int, Tuple[int, ...]]:
+        # zone -> sensor ids in SENSOR_NAMES order
+        out = {}
+        for zone_id, ids in db_zones.load_sensor_ids(conn).items():
+            for name in SENSOR_NAMES:
+                if name not in ids:
+                    raise RuntimeError(f"Sensor missing: {name} (zone {zone_id})")
+            out[zone_id] = tuple(ids[name] for name in SENSOR_NAMES)
+        return out
+
+    def _new_compressors(self) -> Dict[int, SwingingDoor]:
+        if not self._compress_on:
+            return {}
+        return {
+            i: SwingingDoor(*COMPRESSION[name], max_gap=COMPRESSION_MAX_GAP_SEC)
+            for i, name in enumerate(SENSOR_NAMES, start=1) if name in COMPRESSION
+        }
+
+    def _reading_row(self, temp: float, humidity: float, light: float, rain: float, soil: float, ts=None) -> ReadingRow:
+        return (to_epoch(ts), float(temp), float(humidity), float(light), float(rain), float(soil))
+
+    def _compress(self, rows: Sequence[ReadingRow]) -> List[tuple]:
+        """Raw rows -> the (t, ...) rows to store, NULL where a sensor has nothing to keep."""
+        out: Dict[int, list] = {}
+        for row in rows:
+            t = row[0]
+            for i in range(1, len(SENSOR_NAMES) + 1):
+                c = self._compressors.get(i)
+                for pt, pv in (c.push(t, row[i]) if c is not None else [(t, row[i])]):
+                    out.setdefault(pt, [pt] + [None] * len(SENSOR_NAMES))[i] = pv
+        return [tuple(r) for r in out.values()]
+
+    def _store_rows(self, conn: sqlite3.Connection, rows: Sequence[tuple]) -> None:
+        self._write_series(conn, rows)
+        # normalized readings: one row per stored value
+        sids = self._sensor_ids
+        self._write_normalized(conn, [
+            (DEFAULT_ZONE_ID, sid, row[0], row[i])
+            for row in rows for i, sid in enumerate(sids, start=1) if row[i] is not None
+        ])
+
+    def _flush_compressors(self) -> None:
+        """Store the points the compressors still hold (on shutdown)."""
+        out: Dict[int, list] = {}
+        for i, c in self._compressors.items():
+            for pt, pv in c.flush():
+                out.setdefault(pt, [pt] + [None] * len(SENSOR_NAMES))[i] = pv
+        zone_rows = [
+            (zone_id, self._zone_sensor_ids[zone_id][i - 1], pt, pv)
+            for zone_id, comps in self._zone_compressors.items()
+            for i, c in comps.items() for pt, pv in c.flush()
+        ]
+        if out or zone_rows:
+            with self.pool.writer() as conn:
+                self._store_rows(conn, [tuple(r) for r in out.values()])
+                self._write_normalized(conn, zone_rows)
+
+    def _clear_rewritten(self, conn: sqlite3.Connection, t: int) -> None:
+        """
+        The clock went back to t: drop what the old run stored from t on (and the point
+        the compressors hold from it). Compressed points cannot be overwritten one
+        timestamp at a time, the old ones left between the new ones would still be
+        interpolated.
+        """
+        hi = self._max_t
+        sids = self._sensor_ids
+        marks = ", ".join("?" * len(sids))
+        for key in db_partitions.overlapping(self._parts, t, hi):
+            self._query_part(conn, f"DELETE FROM {series_table(key)} WHERE t >= ?", (t,))
+            self._query_part(
+                conn,
+                f"DELETE FROM {reading_table(key)} WHERE zone_id = ? AND sensor_id IN ({marks}) AND t >= ?",
+                (DEFAULT_ZONE_ID, *sids, t),
+            )
+        db_rollups.rebuild(conn, SENSOR_NAMES, self._rollup_tiers(), t, hi)
+        self.hot.truncate(t)
+        for c in self._compressors.values():
+            c.reset()
+        self._max_t = t - 1
+
+    def _insert_rows(self, conn: sqlite3.Connection, rows: Sequence[ReadingRow]) -> None:
+        if not self._compressors:
+            self._insert_run(conn, rows)
+            return
+        # split where the clock went back, so each rewind clears before its rows are stored
+        start = 0
+        for i in range(1, len(rows) + 1):
+            if i == len(rows) or rows[i][0] < rows[i - 1][0]:
+                if rows[start][0] < self._max_t:
+                    self._clear_rewritten(conn, rows[start][0])
+                self._insert_run(conn, rows[start:i])
+                start = i
+
+    def _insert_run(self, conn: sqlite3.Connection, rows: Sequence[ReadingRow]) -> None:
+        # rollups and the hot tier see every raw row; only the compressed points are stored
+        self._store_rows(conn, self._compress(rows) if self._compressors else rows)
+        self._update_rollups(conn, rows)
+        self.hot.append(rows)
+        if not self._migrated:
+            # dual-write until the legacy table has been copied over
+            conn.executemany(
+                "INSERT OR REPLACE INTO readings (ts, temp, humidity, light, rain, soil) "
+                "VALUES (datetime(?, 'unixepoch'), ?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    def _rollup_tiers(self) -> Tuple[int, ...]:
+        # a tier no coarser than the tick holds one bucket per reading, a copy of the raw rows
+        return tuple(w for w in ROLLUP_TIERS_SEC if self._tick_sec is None or w > self._tick_sec)
+
+    def _note_tick(self, conn: sqlite3.Connection, rows: Sequence[ReadingRow]) -> Optional[int]:
+        # gaps within this session only: the one across a restart is downtime, not the tick.
+        # Returns where the tick first got shorter, if it did.
+        tick = self._tick_sec
+        prev = self._session_t
+        since = None
+        for row in rows:
+            t = row[0]
+            if prev is not None and t > prev and (tick is None or t - prev < tick):
+                tick = t - prev
+                if since is None:
+                    since = prev
+            prev = t
+        self._session_t = prev
+        if tick != self._tick_sec:
+            self._tick_sec = tick
+            self._meta_set(conn, "tick_sec", str(tick))
+            # whatever the first rows put into them before the tick was known
+            db_rollups.delete(conn, [w for w in ROLLUP_TIERS_SEC if w <= tick])
+        return since
+
+    def _update_rollups(self, conn: sqlite3.Connection, rows: Sequence[ReadingRow]) -> None:
+        # rows newer than anything stored are merged in; a rewritten timestamp
+        # (e.g. the sim clock was reset) rebuilds just the buckets it touches
+        kept = self._rollup_tiers()
+        since = self._note_tick(conn, rows)
+        tiers = self._rollup_tiers()
+        fresh: Dict[int, ReadingRow] = {}
+        stale: List[int] = []
+        for row in rows:
+            t = row[0]
+            if t <= self._max_t or t in fresh:
+                stale.append(t)
+            else:
+                fresh[t] = row
+        # a tier the shorter tick brought back starts where that tick did, from 'series'
+        added = [w for w in tiers if w not in kept]
+        db_rollups.merge(conn, SENSOR_NAMES, [w for w in tiers if w in kept], list(fresh.values()))
+        if added:
+            db_rollups.rebuild(conn, SENSOR_NAMES, added, since, max(row[0] for row in rows))
+        if stale:
+            db_rollups.rebuild(conn, SENSOR_NAMES, tiers, min(stale), max(stale))
+        if fresh:
+            self._max_t = max(self._max_t, max(fresh))
+
+    def _write_batch(self, items: List[WriteItem]) -> None:
+        by_kind: Dict[str, list] = {}
+        for kind, payload in items:
+            by_kind.setdefault(kind, []).append(payload)
+        try:
+            with self.pool.writer() as conn:
+                for kind, payloads in by_kind.items():
+                    self._batch_handlers[kind](conn, payloads)
+        except Exception:
+            self._write_failed()
+            raise
+
+    def insert_reading(self, temp: float, humidity: float, light: float, rain: float, soil: float, ts=None) -> None:
+        row = self._reading_row(temp, humidity, light, rain, soil, ts)
+        self._write_batch([("reading", row)])
+
+    def insert_readings_bulk(self, rows: Iterable[Sequence], chunk_size: int = BULK_CHUNK_ROWS) -> int:
+        """
+        Insert many (ts, temp, humidity, light, rain, soil) rows in ONE transaction.
+        The iterable is consumed in chunks, so it can be a generator over millions of samples.
+        Returns the number of rows written.
+        """
+        chunk_size = max(1, int(chunk_size))
+        it = iter(rows)
+        total = 0
+        try:
+            with self.pool.writer() as conn:
+                while True:
+                    chunk = [self._reading_row(*r[1:6], ts=r[0]) for r in islice(it, chunk_size)]
+                    if not chunk:
+                        break
+                    self._insert_rows(conn, chunk)
+                    total += len(chunk)
+        except Exception:
+            self._write_failed()
+            raise
+        return total
+
+    def record_ticks(self, ticks: Iterable[Tuple[object, Sequence[float], Dict[str, bool], Dict[str, float]]],
+                     chunk_size: int = BULK_CHUNK_ROWS) -> int:
+        """
+        Bulk counterpart of submit_reading + submit_actuators + add_runtime_hours for
+        fast-forward runs: one (ts, (temp, humidity, light, rain, soil), actions,
+        runtime deltas) per tick. The iterable is consumed in chunks, one transaction
+        per chunk (so the WAL stays small). Returns the number of ticks written.
+        """
+        self.flush()
+        chunk_size = max(1, int(chunk_size))
+        it = iter(ticks)
+        total = 0
+        while True:
+            items: List[WriteItem] = []
+            n = 0
+            for ts, vals, actions, deltas in islice(it, chunk_size):
+                items.append(("reading", self._reading_row(*vals, ts=ts)))
+                items.append(("actuators", (to_epoch(ts), {k: bool(v) for k, v in actions.items()})))
+                deltas = {k: float(v) for k, v in deltas.items() if v}
+                if deltas:
+                    items.append(("runtime", deltas))
+                n += 1
+            if not n:
+                return total
+            self._write_batch(items)
+            total += n
+
+    def submit_reading(self, temp: float, humidity: float, light: float, rain: float, soil: float, ts=None,
+                       timeout: Optional[float] = None) -> None:
+        """Queue a reading for the background writer (falls back to insert_reading)."""
+        if self.writer is None:
+            self.insert_reading(temp, humidity, light, rain, soil, ts=ts)
+            return
+        self.writer.submit("reading", self._reading_row(temp, humidity, light, rain, soil, ts), timeout=timeout)
+
+    # ---------------- actuator history ----------------
+    def _load_actuators(self, conn: sqlite3.Connection) -> None:
+        self._actuator_on, last = db_actuators.load_open(conn)
+        # the last tick seen, not the last transition: an open interval runs up to it
+        seen = self._meta_get(conn, "actuator_last_t")
+        self._actuator_last_t = int(seen) if seen is not None else last
+
+    def _apply_actuator_states(self, conn: sqlite3.Connection, payloads: List[Tuple[int, Dict[str, bool]]]) -> None:
+        for t, states in payloads:
+            running: Dict[str, int] = {}
+            if self._actuator_last_t is not None and t < self._actuator_last_t:
+                # the clock went back (e.g. a restart with the sim clock): the old run's
+                # intervals from t on are replaced by what this run records
+                running = db_actuators.truncate(conn, t)
+                self._actuator_on = {}
+            for name, on in states.items():
+                on_t = self._actuator_on.get(name)
+                if on and on_t is None:
+                    on_t = running.get(name, t)
+                    db_actuators.open_interval(conn, name, on_t)
+                    self._actuator_on[name] = on_t
+                elif not on and on_t is not None:
+                    db_actuators.close_interval(conn, name, on_t, t)
+                    del self._actuator_on[name]
+            self._actuator_last_t = t
+        if payloads:
+            self._meta_set(conn, "actuator_last_t", str(self._actuator_last_t))
+
+    def record_actuators(self, actions: Dict[str, bool], ts=None) -> None:
+        """Record the actuator states of one tick; only changes are written."""
+        self._write_batch([("actuators", (to_epoch(ts), {k: bool(v) for k, v in actions.items()}))])
+
+    def submit_actuators(self, actions: Dict[str, bool], ts=None, timeout: Optional[float] = None) -> None:
+        """Queue actuator states for the background writer (falls back to record_actuators)."""
+        if self.writer is None:
+            self.record_actuators(actions, ts=ts)
+            return
+        self.writer.submit("actuators", (to_epoch(ts), {k: bool(v) for k, v in actions.items()}), timeout=timeout)
+
+    def actuator_state_at(self, actuator: str, ts) -> bool:
+        with self.pool.reader() as conn:
+            return db_actuators.state_at(conn, actuator, to_epoch(ts))
+
+    def actuator_duty_cycle(self, actuator: str, start, end) -> float:
+        """Fraction of [start, end) the actuator was ON (an interval still open counts up to `end`)."""
+        t0, t1 = to_epoch(start), to_epoch(end)
+        if t1 <= t0:
+            return 0.0
+        with self.pool.reader() as conn:
+            return db_actuators.on_seconds(conn, actuator, t0, t1) / float(t1 - t0)
+
+    def actuator_switches_per_day(self, actuator: str, start, end) -> List[Tuple[dt.date, int]]:
+        """(day, OFF->ON switches) for each day in [start, end) with at least one switch."""
+        with self.pool.reader() as conn:
+            rows = db_actuators.switches_per_day(conn, actuator, to_epoch(start), to_epoch(end))
+        return [(from_epoch(day).date(), n) for day, n in rows]
+
+    # ---------------- maintenance runtime ----------------
+    @staticmethod
+    def _add_runtime(conn: sqlite3.Connection, payloads: List[Dict[str, float]]) -> None:
+        # a batch may hold many ticks: one UPSERT per counter
+        total: Dict[str, float] = {}
+        for deltas in payloads:
+            for name, h in deltas.items():
+                total[name] = total.get(name, 0.0) + h
+        conn.executemany(
+            "INSERT INTO runtime_counter (name, hours) VALUES (?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET hours = hours + excluded.hours",
+            [(name, h) for name, h in total.items() if h],
+        )
+
+    def add_runtime_hours(self, deltas: Dict[str, float], timeout: Optional[float] = None) -> None:
+        """
+        Add hours to the runtime counters. Queued (write-behind) with async writes,
+        so a tick costs no commit of its own; a crash loses at most what is queued.
+        """
+        deltas = {k: float(v) for k, v in deltas.items() if v}
+        if not deltas:
+            return
+        if self.writer is None:
+            self._write_batch([("runtime", deltas)])
+            return
+        self.writer.submit("runtime", deltas, timeout=timeout)
+
+    def load_runtime_hours(self) -> Dict[str, float]:
+        with self.pool.reader() as conn:
+            return {str(name): float(h) for name, h in conn.execute("SELECT name, hours FROM runtime_counter")}
+
+    def reset_runtime_hours(self, name: str) -> None:
+        """Zero one counter (after maintenance was done)."""
+        self.flush()
+        with self.pool.writer() as conn:
+            conn.execute("DELETE FROM runtime_counter WHERE name = ?", (name,))
+
+    # ---------------- greenhouses / zones ----------------
+    def add_greenhouse(self, name: str) -> int:
+        """Id of the greenhouse called `name` (created if missing)."""
+        with self.pool.writer() as conn:
+            return db_zones.ensure_greenhouse(conn, name)
+
+    def add_zone(self, greenhouse_id: int, name: str) -> int:
+        """Id of zone `name` of a greenhouse (created with its sensors if missing)."""
+        with self.pool.writer() as conn:
+            zone_id = db_zones.ensure_zone(conn, int(greenhouse_id), name)
+            db_zones.ensure_sensors(conn, zone_id, _SENSOR_SPECS)
+            ids = self._load_sensor_ids(conn)
+        # replaced, never mutated: writer and readers may be using the old dict
+        self._zone_sensor_ids = ids
+        return zone_id
+
+    def zones(self) -> List[Tuple[int, int, str, str]]:
+        """(zone id, greenhouse id, greenhouse name, zone name) for every zone."""
+        with self.pool.reader() as conn:
+            return db_zones.list_zones(conn)
+
+    def _zone_tick(self, values: Dict[int, Sequence[float]], ts) -> List[ZoneRow]:
+        t = to_epoch(ts)
+        out = []
+        for zone_id, (temp, humidity, light, rain, soil) in values.items():
+            if int(zone_id) not in self._zone_sensor_ids:
+                raise ValueError(f"Unknown zone: {zone_id}")
+            out.append((int(zone_id),) + self._reading_row(temp, humidity, light, rain, soil, t))
+        return out
+
+    def _insert_zone_rows(self, conn: sqlite3.Connection, rows: Sequence[ZoneRow]) -> None:
+        # the default zone takes the full path (series, rollups, hot tier); the others are
+        # compressed per zone and stored in the normalized partitions only
+        main = [row[1:] for row in rows if row[0] == DEFAULT_ZONE_ID]
+        if main:
+            self._insert_rows(conn, main)
+        out = []
+        for row in rows:
+            zone_id, t = row[0], row[1]
+            if zone_id == DEFAULT_ZONE_ID:
+                continue
+            comps = self._zone_compressors.get(zone_id)
+            if comps is None:
+                comps = self._zone_compressors[zone_id] = self._new_compressors()
+            for i, sid in enumerate(self._zone_sensor_ids[zone_id], start=1):
+                c = comps.get(i)
+                for pt, pv in (c.push(t, row[i + 1]) if c is not None else [(t, row[i + 1])]):
+                    out.append((zone_id, sid, pt, pv))
+        self._write_normalized(conn, out)
+
+    def _insert_zone_ticks(self, conn: sqlite3.Connection, payloads: List[List[ZoneRow]]) -> None:
+        self._insert_zone_rows(conn, [row for rows in payloads for row in rows])
+
+    def insert_zone_readings(self, rows: Iterable[Sequence], chunk_size: int = BULK_CHUNK_ROWS) -> int:
+        """
+        Insert many (zone_id, ts, temp, humidity, light, rain, soil) rows in ONE transaction
+        (hundreds of zones per tick, or a backfill), consumed in chunks like
+        insert_readings_bulk(). Returns the number of rows written.
+        """
+        chunk_size = max(1, int(chunk_size))
+        it = iter(rows)
+        total = 0
+        try:
+            with self.pool.writer() as conn:
+                while True:
+                    chunk = [row for r in islice(it, chunk_size) for row in self._zone_tick({r[0]: r[2:7]}, r[1])]
+                    if not chunk:
+                        break
+                    self._insert_zone_rows(conn, chunk)
+                    total += len(chunk)
+        except Exception:
+            self._write_failed()
+            raise
+        return total
+
+    def record_zone_tick(self, values: Dict[int, Sequence[float]], ts=None) -> None:
+        """One tick of many zones, {zone_id: (temp, humidity, light, rain, soil)}, in one transaction."""
+        self._write_batch([("zones", self._zone_tick(values, ts))])
+
+    def submit_zone_tick(self, values: Dict[int, Sequence[float]], ts=None, timeout: Optional[float] = None) -> None:
+        """Queue a multi-zone tick for the background writer (falls back to record_zone_tick)."""
+        if self.writer is None:
+            self.record_zone_tick(values, ts=ts)
+            return
+        self.writer.submit("zones", self._zone_tick(values, ts), timeout=timeout)
+
+    def _zone_points(self, conn: sqlite3.Connection, zone_id: int, col: int,
+                     t0: int, t1: int, desc: bool = False) -> Iterator[Tuple[int, float]]:
+        """
+        Stored (t, value) of one zone's sensor (column index col) in [t0, t1]: one
+        (zone_id, sensor_id, t) index range per month, the block archive, and the
+        point the compressor still holds.
+        """
+        sid = self._zone_sensor_ids[zone_id][col - 1]
+
+        def parts() -> Iterator[Tuple[int, float]]:
+            keys = db_partitions.overlapping(self._parts, t0, t1)
+            order = "DESC" if desc else "ASC"
+            for key in (reversed(keys) if desc else keys):
+                cur = self._query_part(
+                    conn,
+                    f"SELECT t, value FROM {reading_table(key)} "
+                    f"WHERE zone_id = ? AND sensor_id = ? AND t >= ? AND t <= ? ORDER BY t {order}",
+                    (zone_id, sid, t0, t1),
+                )
+                if cur is not None:
+                    yield from cur
+
+        rows = parts()
+        if self._archive_until is not None and t0 < self._archive_until:
+            stream = self._archive_stream(zone_id, SENSOR_NAMES[col - 1])
+            cold = db_archive.points(conn, stream, t0, min(t1, self._archive_until - 1), desc)
+            rows = self._merge_rows(rows, cold, desc)
+        comps = self._compressors if zone_id == DEFAULT_ZONE_ID else self._zone_compressors.get(zone_id, {})
+        held = comps[col].pending() if col in comps else None
+        if held is not None and t0 <= held[0] <= t1:
+            rows = self._merge_rows(rows, iter([held]), desc)
+        return rows
+
+    def fetch_zone(self, zone_id: int, sensor: str, start=None, end=None) -> List[Tuple[dt.datetime, float]]:
+        """
+        One sensor of one zone in [start, end] (open ends when None) as (timestamp, value),
+        oldest first. With compression on these are the kept points: the nearest one
+        outside each end is included, so the line through them covers the whole range.
+        """
+        if sensor not in SENSOR_NAMES:
+            raise ValueError(f"Unknown sensor: {sensor}")
+        zone_id = int(zone_id)
+        if zone_id not in self._zone_sensor_ids:
+            raise ValueError(f"Unknown zone: {zone_id}")
+        col = SENSOR_NAMES.index(sensor) + 1
+        t0 = _MIN_T if start is None else to_epoch(start)
+        t1 = _MAX_T if end is None else to_epoch(end)
+
+        with self.pool.reader() as conn:
+            rows = list(self._zone_points(conn, zone_id, col, t0, t1))
+            if self._compress_on:
+                if t0 > _MIN_T and (not rows or rows[0][0] > t0):
+                    p = next(self._zone_points(conn, zone_id, col, _MIN_T, t0 - 1, desc=True), None)
+                    if p is not None:
+                        rows.insert(0, p)
+                if t1 < _MAX_T and (not rows or rows[-1][0] < t1):
+                    p = next(self._zone_points(conn, zone_id, col, t1 + 1, _MAX_T), None)
+                    if p is not None:
+                        rows.append(p)
+        return [(from_epoch(t), v) for t, v in rows]
+
+    # ---------------- queries ----------------
+    @staticmethod
+    def _decode(rows: List[tuple]) -> List[SeriesRow]:
+        return [(from_epoch(t), a, b, c, d, e) for t, a, b, c, d, e in rows]
+
+    @staticmethod
+    def _decode_legacy(rows: List[tuple]) -> List[SeriesRow]:
+        return [(dt.datetime.fromisoformat(ts), a, b, c, d, e) for ts, a, b, c, d, e in rows]
+
+    def _hot_ready(self) -> bool:
+        if not self._migrated:
+            return False
+        if not self.hot.valid:
+            # load under the writer lock so no append can slip in between the read and the load
+            with self.pool.writer() as conn:
+                rows = list(self._scan(conn, _MIN_T, _MAX_T, desc=True, limit=self.hot.capacity + 1))
+                rows.reverse()
+                rows = self._fill(conn, rows)
+                self.hot.load(rows, complete=len(rows) <= self.hot.capacity)
+        return self.hot.valid
+
+    def _series_range(self, t0: int, t1: int, limit: Optional[int] = None) -> List[tuple]:
+        """Raw (t, ...) rows in [t0, t1]: the hot tier first, SQLite only for what is older."""
+        view = self.hot.view(t0, t1) if self._hot_ready() else None
+        if view is not None and view[1] is None:
+            return view[0] if limit is None else view[0][:limit]
+
+        hi = t1 if view is None else min(t1, view[1] - 1)
+        with self.pool.reader() as conn:
+            rows = self._fill(conn, list(self._scan(conn, t0, hi, limit=limit)))
+        if view is not None:
+            rows += view[0]
+        return rows if limit is None else rows[:limit]
+
+    def iter_chunks(self, start=None, end=None, chunk_size: int = ITER_CHUNK_ROWS) -> Iterator[List[SeriesRow]]:
+        """
+        Rows in [start, end] (open ends when None), oldest first, as lists of at most
+        chunk_size rows. Each chunk is its own keyset query, so memory stays bounded
+        and no read transaction is held open between chunks.
+        """
+        chunk_size = max(1, int(chunk_size))
+        if self._migrated:
+            t = _MIN_T if start is None else to_epoch(start)
+            t1 = _MAX_T if end is None else to_epoch(end)
+            while t <= t1:
+                rows = self._series_range(t, t1, chunk_size)
+                if not rows:
+                    return
+                yield self._decode(rows)
+                if len(rows) < chunk_size:
+                    return
+                t = rows[-1][0] + 1
+            return
+
+        # legacy table (migration still running): keyset on the text key
+        lo = "" if start is None else from_epoch(to_epoch(start)).isoformat(sep=" ")
+        hi = "9999" if end is None else from_epoch(to_epoch(end)).isoformat(sep=" ")
+        op = ">="
+        while True:
+            with self.pool.reader() as conn:
+                rows = conn.execute(
+                    f"SELECT ts, temp, humidity, light, rain, soil FROM readings WHERE ts {op} ? AND ts <= ? "
+                    f"ORDER BY ts ASC LIMIT ?",
+                    (lo, hi, chunk_size),
+                ).fetchall()
+            if not rows:
+                return
+            yield self._decode_legacy(rows)
+            if len(rows) < chunk_size:
+                return
+            lo, op = rows[-1][0], ">"
+
+    def iter_range(self, start=None, end=None, chunk_size: int = ITER_CHUNK_ROWS) -> Iterator[SeriesRow]:
+        """Row-by-row view of iter_chunks(): stream history without materializing it."""
+        for chunk in self.iter_chunks(start, end, chunk_size):
+            yield from chunk
+
+    def fetch_all(self) -> List[SeriesRow]:
+        """Whole history as a list; prefer iter_range() for anything that can be streamed."""
+        return list(self.iter_range())
+
+    def fetch_since(self, since_ts) -> List[SeriesRow]:
+        return list(self.iter_range(start=since_ts))
+
+    def fetch_last_n(self, n: int) -> List[SeriesRow]:
+        if self._migrated:
+            rows = self.hot.last(int(n)) if self._hot_ready() else None
+            if rows is not None:
+                return self._decode(rows)
+        with self.pool.reader() as conn:
+            if self._migrated:
+                rows = list(self._scan(conn, _MIN_T, _MAX_T, desc=True, limit=int(n)))
+                return self._decode(self._fill(conn, list(reversed(rows))))
             cur = conn.execute(
                 "SELECT ts, temp, humidity, light, rain, soil FROM readings ORDER BY ts DESC LIMIT ?",
                 (int(n),),
             )
-            rows = cur.fetchall()
-            return list(reversed(rows))
+            return self._decode_legacy(list(reversed(cur.fetchall())))
+
+    def fetch_after(self, cursor=None, limit: Optional[int] = None) -> List[SeriesRow]:
+        """Rows strictly newer than `cursor` (all rows when None); the last row's ts is the next cursor."""
+        if self._migrated:
+            t0 = _MIN_T if cursor is None else to_epoch(cursor) + 1
+            return self._decode(self._series_range(t0, _MAX_T, limit))
+        after = "" if cursor is None else from_epoch(to_epoch(cursor)).isoformat(sep=" ")
+        with self.pool.reader() as conn:
+            cur = conn.execute(
+                "SELECT ts, temp, humidity, light, rain, soil FROM readings WHERE ts > ? ORDER BY ts ASC LIMIT ?",
+                (after, -1 if limit is None else int(limit)),
+            )
+            return self._decode_legacy(cur.fetchall())
+
+    def fetch_columns(self, sensors: Sequence[str] = SENSOR_NAMES, start=None, end=None) -> Dict[str, "np.ndarray"]:
+        """
+        Columnar history for [start, end] (open ends when None):
+          {"t": datetime64[s], "epoch": float64 seconds, <sensor>: float64 (NaN for gaps), ...}
+        Built straight from the cursor with np.fromiter (and from the hot tier's
+        arrays for recent data), no intermediate tuple list.
+        """
+        if np is None:
+            raise RuntimeError("fetch_columns() requires numpy")
+        sensors = list(sensors)
+        for s in sensors:
+            if s not in SENSOR_NAMES:
+                raise ValueError(f"Unknown sensor: {s}")
+
+        t0 = _MIN_T if start is None else to_epoch(start)
+        t1 = _MAX_T if end is None else to_epoch(end)
+        cols = "".join(f", {s}" for s in sensors)
+        dtype = np.dtype([("t", "i8")] + [(s, "f8") for s in sensors])
+
+        view = self.hot.column_view(t0, t1) if self._hot_ready() else None
+        parts = []
+        if view is None or view[2] is not None:
+            with self.pool.reader() as conn:
+                if self._migrated:
+                    hi = t1 if view is None else min(t1, view[2] - 1)
+                    cur = self._scan(conn, t0, hi, cols=f"t{cols}")
+                else:
+                    cur = conn.execute(
+                        f"SELECT t{cols} FROM (SELECT CAST(strftime('%s', ts) AS INTEGER) AS t{cols} FROM readings) "
+                        f"WHERE t >= ? AND t <= ? ORDER BY t ASC",
+                        (t0, t1),
+                    )
+                arr = np.fromiter(cur, dtype=dtype)
+                if self._migrated and len(arr):
+                    for s in sensors:
+                        self._fill_array(conn, s, arr["t"], arr[s])
+            parts.append((arr["t"], [arr[s] for s in sensors]))
+        if view is not None:
+            ts, hot_cols, _ = view
+            picked = [np.frombuffer(hot_cols[SENSOR_NAMES.index(s)], dtype="f8") for s in sensors]
+            parts.append((np.frombuffer(ts, dtype="i8"), picked))
+
+        t = np.concatenate([p[0] for p in parts]) if len(parts) > 1 else np.ascontiguousarray(parts[0][0])
+        out = {"t": t.astype("datetime64[s]"), "epoch": t.astype("f8")}
+        for i, s in enumerate(sensors):
+            out[s] = np.concatenate([p[1][i] for p in parts]) if len(parts) > 1 else np.array(parts[0][1][i])
+        return out
+
+    def fetch_rollup(self, sensor: str, start=None, end=None,
+                     min_points: int = GRAPH_MIN_POINTS) -> Tuple[int, List[Tuple[dt.datetime, float, float, float, int]]]:
+        """
+        History of one sensor as (bucket start, min, max, avg, count) rows, from the
+        coarsest rollup tier that still gives at least `min_points` buckets for the
+        range (tier 0 = raw rows). Returns (tier_seconds, rows).
+        """
+        if sensor not in SENSOR_NAMES:
+            raise ValueError(f"Unknown sensor: {sensor}")
+        with self.pool.reader() as conn:
+            lo, hi = self._edge_t(conn, newest=False), self._edge_t(conn, newest=True)
+            if lo is None:
+                return 0, []
+            t0 = to_epoch(start) if start is not None else int(lo)
+            t1 = to_epoch(end) if end is not None else int(hi)
+
+            tier = db_rollups.pick_tier(t1 - t0, min_points, self._rollup_tiers())
+            rows = []
+            raw_until = t1
+            if tier:
+                # a tier only kept since the tick got shorter: raw rows (as sparse as that tick) before it
+                first = db_rollups.first_bucket(conn, tier)
+                raw_until = t1 if first is None else min(t1, first - 1)
+                rows = db_rollups.fetch(conn, sensor, tier, t0, t1)
+            if raw_until >= t0:
+                cur = self._scan(conn, t0, raw_until, cols=f"t, {sensor}")
+                rows = [(t, v, v, v, 1) for t, v in cur if v is not None] + rows
+        return tier, [(from_epoch(b), mn, mx, avg, n) for b, mn, mx, avg, n in rows]
+
+    def fetch_bucketed(self, sensor: str, start=None, end=None, buckets: int = GRAPH_MIN_POINTS) -> List[BucketRow]:
+        """
+        One sensor over [start, end] (the stored history when None) cut into at most
+        `buckets` equal time buckets, as (bucket start, min, max, avg, first, last, count)
+        rows for the non-empty ones. The partitions are aggregated in SQL (GROUP BY on
+        the integer bucket number; first/last are primary key lookups at each bucket's
+        min(t)/max(t)), so only the bucket rows reach Python; archived months are
+        bucketed while their blocks are decoded. With compression on the aggregates
+        cover the kept points, as the rollups do.
+        """
+        if sensor not in SENSOR_NAMES:
+            raise ValueError(f"Unknown sensor: {sensor}")
+        buckets = max(1, int(buckets))
+        with self.pool.reader() as conn:
+            t0 = to_epoch(start) if start is not None else self._edge_t(conn, newest=False)
+            t1 = to_epoch(end) if end is not None else self._edge_t(conn, newest=True)
+            if t0 is None or t1 is None or t1 < t0:
+                return []
+            width = max(1, -(-(t1 - t0 + 1) // buckets))
+
+            # bucket -> [min, max, sum, count, first t, first value, last t, last value]
+            acc: Dict[int, list] = {}
+
+            def fold(b: int, mn: float, mx: float, sm: float, n: int, tf: int, vf: float, tl: int, vl: float) -> None:
+                a = acc.get(b)
+                if a is None:
+                    acc[b] = [mn, mx, sm, n, tf, vf, tl, vl]
+                    return
+                a[0], a[1], a[2], a[3] = min(a[0], mn), max(a[1], mx), a[2] + sm, a[3] + n
+                if tf < a[4]:
+                    a[4], a[5] = tf, vf
+                if tl > a[6]:
+                    a[6], a[7] = tl, vl
+
+            for key in db_partitions.overlapping(self._parts, t0, t1):
+                table = series_table(key)
+                cur = self._query_part(
+                    conn,
+                    f"""
+                    SELECT g.b, g.mn, g.mx, g.sm, g.n,
+                           g.tf, (SELECT {sensor} FROM {table} WHERE t = g.tf),
+                           g.tl, (SELECT {sensor} FROM {table} WHERE t = g.tl)
+                    FROM (
+                        SELECT (t - ?1) / ?2 AS b, min({sensor}) AS mn, max({sensor}) AS mx,
+                               sum({sensor}) AS sm, count(*) AS n, min(t) AS tf, max(t) AS tl
+                        FROM {table}
+                        WHERE t >= ?1 AND t <= ?3 AND {sensor} IS NOT NULL
+                        GROUP BY b
+                    ) AS g
+                    """,
+                    (t0, width, t1),
+                )
+                for row in (cur if cur is not None else ()):
+                    fold(*row)
+
+            if self._archive_until is not None and t0 < self._archive_until:
+                hi = min(t1, self._archive_until - 1)
+                for t, v in db_archive.points(conn, sensor, t0, hi):
+                    fold((t - t0) // width, v, v, v, 1, t, v, t, v)
+            held = self._held(sensor)
+            if held is not None and t0 <= held[0] <= t1:
+                t, v = held
+                fold((t - t0) // width, v, v, v, 1, t, v, t, v)
+
+        return [
+            (from_epoch(t0 + b * width), a[0], a[1], a[2] / a[3], a[5], a[7], a[3])
+            for b, a in sorted(acc.items())
+        ]
+
@@ -0,0 +1,103 @@
+# db_actuators.py
+# Actuator history as run-length encoded ON intervals: one row per (actuator, on_t)
+# with off_t = NULL while the actuator is still on. A tick that changes nothing
+# writes nothing, so state/duty-cycle/switch queries scan intervals, not ticks.
+from __future__ import annotations
+
+import sqlite3
+from typing import Dict, List, Optional, Tuple
+
+DAY_SEC = 24 * 60 * 60
+
+
+def create_tables(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS actuator_interval (
+            actuator TEXT NOT NULL,
+            on_t INTEGER NOT NULL,
+            off_t INTEGER,
+            PRIMARY KEY (actuator, on_t)
+        ) WITHOUT ROWID
+        """
+    )
+    # overlap queries bound the interval from both sides
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_actuator_interval_off ON actuator_interval(actuator, off_t)")
+
+
+def load_open(conn: sqlite3.Connection) -> Tuple[Dict[str, int], Optional[int]]:
+    """({actuator: on_t} of intervals still open, newest transition time)."""
+    open_on = {str(a): int(t) for a, t in conn.execute("SELECT actuator, on_t FROM actuator_interval WHERE off_t IS NULL")}
+    row = conn.execute("SELECT max(on_t), max(off_t) FROM actuator_interval").fetchone()
+    last = max((int(v) for v in row if v is not None), default=None)
+    return open_on, last
+
+
+def open_interval(conn: sqlite3.Connection, actuator: str, t: int) -> None:
+    conn.execute("INSERT OR REPLACE INTO actuator_interval (actuator, on_t, off_t) VALUES (?, ?, NULL)", (actuator, t))
+
+
+def close_interval(conn: sqlite3.Connection, actuator: str, on_t: int, t: int) -> None:
+    conn.execute("UPDATE actuator_interval SET off_t = ? WHERE actuator = ? AND on_t = ?", (t, actuator, on_t))
+
+
+def truncate(conn: sqlite3.Connection, t: int) -> Dict[str, int]:
+    """
+    The clock went back to t: drop the intervals starting at or after t and end the
+    ones still on at t there. Returns {actuator: on_t} of the latter, so an actuator
+    that stays on can carry on with its interval.
+    """
+    conn.execute("DELETE FROM actuator_interval WHERE on_t >= ?", (t,))
+    running = {
+        str(a): int(on_t)
+        for a, on_t in conn.execute("SELECT actuator, on_t FROM actuator_interval WHERE off_t IS NULL OR off_t > ?", (t,))
+    }
+    conn.execute("UPDATE actuator_interval SET off_t = ? WHERE off_t IS NULL OR off_t > ?", (t, t))
+    return running
+
+
+def state_at(conn: sqlite3.Connection, actuator: str, t: int) -> bool:
+    row = conn.execute(
+        "SELECT off_t FROM actuator_interval WHERE actuator = ? AND on_t <= ? ORDER BY on_t DESC LIMIT 1",
+        (actuator, t),
+    ).fetchone()
+    return row is not None and (row[0] is None or row[0] > t)
+
+
+def on_seconds(conn: sqlite3.Connection, actuator: str, t0: int, t1: int) -> int:
+    """Seconds spent ON within [t0, t1); an open interval counts up to t1."""
+    if t1 <= t0:
+        return 0
+    # intervals of one actuator do not overlap: the ones ending in (t0, t1] are an
+    # (actuator, off_t) index range, and at most one (the last to start before t1)
+    # is still on at t1 - one primary key lookup
+    row = conn.execute(
+        """
+        SELECT coalesce(sum(off_t - max(on_t, ?2)), 0) + coalesce((
+            SELECT ?3 - max(on_t, ?2) FROM (
+                SELECT on_t, off_t FROM actuator_interval
+                WHERE actuator = ?1 AND on_t < ?3
+                ORDER BY on_t DESC LIMIT 1
+            )
+            WHERE off_t IS NULL OR off_t > ?3
+        ), 0)
+        FROM actuator_interval
+        WHERE actuator = ?1 AND off_t > ?2 AND off_t <= ?3
+        """,
+        (actuator, t0, t1),
+    ).fetchone()
+    return int(row[0])
+
+
+def switches_per_day(conn: sqlite3.Connection, actuator: str, t0: int, t1: int) -> List[Tuple[int, int]]:
+    """(day start, number of OFF->ON switches) for days with at least one switch in [t0, t1)."""
+    return conn.execute(
+        """
+        SELECT on_t - (on_t % ?4) AS day, count(*)
+        FROM actuator_interval
+        WHERE actuator = ?1 AND on_t >= ?2 AND on_t < ?3
+        GROUP BY day
+        ORDER BY day
+        """,
+        (actuator, t0, t1, DAY_SEC),
+    ).fetchall()
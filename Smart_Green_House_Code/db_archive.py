@@ -0,0 +1,68 @@
+# db_archive.py
+# Cold history: each sensor's points packed into Gorilla blocks (db_gorilla) of up to
+# N points, one row per block with its [t0, t1] span as the index. Blocks never cross
+# a month boundary, so a month can be (re)archived on its own.
+from __future__ import annotations
+
+import sqlite3
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+import db_gorilla
+
+
+def create_tables(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS archive_block (
+            sensor TEXT NOT NULL,
+            t0 INTEGER NOT NULL,
+            t1 INTEGER NOT NULL,
+            n INTEGER NOT NULL,
+            data BLOB NOT NULL,
+            PRIMARY KEY (sensor, t0)
+        ) WITHOUT ROWID
+        """
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_archive_block_t1 ON archive_block(sensor, t1)")
+
+
+def write_range(conn: sqlite3.Connection, sensor: str, lo: int, hi: int,
+                ts: Sequence[int], vs: Sequence[float], block_points: int) -> int:
+    """Replace the blocks of [lo, hi) with (ts, vs) (sorted by t). Returns the number of blocks written."""
+    conn.execute("DELETE FROM archive_block WHERE sensor = ? AND t0 >= ? AND t0 < ?", (sensor, lo, hi))
+    rows = []
+    for i in range(0, len(ts), block_points):
+        bt, bv = ts[i:i + block_points], vs[i:i + block_points]
+        rows.append((sensor, bt[0], bt[-1], len(bt), db_gorilla.encode(bt, bv)))
+    conn.executemany("INSERT INTO archive_block (sensor, t0, t1, n, data) VALUES (?, ?, ?, ?, ?)", rows)
+    return len(rows)
+
+
+def points(conn: sqlite3.Connection, sensor: str, t0: int, t1: int, desc: bool = False) -> Iterator[Tuple[int, float]]:
+    """(t, value) in [t0, t1]; only the blocks overlapping the range are read and decoded."""
+    cur = conn.execute(
+        f"SELECT data FROM archive_block WHERE sensor = ? AND t0 <= ? AND t1 >= ? ORDER BY t0 {'DESC' if desc else 'ASC'}",
+        (sensor, t1, t0),
+    )
+    for (data,) in cur:
+        ts, vs = db_gorilla.decode(data)
+        pairs = [(t, v) for t, v in zip(ts, vs) if t0 <= t <= t1]
+        if desc:
+            pairs.reverse()
+        yield from pairs
+
+
+def bounds(conn: sqlite3.Connection) -> Tuple[Optional[int], Optional[int]]:
+    return conn.execute("SELECT min(t0), max(t1) FROM archive_block").fetchone()
+
+
+def delete_before(conn: sqlite3.Connection, t: int) -> int:
+    """Drop blocks that end before t."""
+    return conn.execute("DELETE FROM archive_block WHERE t1 < ?", (t,)).rowcount
+
+
+def stats(conn: sqlite3.Connection) -> List[Tuple[str, int, int, int]]:
+    """(sensor, blocks, points, bytes) per sensor."""
+    return conn.execute(
+        "SELECT sensor, count(*), sum(n), sum(length(data)) FROM archive_block GROUP BY sensor ORDER BY sensor"
+    ).fetchall()
@@ -0,0 +1,154 @@
+# db_backup.py
+from __future__ import annotations
+
+import datetime as dt
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, List, Optional
+
+from config import BACKUP_DIR, BACKUP_KEEP, BACKUP_STEP_PAGES, BACKUP_PAUSE_SEC
+
+
+class BackupCancelled(Exception):
+    pass
+
+
+def snapshots(dest_dir: str, stem: str) -> List[str]:
+    """Existing snapshots of `stem`, oldest first (the timestamp in the name sorts)."""
+    if not os.path.isdir(dest_dir):
+        return []
+    names = [n for n in os.listdir(dest_dir) if n.startswith(stem + "-") and n.endswith(".db")]
+    return [os.path.join(dest_dir, n) for n in sorted(names)]
+
+
+def rotate(dest_dir: str, stem: str, keep: int) -> List[str]:
+    """Delete all but the newest `keep` snapshots. Returns the removed paths."""
+    old = snapshots(dest_dir, stem)[:-keep] if keep > 0 else []
+    for path in old:
+        os.remove(path)
+    return old
+
+
+class BackupJob:
+    """
+    Online snapshot of a live database with the sqlite3 backup API:
+      - its own source connection holds one read transaction for the whole copy, so
+        the snapshot is consistent and the live writer (WAL) never waits on it;
+        without it every commit made meanwhile would restart the copy
+      - pages are copied `step_pages` at a time with a `pause_sec` sleep between
+        steps, so the disk is never saturated while the tick loop writes
+      - the copy goes to a .part file that is renamed when complete, then the
+        oldest snapshots beyond `keep` are deleted
+    Progress is readable from any thread (pages_done / pages_total / fraction) and
+    can be pushed to `on_progress(job)` from the backup thread.
+    """
+
+    def __init__(
+        self,
+        db_name: str,
+        dest_dir: str = BACKUP_DIR,
+        keep: int = BACKUP_KEEP,
+        step_pages: int = BACKUP_STEP_PAGES,
+        pause_sec: float = BACKUP_PAUSE_SEC,
+        on_progress: Optional[Callable[["BackupJob"], None]] = None,
+    ):
+        self.db_name = db_name
+        self.dest_dir = dest_dir
+        self.keep = int(keep)
+        self.step_pages = max(1, int(step_pages))
+        self.pause_sec = max(0.0, float(pause_sec))
+        self.on_progress = on_progress
+
+        self.state = "idle"              # idle / running / done / failed / cancelled
+        self.pages_done = 0
+        self.pages_total = 0
+        self.path: Optional[str] = None
+        self.error: Optional[BaseException] = None
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+        self._cancel = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def stem(self) -> str:
+        return os.path.splitext(os.path.basename(self.db_name))[0]
+
+    @property
+    def running(self) -> bool:
+        return self.state == "running"
+
+    @property
+    def fraction(self) -> float:
+        if self.state == "done":
+            return 1.0
+        return self.pages_done / self.pages_total if self.pages_total else 0.0
+
+    def start(self) -> "BackupJob":
+        self.state = "running"
+        self._thread = threading.Thread(target=self.run, name="db-backup", daemon=True)
+        self._thread.start()
+        return self
+
+    def cancel(self) -> None:
+        self._cancel.set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return self.state == "done"
+
+    def _progress(self, status: int, remaining: int, total: int) -> None:
+        self.pages_total = total
+        self.pages_done = total - remaining
+        if self.on_progress is not None:
+            self.on_progress(self)
+        if self._cancel.is_set():
+            raise BackupCancelled()
+        if remaining and self.pause_sec:
+            time.sleep(self.pause_sec)
+
+    def run(self) -> Optional[str]:
+        """Take one snapshot (blocking). Returns its path, or None when cancelled/failed."""
+        self.state = "running"
+        self.started_at = time.monotonic()
+        os.makedirs(self.dest_dir, exist_ok=True)
+        stamp = dt.datetime.now().strftime("%Y%m%d-%H%M%S")
+        path = os.path.join(self.dest_dir, f"{self.stem}-{stamp}.db")
+        part = path + ".part"
+
+        src = dst = None
+        try:
+            src = sqlite3.connect(self.db_name)
+            src.execute("PRAGMA query_only = ON;")
+            # pin one snapshot for the whole copy
+            src.execute("BEGIN")
+            src.execute("SELECT count(*) FROM sqlite_master").fetchone()
+            dst = sqlite3.connect(part)
+            src.backup(dst, pages=self.step_pages, progress=self._progress)
+            dst.close()
+            dst = None
+            os.replace(part, path)
+            self.path = path
+            rotate(self.dest_dir, self.stem, self.keep)
+            self.state = "done"
+            return path
+        except BackupCancelled:
+            self.state = "cancelled"
+            return None
+        except Exception as e:
+            self.error = e
+            self.state = "failed"
+            return None
+        finally:
+            if dst is not None:
+                dst.close()
+            if src is not None:
+                src.close()
+            if os.path.exists(part):
+                os.remove(part)
+            self.finished_at = time.monotonic()
+            if self.on_progress is not None:
+                self.on_progress(self)
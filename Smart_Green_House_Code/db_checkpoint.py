@@ -0,0 +1,117 @@
+# db_checkpoint.py
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+from config import (
+    CHECKPOINT_POLL_SEC, CHECKPOINT_IDLE_SEC, CHECKPOINT_PASSIVE_BYTES, CHECKPOINT_TRUNCATE_BYTES,
+    CHECKPOINT_BUSY_TIMEOUT_SEC,
+)
+
+
+class CheckpointManager:
+    """
+    WAL checkpoints off the write path. The writer's wal_autocheckpoint is raised
+    far above passive_bytes (a safety net in case this thread cannot keep up), so
+    commits do not pay for checkpoints; instead this thread, on its own
+    connection, polls the -wal size every poll_sec and runs:
+      - PASSIVE  once the WAL reaches passive_bytes: copies what it can without
+        waiting for readers or blocking the writer, so the WAL is reused from the
+        start instead of growing
+      - TRUNCATE in an idle window (nothing written for idle_sec) once the WAL
+        reaches truncate_bytes: shrinks the file to zero; with a short busy
+        timeout, so a write that arrives meanwhile makes it give up, not wait
+    Metrics (read from any thread): wal_bytes, checkpoints per mode, last / max /
+    total duration in ms, last (busy, log frames, checkpointed frames), last_error.
+    """
+
+    def __init__(
+        self,
+        db_name: str,
+        last_write: Callable[[], float],
+        poll_sec: float = CHECKPOINT_POLL_SEC,
+        idle_sec: float = CHECKPOINT_IDLE_SEC,
+        passive_bytes: int = CHECKPOINT_PASSIVE_BYTES,
+        truncate_bytes: int = CHECKPOINT_TRUNCATE_BYTES,
+        busy_timeout: float = CHECKPOINT_BUSY_TIMEOUT_SEC,
+    ):
+        self.db_name = db_name
+        self.wal_path = db_name + "-wal"
+        self.last_write = last_write
+        self.poll_sec = max(0.01, float(poll_sec))
+        self.idle_sec = max(0.0, float(idle_sec))
+        self.passive_bytes = int(passive_bytes)
+        self.truncate_bytes = int(truncate_bytes)
+        self.busy_timeout = float(busy_timeout)
+
+        # metrics
+        self.wal_bytes = 0
+        self.checkpoints: Dict[str, int] = {"PASSIVE": 0, "TRUNCATE": 0}
+        self.gave_up = 0                 # TRUNCATE runs that found the database busy
+        self.last_mode: Optional[str] = None
+        self.last_ms = 0.0
+        self.max_ms = 0.0
+        self.total_ms = 0.0
+        self.last_result: Optional[Tuple[int, int, int]] = None
+        self.last_error: Optional[BaseException] = None
+        self._last_at = float("-inf")    # monotonic time of the last checkpoint
+
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="db-checkpoint", daemon=True)
+        self._thread.start()
+
+    def close(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def wal_size(self) -> int:
+        try:
+            return os.path.getsize(self.wal_path)
+        except OSError:
+            return 0
+
+    def checkpoint(self, conn: sqlite3.Connection, mode: str) -> Tuple[int, int, int]:
+        """Run one checkpoint on `conn` and record its duration; returns (busy, log, checkpointed)."""
+        st = time.perf_counter()
+        busy, log, done = conn.execute(f"PRAGMA wal_checkpoint({mode})").fetchone()
+        ms = (time.perf_counter() - st) * 1000.0
+        self.checkpoints[mode] = self.checkpoints.get(mode, 0) + 1
+        self.last_mode, self.last_ms, self.last_result = mode, ms, (busy, log, done)
+        self.max_ms = max(self.max_ms, ms)
+        self.total_ms += ms
+        self._last_at = time.monotonic()
+        if busy and mode == "TRUNCATE":
+            self.gave_up += 1
+        self.wal_bytes = self.wal_size()
+        return busy, log, done
+
+    def _due(self) -> Optional[str]:
+        self.wal_bytes = self.wal_size()
+        last_write = self.last_write()
+        if time.monotonic() - last_write >= self.idle_sec and 0 < self.truncate_bytes <= self.wal_bytes:
+            return "TRUNCATE"
+        # after a PASSIVE the file keeps its size (it is reused): only run again once something was written
+        if self.wal_bytes >= self.passive_bytes and last_write > self._last_at:
+            return "PASSIVE"
+        return None
+
+    def _run(self) -> None:
+        conn = None
+        try:
+            conn = sqlite3.connect(self.db_name, timeout=self.busy_timeout, check_same_thread=False)
+            while not self._stop.wait(self.poll_sec):
+                try:
+                    mode = self._due()
+                    if mode is not None:
+                        self.checkpoint(conn, mode)
+                except sqlite3.Error as e:
+                    self.last_error = e
+        except sqlite3.Error as e:
+            self.last_error = e
+        finally:
+            if conn is not None:
+                conn.close()
@@ -0,0 +1,101 @@
+# db_compress.py
+# Ingest compression: per-sensor dead-band + swinging-door trending (SDT).
+# Only the points needed to redraw each signal by linear interpolation within
+# tolerance are kept; everything in between is dropped before it hits SQLite.
+from __future__ import annotations
+
+from typing import List, Optional, Tuple
+
+Point = Tuple[int, float]
+
+
+class SwingingDoor:
+    """
+    One sensor's compressor.
+
+      deadband   input changes up to this size are treated as no change
+      deviation  max distance between a dropped point and the line through
+                 the points kept around it (0 keeps every change)
+      max_gap    a point is always kept after this many seconds, so a flat
+                 signal still shows up and at most this much is held in memory
+
+    push() returns the points to store (oldest first); flush() emits the held one.
+    Reconstruction error is at most deadband + deviation. Samples must come in
+    time order: a repeated timestamp is ignored, an older one starts over.
+    """
+
+    def __init__(self, deadband: float, deviation: float, max_gap: int):
+        self.deadband = max(0.0, float(deadband))
+        self.deviation = max(0.0, float(deviation))
+        self.max_gap = max(1, int(max_gap))
+        self.reset()
+
+    def reset(self) -> None:
+        self._anchor: Optional[Point] = None     # last stored point
+        self._held: Optional[Point] = None       # last received point, not stored yet
+        self._value: Optional[float] = None      # last value after the dead-band
+        self._up = 0.0                           # door slopes, relative to the anchor
+        self._lo = 0.0
+
+    def _open_doors(self, t: int, v: float) -> None:
+        ta, va = self._anchor
+        dt = float(t - ta)
+        self._up = (v + self.deviation - va) / dt
+        self._lo = (v - self.deviation - va) / dt
+
+    def push(self, t: int, v: float) -> List[Point]:
+        if self._value is not None and abs(v - self._value) <= self.deadband:
+            v = self._value
+        self._value = v
+
+        if self._anchor is None:
+            self._anchor = (t, v)
+            return [(t, v)]
+
+        out: List[Point] = []
+        last_t = self._held[0] if self._held is not None else self._anchor[0]
+        if t == last_t:
+            # repeated timestamp (wall clock at minute resolution): the first sample wins
+            return out
+        if t < last_t:
+            # the clock went back: close what we have and start over here
+            out += self.flush()
+            self._anchor = (t, v)
+            return out + [(t, v)]
+        if t - self._anchor[0] > self.max_gap:
+            out += self.flush()
+            if t - self._anchor[0] > self.max_gap:
+                self._anchor = (t, v)
+                return out + [(t, v)]
+
+        if self._held is None:
+            self._held = (t, v)
+            self._open_doors(t, v)
+            return out
+
+        ta, va = self._anchor
+        slope = (v - va) / float(t - ta)
+        if self._lo <= slope <= self._up:
+            # the line anchor -> (t, v) passes every dropped point within deviation
+            dt = float(t - ta)
+            self._up = min(self._up, (v + self.deviation - va) / dt)
+            self._lo = max(self._lo, (v - self.deviation - va) / dt)
+            self._held = (t, v)
+            return out
+
+        out.append(self._held)
+        self._anchor = self._held
+        self._held = (t, v)
+        self._open_doors(t, v)
+        return out
+
+    def pending(self) -> Optional[Point]:
+        """The received point that is not stored yet (the newest sample), if any."""
+        return self._held
+
+    def flush(self) -> List[Point]:
+        if self._held is None:
+            return []
+        held, self._held = self._held, None
+        self._anchor = held
+        return [held]
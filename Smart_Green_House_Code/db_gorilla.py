@@ -0,0 +1,150 @@
+# db_gorilla.py
+# Gorilla-style block codec (Pelkonen et al., VLDB 2015) for one sensor's (t, value) points:
+#   timestamps: first t in full, then delta-of-delta in variable-width buckets
+#   values:     first value in full, then XOR with the previous value, storing
+#               only the meaningful bits (reusing the previous leading/trailing window)
+# A flat or slowly moving sensor sampled on a fixed tick costs a few bits per point.
+from __future__ import annotations
+
+import struct
+from typing import List, Sequence, Tuple
+
+_MASK64 = (1 << 64) - 1
+
+# (prefix bits, prefix width, payload width): dod == 0 is the single bit '0'
+_DOD_BUCKETS = (
+    (0b10, 2, 7),
+    (0b110, 3, 9),
+    (0b1110, 4, 12),
+)
+
+
+def _f2u(v: float) -> int:
+    return struct.unpack("<Q", struct.pack("<d", v))[0]
+
+
+def _u2f(u: int) -> float:
+    return struct.unpack("<d", struct.pack("<Q", u))[0]
+
+
+class _BitWriter:
+    def __init__(self):
+        self._buf = bytearray()
+        self._acc = 0
+        self._n = 0
+
+    def write(self, value: int, nbits: int) -> None:
+        self._acc = (self._acc << nbits) | (value & ((1 << nbits) - 1))
+        self._n += nbits
+        while self._n >= 8:
+            self._n -= 8
+            self._buf.append((self._acc >> self._n) & 0xFF)
+        self._acc &= (1 << self._n) - 1
+
+    def getvalue(self) -> bytes:
+        if self._n:
+            return bytes(self._buf) + bytes([(self._acc << (8 - self._n)) & 0xFF])
+        return bytes(self._buf)
+
+
+class _BitReader:
+    def __init__(self, data: bytes):
+        self._data = data
+        self._pos = 0
+
+    def read(self, nbits: int) -> int:
+        byte, bit = divmod(self._pos, 8)
+        nbytes = (bit + nbits + 7) // 8
+        chunk = int.from_bytes(self._data[byte:byte + nbytes], "big")
+        self._pos += nbits
+        return (chunk >> (nbytes * 8 - bit - nbits)) & ((1 << nbits) - 1)
+
+
+def _signed(u: int, nbits: int) -> int:
+    return u - (1 << nbits) if u >= 1 << (nbits - 1) else u
+
+
+def encode(ts: Sequence[int], vs: Sequence[float]) -> bytes:
+    """Pack points (timestamps strictly increasing) into one block."""
+    n = len(ts)
+    w = _BitWriter()
+    w.write(n, 32)
+    if not n:
+        return w.getvalue()
+    w.write(int(ts[0]) & _MASK64, 64)
+    prev_u = _f2u(float(vs[0]))
+    w.write(prev_u, 64)
+
+    prev_t, prev_delta = int(ts[0]), 0
+    lead, trail = -1, -1
+    for t, v in zip(ts[1:], vs[1:]):
+        t = int(t)
+        delta = t - prev_t
+        dod = delta - prev_delta
+        if dod == 0:
+            w.write(0, 1)
+        else:
+            for prefix, pw, bits in _DOD_BUCKETS:
+                if -(1 << (bits - 1)) <= dod < (1 << (bits - 1)):
+                    w.write(prefix, pw)
+                    w.write(dod, bits)
+                    break
+            else:
+                w.write(0b1111, 4)
+                w.write(dod & _MASK64, 64)
+        prev_t, prev_delta = t, delta
+
+        u = _f2u(float(v))
+        x = u ^ prev_u
+        prev_u = u
+        if x == 0:
+            w.write(0, 1)
+            continue
+        w.write(1, 1)
+        lz = min(31, 64 - x.bit_length())
+        tz = (x & -x).bit_length() - 1
+        if lead >= 0 and lz >= lead and tz >= trail:
+            # fits the previous window
+            w.write(0, 1)
+            w.write(x >> trail, 64 - lead - trail)
+        else:
+            lead, trail = lz, tz
+            sig = 64 - lz - tz
+            w.write(1, 1)
+            w.write(lz, 5)
+            w.write(sig - 1, 6)
+            w.write(x >> tz, sig)
+    return w.getvalue()
+
+
+def decode(data: bytes) -> Tuple[List[int], List[float]]:
+    r = _BitReader(data)
+    n = r.read(32)
+    if not n:
+        return [], []
+    t = _signed(r.read(64), 64)
+    u = r.read(64)
+    ts, vs = [t], [_u2f(u)]
+
+    delta = 0
+    lead, trail = 0, 0
+    for _ in range(n - 1):
+        if r.read(1):
+            # '1' then one more '1' per bucket: 7 / 9 / 12 bits, '1111' = full 64 bits
+            bits = 64
+            for _prefix, _pw, width in _DOD_BUCKETS:
+                if not r.read(1):
+                    bits = width
+                    break
+            delta += _signed(r.read(bits), bits)
+        t += delta
+        ts.append(t)
+
+        if r.read(1):
+            if r.read(1):
+                lead = r.read(5)
+                sig = r.read(6) + 1
+                trail = 64 - lead - sig
+            u ^= r.read(64 - lead - trail) << trail
+        vs.append(_u2f(u))
+    return ts, vs
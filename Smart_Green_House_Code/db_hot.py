@@ -0,0 +1,166 @@
+# db_hot.py
+from __future__ import annotations
+
+import threading
+from array import array
+from typing import List, Optional, Sequence, Tuple
+
+HotRow = Tuple[int, ...]   # (epoch t, value per sensor)
+
+
+class HotTier:
+    """
+    Fixed-capacity ring buffer of the newest rows: one int64 array of epoch
+    seconds plus one float64 array per sensor. Rows arrive in time order; one
+    older than the newest row (the clock went back) drops the rows from its t on
+    and the new ones are appended after what is left. Unless the caller cleared
+    the old run from disk too (truncate()), its rows there are only overwritten
+    where the new run hits the same timestamps, so reads touching the span it
+    covered go to the database until that span leaves the buffer.
+
+    `complete` means the buffer holds every stored row (nothing older on disk).
+    """
+
+    def __init__(self, capacity: int, n_sensors: int):
+        self.capacity = max(1, int(capacity))
+        self._t = array("q", bytes(8 * self.capacity))
+        self._v = [array("d", bytes(8 * self.capacity)) for _ in range(n_sensors)]
+        self._start = 0
+        self._len = 0
+        self._lock = threading.Lock()
+        self._stale: Optional[Tuple[int, int]] = None   # (first, last) t the old run may still hold on disk
+        self.valid = False
+        self.complete = False
+
+    def __len__(self) -> int:
+        return self._len
+
+    def _phys(self, i: int) -> int:
+        return (self._start + i) % self.capacity
+
+    def _put(self, i: int, row: Sequence) -> None:
+        p = self._phys(i)
+        self._t[p] = int(row[0])
+        for col, v in zip(self._v, row[1:]):
+            col[p] = float("nan") if v is None else float(v)
+
+    def _get(self, i: int) -> HotRow:
+        p = self._phys(i)
+        return (self._t[p],) + tuple(None if c[p] != c[p] else c[p] for c in self._v)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._start = 0
+            self._len = 0
+            self._stale = None
+            self.valid = False
+            self.complete = False
+
+    def truncate(self, t: int) -> None:
+        """Drop the rows from t on: the database dropped them as well."""
+        with self._lock:
+            self._len = self._bisect(t)
+
+    def load(self, rows: Sequence[Sequence], complete: bool) -> None:
+        """Replace the contents with `rows` (oldest first, at most `capacity`)."""
+        with self._lock:
+            rows = rows[-self.capacity:]
+            self._start = 0
+            self._len = 0
+            self._stale = None
+            for row in rows:
+                self._put(self._len, row)
+                self._len += 1
+            self.valid = True
+            self.complete = complete
+
+    def append(self, rows: Sequence[Sequence]) -> None:
+        with self._lock:
+            if not self.valid:
+                return
+            for row in rows:
+                t = int(row[0])
+                if self._len:
+                    newest = self._t[self._phys(self._len - 1)]
+                    if t == newest:
+                        self._put(self._len - 1, row)
+                        continue
+                    if t < newest:
+                        # clock reset or backfill: the rows from t on are being rewritten
+                        first, last = self._stale or (t, newest)
+                        self._stale = (min(first, t), max(last, newest))
+                        self._len = self._bisect(t)
+                if self._len == self.capacity:
+                    self._start = (self._start + 1) % self.capacity
+                    self._len -= 1
+                    self.complete = False
+                    if self._stale and self._t[self._start] > self._stale[1]:
+                        self._stale = None
+                self._put(self._len, row)
+                self._len += 1
+
+    def _answers(self, t0: int, t1: int) -> bool:
+        return self.valid and not (self._stale and t0 <= self._stale[1] and t1 >= self._stale[0])
+
+    def _db_until(self, t0: int) -> Optional[int]:
+        # None: memory alone answers [t0, ...]; else rows older than this t must come from disk
+        if self.complete or (self._len and t0 >= self._t[self._start]):
+            return None
+        return self._t[self._start] if self._len else 2 ** 62
+
+    def view(self, t0: int, t1: int) -> Optional[Tuple[List[HotRow], Optional[int]]]:
+        """
+        Rows in [t0, t1] held in memory plus `db_until`: None when memory covers the
+        whole range, otherwise the oldest t held (the caller reads [t0, db_until) from disk).
+        Returns None while the buffer is invalid or the range reaches into a rewritten span.
+        """
+        with self._lock:
+            if not self._answers(t0, t1):
+                return None
+            i = self._bisect(t0)
+            j = self._bisect(t1 + 1)
+            return [self._get(k) for k in range(i, j)], self._db_until(t0)
+
+    def column_view(self, t0: int, t1: int) -> Optional[Tuple[array, List[array], Optional[int]]]:
+        """Like view(), but as contiguous copies: (t array, one value array per sensor, db_until)."""
+        with self._lock:
+            if not self._answers(t0, t1):
+                return None
+            i = self._bisect(t0)
+            j = self._bisect(t1 + 1)
+            ts = array("q")
+            cols = [array("d") for _ in self._v]
+            for a, b in self._segments(i, j):
+                ts.extend(self._t[a:b])
+                for dst, src in zip(cols, self._v):
+                    dst.extend(src[a:b])
+            return ts, cols, self._db_until(t0)
+
+    def last(self, n: int) -> Optional[List[HotRow]]:
+        """Newest n rows, or None when memory cannot answer (invalid, or fewer rows than asked)."""
+        with self._lock:
+            if not self.valid or (n > self._len and not self.complete):
+                return None
+            n = max(0, min(int(n), self._len))
+            if self._stale and not (n and self._t[self._phys(self._len - n)] > self._stale[1]):
+                return None
+            return [self._get(k) for k in range(self._len - n, self._len)]
+
+    def _bisect(self, t: int) -> int:
+        lo, hi = 0, self._len
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._t[self._phys(mid)] < t:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _segments(self, i: int, j: int) -> List[Tuple[int, int]]:
+        # logical [i, j) -> at most two physical slices
+        if i >= j:
+            return []
+        a, b = self._phys(i), self._phys(j - 1) + 1
+        if a < b:
+            return [(a, b)]
+        return [(a, self.capacity), (0, b)]
@@ -0,0 +1,161 @@
+# db_partitions.py
+# Month partitions for the time-series tables:
+#   series_YYYYMM   wide rows (t, temp, humidity, light, rain, soil), WITHOUT ROWID
+#   reading_YYYYMM  normalized rows (zone_id, sensor_id, t, value), WITHOUT ROWID,
+#                   keyed (zone_id, sensor_id, t) for per-zone range scans
+# 'series' and 'Reading' are UNION ALL views over the partitions, rebuilt
+# whenever a partition is created or dropped. Retention drops whole months.
+from __future__ import annotations
+
+import datetime as dt
+import re
+import sqlite3
+from typing import Dict, List, Optional, Sequence, Tuple
+
+_EPOCH = dt.datetime(1970, 1, 1)
+_NAME_RE = re.compile(r"^series_(\d{6})$")
+
+
+def series_table(key: int) -> str:
+    return f"series_{key:06d}"
+
+
+def reading_table(key: int) -> str:
+    return f"reading_{key:06d}"
+
+
+def month_key(t: int) -> int:
+    d = _EPOCH + dt.timedelta(seconds=int(t))
+    return d.year * 100 + d.month
+
+
+def month_bounds(key: int) -> Tuple[int, int]:
+    """[lo, hi) epoch seconds of the month."""
+    y, m = divmod(key, 100)
+    lo = dt.datetime(y, m, 1)
+    hi = dt.datetime(y + 1, 1, 1) if m == 12 else dt.datetime(y, m + 1, 1)
+    return int((lo - _EPOCH).total_seconds()), int((hi - _EPOCH).total_seconds())
+
+
+def add_months(key: int, n: int) -> int:
+    y, m = divmod(key, 100)
+    idx = y * 12 + (m - 1) + n
+    return (idx // 12) * 100 + idx % 12 + 1
+
+
+def load_keys(conn: sqlite3.Connection) -> List[int]:
+    keys = []
+    for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE 'series\\_%' ESCAPE '\\'"):
+        m = _NAME_RE.match(name)
+        if m:
+            keys.append(int(m.group(1)))
+    return sorted(keys)
+
+
+def _create_reading(conn: sqlite3.Connection, name: str) -> None:
+    conn.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS {name} (
+            zone_id INTEGER NOT NULL,
+            sensor_id INTEGER NOT NULL,
+            t INTEGER NOT NULL,
+            value REAL NOT NULL,
+            PRIMARY KEY (zone_id, sensor_id, t)
+        ) WITHOUT ROWID
+        """
+    )
+
+
+def create(conn: sqlite3.Connection, key: int, sensors: Sequence[str]) -> None:
+    cols = ", ".join(f"{s} REAL" for s in sensors)
+    conn.execute(f"CREATE TABLE IF NOT EXISTS {series_table(key)} (t INTEGER PRIMARY KEY, {cols}) WITHOUT ROWID")
+    _create_reading(conn, reading_table(key))
+
+
+def upgrade_readings(conn: sqlite3.Connection, keys: Sequence[int], zone_id: int) -> List[int]:
+    """
+    Rebuild reading_YYYYMM tables from before zones (keyed (sensor_id, t)) with every
+    row in `zone_id`. Drop the 'Reading' view first: it references the old tables.
+    Returns the rebuilt keys.
+    """
+    done = []
+    for key in keys:
+        name = reading_table(key)
+        cols = [r[1] for r in conn.execute(f"PRAGMA table_info({name})")]
+        if "zone_id" in cols:
+            continue
+        if cols:
+            _create_reading(conn, name + "_z")
+            conn.execute(
+                f"INSERT INTO {name}_z (zone_id, sensor_id, t, value) SELECT ?, sensor_id, t, value FROM {name}",
+                (zone_id,),
+            )
+            conn.execute(f"DROP TABLE {name}")
+            conn.execute(f"ALTER TABLE {name}_z RENAME TO {name}")
+        else:
+            _create_reading(conn, name)
+        done.append(key)
+    return done
+
+
+def drop(conn: sqlite3.Connection, key: int) -> None:
+    conn.execute(f"DROP TABLE IF EXISTS {series_table(key)}")
+    conn.execute(f"DROP TABLE IF EXISTS {reading_table(key)}")
+
+
+def rebuild_views(conn: sqlite3.Connection, keys: Sequence[int], sensors: Sequence[str],
+                  with_reading: bool = True) -> None:
+    cols = ", ".join(sensors)
+    if keys:
+        series_sql = " UNION ALL ".join(f"SELECT t, {cols} FROM {series_table(k)}" for k in keys)
+        reading_sql = " UNION ALL ".join(f"SELECT zone_id, sensor_id, t, value FROM {reading_table(k)}" for k in keys)
+    else:
+        nulls = ", ".join(f"NULL AS {s}" for s in sensors)
+        series_sql = f"SELECT NULL AS t, {nulls} WHERE 0"
+        reading_sql = "SELECT NULL AS zone_id, NULL AS sensor_id, NULL AS t, NULL AS value WHERE 0"
+    conn.execute("DROP VIEW IF EXISTS series")
+    conn.execute(f"CREATE VIEW series AS {series_sql}")
+    if with_reading:
+        conn.execute("DROP VIEW IF EXISTS Reading")
+        conn.execute(
+            "CREATE VIEW Reading AS SELECT r.sensor_id, r.value, datetime(r.t, 'unixepoch') AS recorded_at, "
+            f"r.zone_id, z.greenhouse_id FROM ({reading_sql}) AS r LEFT JOIN Zone z ON z.id = r.zone_id"
+        )
+
+
+class PartitionRouter:
+    """Groups rows by month partition; remembers the last month's bounds so in-order ticks skip the date math."""
+
+    def __init__(self):
+        self._lo = 0
+        self._hi = 0
+        self._key = 0
+
+    def key(self, t: int) -> int:
+        if not (self._lo <= t < self._hi):
+            self._key = month_key(t)
+            self._lo, self._hi = month_bounds(self._key)
+        return self._key
+
+    def split(self, rows: Sequence[Sequence], t_index: int = 0) -> Dict[int, list]:
+        out: Dict[int, list] = {}
+        for row in rows:
+            out.setdefault(self.key(row[t_index]), []).append(row)
+        return out
+
+
+def overlapping(keys: Sequence[int], t0: int, t1: int) -> List[int]:
+    out = []
+    for k in keys:
+        lo, hi = month_bounds(k)
+        if hi > t0 and lo <= t1:
+            out.append(k)
+    return out
+
+
+def expired(keys: Sequence[int], newest_t: Optional[int], retention_months: int) -> List[int]:
+    """Partitions entirely older than `retention_months` before the month of newest_t."""
+    if newest_t is None or retention_months <= 0:
+        return []
+    keep_from = add_months(month_key(newest_t), -(retention_months - 1))
+    return [k for k in keys if k < keep_from]
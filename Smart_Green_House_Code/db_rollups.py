@@ -0,0 +1,130 @@
+# db_rollups.py
+# Min/max/sum/count rollups of the 'series' table at several bucket widths.
+# One row per (tier, bucket): tier = bucket width in seconds, bucket = bucket start (epoch).
+# New rows are merged in with an UPSERT, so history is never rescanned; only buckets
+# whose raw rows were overwritten are rebuilt from 'series'.
+from __future__ import annotations
+
+import sqlite3
+from typing import List, Optional, Sequence, Tuple
+
+RollupRow = Tuple[int, Optional[float], Optional[float], Optional[float], int]
+
+
+def _cols(sensors: Sequence[str]) -> List[str]:
+    cols = []
+    for s in sensors:
+        cols += [f"{s}_min", f"{s}_max", f"{s}_sum", f"{s}_n"]
+    return cols
+
+
+def create_tables(conn: sqlite3.Connection, sensors: Sequence[str]) -> None:
+    body = ",\n".join(
+        f"{s}_min REAL, {s}_max REAL, {s}_sum REAL, {s}_n INTEGER NOT NULL DEFAULT 0" for s in sensors
+    )
+    conn.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS rollup (
+            tier INTEGER NOT NULL,
+            bucket INTEGER NOT NULL,
+            {body},
+            PRIMARY KEY (tier, bucket)
+        ) WITHOUT ROWID
+        """
+    )
+
+
+def _aggregate_select(sensors: Sequence[str], source: str, where: str = "") -> str:
+    aggs = ", ".join(f"min({s}), max({s}), sum({s}), count({s})" for s in sensors)
+    return f"SELECT ?, t - (t % ?) AS b, {aggs} FROM {source} {where} GROUP BY b"
+
+
+def _merge_sql(sensors: Sequence[str], source: str) -> str:
+    cols = _cols(sensors)
+    sets = []
+    for s in sensors:
+        sets.append(f"{s}_min = min(coalesce({s}_min, excluded.{s}_min), coalesce(excluded.{s}_min, {s}_min))")
+        sets.append(f"{s}_max = max(coalesce({s}_max, excluded.{s}_max), coalesce(excluded.{s}_max, {s}_max))")
+        sets.append(f"{s}_sum = coalesce({s}_sum, 0) + coalesce(excluded.{s}_sum, 0)")
+        sets.append(f"{s}_n = {s}_n + excluded.{s}_n")
+    # "WHERE true" keeps the UPSERT parser from reading ON CONFLICT as a join clause
+    return (
+        f"INSERT INTO rollup (tier, bucket, {', '.join(cols)}) "
+        f"{_aggregate_select(sensors, source, 'WHERE true')} "
+        f"ON CONFLICT(tier, bucket) DO UPDATE SET {', '.join(sets)}"
+    )
+
+
+def merge(conn: sqlite3.Connection, sensors: Sequence[str], tiers: Sequence[int],
+          rows: Sequence[Sequence]) -> None:
+    """Fold freshly written (t, *values) rows into every tier."""
+    if not rows:
+        return
+    cols = ", ".join(sensors)
+    marks = ", ".join("?" for _ in range(len(sensors) + 1))
+    conn.execute(f"CREATE TEMP TABLE IF NOT EXISTS rollup_in (t INTEGER, {cols})")
+    conn.execute("DELETE FROM temp.rollup_in")
+    conn.executemany(f"INSERT INTO temp.rollup_in (t, {cols}) VALUES ({marks})", rows)
+    sql = _merge_sql(sensors, "temp.rollup_in")
+    for tier in tiers:
+        conn.execute(sql, (tier, tier))
+    conn.execute("DELETE FROM temp.rollup_in")
+
+
+def rebuild(conn: sqlite3.Connection, sensors: Sequence[str], tiers: Sequence[int],
+            t0: Optional[int] = None, t1: Optional[int] = None) -> None:
+    """Recompute the buckets covering [t0, t1] (everything when omitted) from 'series'."""
+    cols = ", ".join(_cols(sensors))
+    for tier in tiers:
+        if t0 is None or t1 is None:
+            conn.execute("DELETE FROM rollup WHERE tier = ?", (tier,))
+            conn.execute(
+                f"INSERT INTO rollup (tier, bucket, {cols}) {_aggregate_select(sensors, 'series')}",
+                (tier, tier),
+            )
+            continue
+        lo = t0 - (t0 % tier)
+        hi = t1 - (t1 % tier) + tier
+        conn.execute("DELETE FROM rollup WHERE tier = ? AND bucket >= ? AND bucket < ?", (tier, lo, hi))
+        conn.execute(
+            f"INSERT INTO rollup (tier, bucket, {cols}) "
+            f"{_aggregate_select(sensors, 'series', 'WHERE t >= ? AND t < ?')}",
+            (tier, tier, lo, hi),
+        )
+
+
+def pick_tier(span_sec: int, min_points: int, tiers: Sequence[int]) -> int:
+    """Coarsest tier that still yields at least min_points buckets over the span (0 = raw rows)."""
+    for tier in sorted(tiers, reverse=True):
+        if span_sec // tier >= min_points:
+            return tier
+    return 0
+
+
+def delete(conn: sqlite3.Connection, tiers: Sequence[int], before: Optional[int] = None) -> None:
+    """Drop the buckets of the given tiers (only those starting before `before`, when set)."""
+    for tier in tiers:
+        if before is None:
+            conn.execute("DELETE FROM rollup WHERE tier = ?", (tier,))
+        else:
+            conn.execute("DELETE FROM rollup WHERE tier = ? AND bucket < ?", (tier, before))
+
+
+def first_bucket(conn: sqlite3.Connection, tier: int) -> Optional[int]:
+    row = conn.execute("SELECT min(bucket) FROM rollup WHERE tier = ?", (tier,)).fetchone()
+    return row[0] if row else None
+
+
+def fetch(conn: sqlite3.Connection, sensor: str, tier: int, t0: int, t1: int) -> List[RollupRow]:
+    """(bucket, min, max, avg, count) for buckets starting in [t0, t1]."""
+    cur = conn.execute(
+        f"""
+        SELECT bucket, {sensor}_min, {sensor}_max, {sensor}_sum / {sensor}_n, {sensor}_n
+        FROM rollup
+        WHERE tier = ? AND bucket >= ? AND bucket <= ? AND {sensor}_n > 0
+        ORDER BY bucket ASC
+        """,
+        (tier, t0 - (t0 % tier), t1),
+    )
+    return cur.fetchall()
+
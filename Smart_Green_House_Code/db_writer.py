@@ -0,0 +1,120 @@
+# db_writer.py
+from __future__ import annotations
+
+import atexit
+import queue
+import threading
+import time
+from typing import Any, Callable, List, Optional, Tuple
+
+from config import WRITER_BATCH_ROWS, WRITER_FLUSH_MS, WRITER_QUEUE_MAX
+
+WriteItem = Tuple[str, Any]
+
+_STOP = ("__stop__", None)
+
+
+class BackgroundWriter:
+    """
+    Group-commit pipeline:
+      - producers put (kind, payload) items on a bounded queue (blocks when full)
+      - one worker thread collects up to batch_rows items or waits flush_ms,
+        whichever comes first, and hands the batch to `handler` (one transaction)
+      - close() drains everything that was submitted before returning
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[List[WriteItem]], None],
+        batch_rows: int = WRITER_BATCH_ROWS,
+        flush_ms: float = WRITER_FLUSH_MS,
+        max_queue: int = WRITER_QUEUE_MAX,
+        name: str = "db-writer",
+    ):
+        self.handler = handler
+        self.batch_rows = max(1, int(batch_rows))
+        self.flush_sec = max(0.0, float(flush_ms) / 1000.0)
+
+        self._q: "queue.Queue[WriteItem]" = queue.Queue(maxsize=max(1, int(max_queue)))
+        self._cv = threading.Condition()
+        self._slock = threading.Lock()   # orders submits against close()
+        self._submitted = 0
+        self._done = 0
+        self._closed = False
+
+        # stats
+        self.batches = 0
+        self.written = 0
+        self.failed = 0
+        self.last_error: Optional[BaseException] = None
+
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def submit(self, kind: str, payload: Any, timeout: Optional[float] = None) -> None:
+        """Queue one item. Blocks while the queue is full (raises queue.Full after `timeout`)."""
+        with self._slock:
+            if self._closed:
+                raise RuntimeError("Writer is closed")
+            with self._cv:
+                self._submitted += 1
+            try:
+                self._q.put((kind, payload), block=True, timeout=timeout)
+            except queue.Full:
+                with self._cv:
+                    self._submitted -= 1
+                    self._cv.notify_all()
+                raise
+
+    def pending(self) -> int:
+        with self._cv:
+            return self._submitted - self._done
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until everything submitted so far is committed."""
+        with self._cv:
+            target = self._submitted
+            return self._cv.wait_for(lambda: self._done >= target, timeout=timeout)
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        with self._slock:
+            if self._closed:
+                return
+            self._closed = True
+        self._q.put(_STOP)
+        self._thread.join(timeout)
+        atexit.unregister(self.close)
+
+    def _collect(self, first: WriteItem) -> Tuple[List[WriteItem], bool]:
+        batch = [first]
+        deadline = time.monotonic() + self.flush_sec
+        while len(batch) < self.batch_rows:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._q.get(timeout=remaining) if remaining > 0 else self._q.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self) -> None:
+        stop = False
+        while not stop:
+            first = self._q.get()
+            if first is _STOP:
+                break
+            batch, stop = self._collect(first)
+            try:
+                self.handler(batch)
+                self.written += len(batch)
+            except Exception as e:
+                # keep the pipeline alive; the batch is lost but reported
+                self.failed += len(batch)
+                self.last_error = e
+            self.batches += 1
+            with self._cv:
+                self._done += len(batch)
+                self._cv.notify_all()
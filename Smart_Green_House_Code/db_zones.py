@@ -0,0 +1,126 @@
+# db_zones.py
+# Greenhouses, their zones and the sensors of each zone. Sensor names are unique per
+# zone (UNIQUE(zone_id, name)); readings carry the zone too, see db_partitions.
+# Zone 1 of greenhouse 1 is the original single greenhouse.
+from __future__ import annotations
+
+import sqlite3
+from typing import Dict, List, Sequence, Tuple
+
+DEFAULT_GREENHOUSE_ID = 1
+DEFAULT_ZONE_ID = 1
+
+_SENSOR_COLS = "id, name, sensor_type, unit, created_at, greenhouse_id, zone_id"
+
+
+def create_tables(conn: sqlite3.Connection, greenhouse_name: str, zone_name: str) -> None:
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS Greenhouse (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL UNIQUE,
+            created_at TEXT DEFAULT (datetime('now'))
+        )
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS Zone (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            greenhouse_id INTEGER NOT NULL REFERENCES Greenhouse(id),
+            name TEXT NOT NULL,
+            created_at TEXT DEFAULT (datetime('now')),
+            UNIQUE (greenhouse_id, name)
+        )
+        """
+    )
+    conn.execute("INSERT OR IGNORE INTO Greenhouse (id, name) VALUES (?, ?)", (DEFAULT_GREENHOUSE_ID, greenhouse_name))
+    conn.execute(
+        "INSERT OR IGNORE INTO Zone (id, greenhouse_id, name) VALUES (?, ?, ?)",
+        (DEFAULT_ZONE_ID, DEFAULT_GREENHOUSE_ID, zone_name),
+    )
+
+
+def _create_sensor_table(conn: sqlite3.Connection, name: str) -> None:
+    conn.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS {name} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            sensor_type TEXT NOT NULL,
+            unit TEXT,
+            created_at TEXT DEFAULT (datetime('now')),
+            greenhouse_id INTEGER NOT NULL DEFAULT {DEFAULT_GREENHOUSE_ID} REFERENCES Greenhouse(id),
+            zone_id INTEGER NOT NULL DEFAULT {DEFAULT_ZONE_ID} REFERENCES Zone(id),
+            UNIQUE (zone_id, name)
+        )
+        """
+    )
+
+
+def create_sensor_table(conn: sqlite3.Connection) -> None:
+    _create_sensor_table(conn, "Sensor")
+
+
+def sensor_table_outdated(conn: sqlite3.Connection) -> bool:
+    """True for a Sensor table from before zones (no zone_id, name UNIQUE on its own)."""
+    cols = [r[1] for r in conn.execute("PRAGMA table_info(Sensor)")]
+    return bool(cols) and "zone_id" not in cols
+
+
+def upgrade_sensor_table(conn: sqlite3.Connection) -> None:
+    """
+    Rebuild a pre-zone Sensor table, keeping its ids; every existing sensor goes to
+    the default zone. Run with foreign_keys OFF: the legacy Reading table references
+    Sensor and must not cascade (SQLite's create-copy-drop-rename table rebuild).
+    """
+    _create_sensor_table(conn, "Sensor_new")
+    # older databases lack UNIQUE(name): the first row per name wins, as before
+    conn.execute(
+        f"INSERT OR IGNORE INTO Sensor_new ({_SENSOR_COLS}) "
+        f"SELECT id, name, sensor_type, unit, created_at, ?, ? FROM Sensor ORDER BY id",
+        (DEFAULT_GREENHOUSE_ID, DEFAULT_ZONE_ID),
+    )
+    conn.execute("DROP TABLE Sensor")
+    conn.execute("ALTER TABLE Sensor_new RENAME TO Sensor")
+
+
+def ensure_greenhouse(conn: sqlite3.Connection, name: str) -> int:
+    conn.execute("INSERT OR IGNORE INTO Greenhouse (name) VALUES (?)", (name,))
+    return int(conn.execute("SELECT id FROM Greenhouse WHERE name = ?", (name,)).fetchone()[0])
+
+
+def ensure_zone(conn: sqlite3.Connection, greenhouse_id: int, name: str) -> int:
+    conn.execute("INSERT OR IGNORE INTO Zone (greenhouse_id, name) VALUES (?, ?)", (greenhouse_id, name))
+    row = conn.execute("SELECT id FROM Zone WHERE greenhouse_id = ? AND name = ?", (greenhouse_id, name)).fetchone()
+    return int(row[0])
+
+
+def ensure_sensors(conn: sqlite3.Connection, zone_id: int, specs: Sequence[Tuple[str, str, str]]) -> None:
+    """specs: (name, sensor_type, unit) of every sensor the zone should have."""
+    row = conn.execute("SELECT greenhouse_id FROM Zone WHERE id = ?", (zone_id,)).fetchone()
+    if row is None:
+        raise ValueError(f"Unknown zone: {zone_id}")
+    conn.executemany(
+        "INSERT OR IGNORE INTO Sensor (name, sensor_type, unit, greenhouse_id, zone_id) VALUES (?, ?, ?, ?, ?)",
+        [(name, sensor_type, unit, row[0], zone_id) for name, sensor_type, unit in specs],
+    )
+
+
+def load_sensor_ids(conn: sqlite3.Connection) -> Dict[int, Dict[str, int]]:
+    """{zone_id: {sensor name: sensor id}}"""
+    out: Dict[int, Dict[str, int]] = {}
+    for zone_id, name, sid in conn.execute("SELECT zone_id, name, id FROM Sensor"):
+        out.setdefault(int(zone_id), {})[str(name)] = int(sid)
+    return out
+
+
+def list_zones(conn: sqlite3.Connection) -> List[Tuple[int, int, str, str]]:
+    """(zone id, greenhouse id, greenhouse name, zone name) for every zone."""
+    return conn.execute(
+        """
+        SELECT z.id, g.id, g.name, z.name
+        FROM Zone z JOIN Greenhouse g ON g.id = z.greenhouse_id
+        ORDER BY g.id, z.id
+        """
+    ).fetchall()
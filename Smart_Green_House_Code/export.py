@@ -0,0 +1,26 @@
+# export.py
+from __future__ import annotations
+
+import csv
+from typing import Sequence
+
+from config import ITER_CHUNK_ROWS
+from database import DatabaseManager, SENSOR_NAMES
+
+
+def export_csv(db: DatabaseManager, path: str, start=None, end=None,
+               sensors: Sequence[str] = SENSOR_NAMES, chunk_size: int = ITER_CHUNK_ROWS) -> int:
+    """
+    Write history in [start, end] to a CSV file (ts + one column per sensor).
+    Rows are streamed chunk by chunk, so the file can be larger than memory.
+    Returns the number of rows written.
+    """
+    idx = [SENSOR_NAMES.index(s) + 1 for s in sensors]
+    n = 0
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(["ts", *sensors])
+        for chunk in db.iter_chunks(start, end, chunk_size):
+            w.writerows([r[0].isoformat(sep=" "), *(r[i] for i in idx)] for r in chunk)
+            n += len(chunk)
+    return n
@@ -5,37 +5,44 @@ import matplotlib
 matplotlib.use("TkAgg")
 
 import datetime as dt
-from dataclasses import dataclass
+from tkinter import filedialog
+from dataclasses import dataclass, field
 from typing import Dict, List, Optional, Tuple
 
 import customtkinter as ctk
+import numpy as np
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from matplotlib.figure import Figure
 import matplotlib.dates as mdates
 
 from config import (
     DB_NAME, AUTO_INSERT_INTERVAL_SEC,
-    UI_FPS, GRAPH_REFRESH_SEC,
+    UI_FPS, GRAPH_REFRESH_SEC, LOG_VIEW_REFRESH_SEC, LOG_VIEW_MAX_LINES,
     CITIES, SEASONS, PLANTS,
     DEFAULT_CITY_CODE, DEFAULT_SEASON_CODE, DEFAULT_PLANT_CODE,
     DEFAULT_VALUES,
     ANOMALIES, ANOMALY_LABELS,
-    GRAPH_RANGES,
+    GRAPH_RANGES, ITER_CHUNK_ROWS,
     MAINTENANCE_THRESHOLDS_H,
     ACTION_LABELS,
     I18N,
 )
 from database import DatabaseManager
+from export import export_csv
 from simulator import EnvironmentModel
 from logic import GreenhouseLogic
 from logger import EventLogger
+from log_events import LEVELS
 
 
 def fmt_dt(ts: dt.datetime) -> str:
     return ts.strftime("%Y-%m-%d %H:%M:%S")
 
-def parse_ts(ts_str: str) -> dt.datetime:
-    return dt.datetime.fromisoformat(ts_str)
+def parse_ts(ts) -> dt.datetime:
+    # DatabaseManager already returns datetimes; strings are still accepted
+    if isinstance(ts, dt.datetime):
+        return ts
+    return dt.datetime.fromisoformat(ts)
 
 
 @dataclass
@@ -46,6 +53,26 @@ class GraphWindow:
     canvas: FigureCanvasTkAgg
     sensor_key: str
     title: str
+    # cached series: refreshes only pull rows newer than `cursor`
+    mode: str = ""
+    xs: np.ndarray = field(default_factory=lambda: np.empty(0, dtype="datetime64[s]"))
+    ys: np.ndarray = field(default_factory=lambda: np.empty(0, dtype="f8"))
+    cursor: Optional[dt.datetime] = None
+    line: object = None
+
+
+@dataclass
+class LogWindow:
+    top: ctk.CTkToplevel
+    box: ctk.CTkTextbox
+    level_var: ctk.StringVar
+    category_var: ctk.StringVar
+    category_menu: ctk.CTkOptionMenu
+    all_label: str
+    # refreshes only append lines logged after `seq`; `lines` = lines in the box
+    seq: int = 0
+    lines: int = 0
+    categories: Tuple[str, ...] = ()
 
 
 class CollapsibleSection(ctk.CTkFrame):
@@ -97,7 +124,7 @@ class SmartGreenhouseApp(ctk.CTk):
         self.minsize(1200, 700)
 
         # core
-        self.db = DatabaseManager(DB_NAME)
+        self.db = DatabaseManager(DB_NAME, async_writes=True)
         self.model = EnvironmentModel()
         self.logic = GreenhouseLogic()
 
@@ -122,6 +149,8 @@ class SmartGreenhouseApp(ctk.CTk):
 
         # simulated clock
         self.sim_clock: dt.datetime = dt.datetime.now().replace(second=0, microsecond=0)
+        # day source when LOG_ROTATE_DAY = "sim" (a new log segment per simulated day)
+        self.logger.clock = lambda: self.sim_clock
 
         # values
         self.values: Dict[str, float] = dict(DEFAULT_VALUES)
@@ -137,9 +166,11 @@ class SmartGreenhouseApp(ctk.CTk):
         self._latest_reasons: List[str] = []
         self._latest_notes: Dict[str, str] = {}
 
-        # maintenance
+        # maintenance (runtime hours persist across restarts)
         self.runtime_h: Dict[str, float] = {k: 0.0 for k in MAINTENANCE_THRESHOLDS_H.keys()}
+        self.runtime_h.update({k: h for k, h in self.db.load_runtime_hours().items() if k in self.runtime_h})
         self._maintenance_warnings: List[str] = []
+        self._backup_reported = None
 
         # ui vars
         self.diagnostics_text = ctk.StringVar(value=self._t("no_warnings"))
@@ -150,10 +181,16 @@ class SmartGreenhouseApp(ctk.CTk):
         self._graph_windows: Dict[str, GraphWindow] = {}
         self._last_graph_refresh_ts = dt.datetime.min
 
+        # live log window
+        self._log_window: Optional[LogWindow] = None
+        self._last_log_refresh_ts = dt.datetime.min
+
         # build UI
         self._build_layout()
         self._apply_language()
 
+        self.protocol("WM_DELETE_WINDOW", self._on_close)
+
         # start loops
         self._ui_loop()
         self._tick_loop()
@@ -352,6 +389,10 @@ class SmartGreenhouseApp(ctk.CTk):
         ol.pack(fill="x", padx=10, pady=(0, 10))
         self._bind_i18n("open_log", ol, "text")
 
+        bk = ctk.CTkButton(b, text=self._t("backup_now"), command=self._start_backup)
+        bk.pack(fill="x", padx=10, pady=(0, 10))
+        self._bind_i18n("backup_now", bk, "text")
+
         # Manual inputs (collapsed by default)
         self.sec_manual = CollapsibleSection(p, "Ръчни входове")
         self.sec_manual.pack(fill="x", padx=6, pady=(6, 0))
@@ -395,6 +436,10 @@ class SmartGreenhouseApp(ctk.CTk):
             btn.pack(fill="x", padx=10, pady=4)
             self._bind_i18n(key, btn, "text")
 
+        ex = ctk.CTkButton(b, text=self._t("export_csv"), command=self._export_csv)
+        ex.pack(fill="x", padx=10, pady=(4, 10))
+        self._bind_i18n("export_csv", ex, "text")
+
         # init menus after creation
         self._refresh_city_menu()
         self._refresh_season_menu()
@@ -587,41 +632,124 @@ class SmartGreenhouseApp(ctk.CTk):
     def _toggle_fullscreen(self):
         self.attributes("-fullscreen", not bool(self.attributes("-fullscreen")))
 
+    def _on_close(self):
+        try:
+            self.db.close()
+        finally:
+            self.logger.close()
+            self.destroy()
+
     def _apply_anomaly(self):
         code = self.anomaly_code.get()
         if code == "NORMAL":
             self.model.clear_anomaly()
-            self.logger.log("Anomaly cleared -> NORMAL")
+            self.logger.log("Anomaly cleared -> NORMAL", category="anomaly", anomaly=code)
         else:
             self.model.set_anomaly(code, self.sim_clock, duration_hours=3.0)
-            self.logger.log(f"Anomaly set -> {code}")
+            self.logger.log(f"Anomaly set -> {code}", category="anomaly", anomaly=code)
 
     def _open_log_window(self):
+        if self._log_window is not None:
+            try:
+                self._log_window.top.lift()
+                return
+            except Exception:
+                self._log_window = None
+
         top = ctk.CTkToplevel(self)
         top.title(self._t("log_title"))
         top.geometry("900x520")
 
+        all_label = self._t("log_all")
+        row = ctk.CTkFrame(top, fg_color="transparent")
+        row.pack(fill="x", padx=10, pady=(10, 0))
+        level_var = ctk.StringVar(value=all_label)
+        category_var = ctk.StringVar(value=all_label)
+        ctk.CTkLabel(row, text=self._t("log_level")).pack(side="left")
+        ctk.CTkOptionMenu(row, values=[all_label, *LEVELS], variable=level_var,
+                          command=lambda _: self._reload_log_window()).pack(side="left", padx=(6, 16))
+        ctk.CTkLabel(row, text=self._t("log_category")).pack(side="left")
+        category_menu = ctk.CTkOptionMenu(row, values=[all_label], variable=category_var,
+                                          command=lambda _: self._reload_log_window())
+        category_menu.pack(side="left", padx=6)
+
         box = ctk.CTkTextbox(top, wrap="word")
         box.pack(fill="both", expand=True, padx=10, pady=10)
-
-        box.insert("1.0", self.logger.tail(250))
         box.configure(state="disabled")
 
+        self._log_window = LogWindow(top=top, box=box, level_var=level_var, category_var=category_var,
+                                     category_menu=category_menu, all_label=all_label)
+
+        def on_close():
+            self._log_window = None
+            top.destroy()
+
+        top.protocol("WM_DELETE_WINDOW", on_close)
+        self._reload_log_window()
+
+    def _reload_log_window(self):
+        """Filter changed (or first open): empty the box and stream from the start of memory."""
+        lw = self._log_window
+        if lw is None:
+            return
+        lw.box.configure(state="normal")
+        lw.box.delete("1.0", "end")
+        lw.box.configure(state="disabled")
+        lw.seq = lw.lines = 0
+        self._refresh_log_window()
+
+    def _refresh_log_window(self):
+        """Append what was logged since the last refresh; the box never re-renders."""
+        lw = self._log_window
+        try:
+            level = None if lw.level_var.get() == lw.all_label else lw.level_var.get()
+            category = None if lw.category_var.get() == lw.all_label else lw.category_var.get()
+            lw.seq, skipped, lines = self.logger.since(lw.seq, min_level=level, category=category)
+
+            cats = tuple(sorted(self.logger.categories))
+            if cats != lw.categories:
+                lw.categories = cats
+                lw.category_menu.configure(values=[lw.all_label, *cats])
+
+            if skipped and lw.lines:
+                lines.insert(0, f"... {skipped} {self._t('log_skipped')}")
+            if not lines:
+                return
+            box = lw.box
+            # follow the end only if the user has not scrolled up
+            at_end = box.yview()[1] >= 0.999
+            box.configure(state="normal")
+            box.insert("end", "".join(line + "\n" for line in lines))
+            lw.lines += len(lines)
+            if lw.lines > LOG_VIEW_MAX_LINES:
+                box.delete("1.0", f"{lw.lines - LOG_VIEW_MAX_LINES + 1}.0")
+                lw.lines = LOG_VIEW_MAX_LINES
+            box.configure(state="disabled")
+            if at_end:
+                box.see("end")
+        except Exception:
+            # window went away
+            self._log_window = None
+
+    def _start_backup(self):
+        job = self.db.backup()
+        self.logger.log(f"Backup started -> {job.dest_dir}", category="backup")
+
+    def _export_csv(self):
+        path = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=[("CSV", "*.csv")])
+        if not path:
+            return
+        self.db.flush()
+        n = export_csv(self.db, path)
+        self.logger.log(f"Exported {n} readings -> {path}", category="export")
+
     # ---------------- targets / maintenance ----------------
     def _get_plant(self) -> Dict[str, float]:
         code = self.plant_code.get()
         return next((p for p in PLANTS if p["code"] == code), PLANTS[0])
 
     def _targets_for_now(self, now: dt.datetime) -> Dict[str, float]:
-        plant = self._get_plant()
-        night = GreenhouseLogic.is_night(now)
-        t_target = plant["temp_night"] if night else plant["temp_day"]
-        return {
-            "temp_target": float(t_target),
-            "hum_target": float(plant["hum"]),
-            "light_min": float(plant["light_min"]),
-            "soil_min": float(plant["soil_min"]),
-        }
+        return GreenhouseLogic.targets_for(self._get_plant(), now)
 
     def _update_targets_line(self):
         plant = self._get_plant()
@@ -636,9 +764,13 @@ class SmartGreenhouseApp(ctk.CTk):
 
     def _update_maintenance(self, actions: Dict[str, bool], minutes_per_tick: int) -> List[str]:
         dt_h = minutes_per_tick / 60.0
+        deltas = {}
         for k in self.runtime_h.keys():
             if actions.get(k, False):
                 self.runtime_h[k] += dt_h
+                deltas[k] = dt_h
+        # write-behind: queued with this tick's reading, committed with its batch
+        self.db.add_runtime_hours(deltas)
 
         warnings = []
         for k, thr in MAINTENANCE_THRESHOLDS_H.items():
@@ -682,7 +814,8 @@ class SmartGreenhouseApp(ctk.CTk):
             if random.random() < 0.02:
                 pick = random.choice(["fan_fault", "pump_fault", "mister_fault"])
                 setattr(self.model.faults, pick, True)
-                self.logger.log(f"Random fault injected -> {pick}")
+                self.logger.log(f"Random fault injected -> {pick}", level="warning", category="fault",
+                                actuator=pick.split("_")[0])
 
         # maintenance warnings
         maintenance = self._update_maintenance(actions, int(self.minutes_per_tick.get()))
@@ -714,12 +847,13 @@ class SmartGreenhouseApp(ctk.CTk):
                 except Exception:
                     pass
 
-        # save to DB
+        # save to DB (queued, committed in batches by the background writer)
         ts = self.sim_clock.replace(microsecond=0)
-        self.db.insert_reading(
+        self.db.submit_reading(
             self.values["temp"], self.values["humidity"], self.values["light"], self.values["rain"], self.values["soil"],
             ts=ts
         )
+        self.db.submit_actuators(actions, ts=ts)
 
         # store latest UI info
         self._latest_actions = dict(actions)
@@ -730,10 +864,11 @@ class SmartGreenhouseApp(ctk.CTk):
 
         # LOG: anomaly + reasons when something important is ON
         if self.model.active_anomaly != "NORMAL" and "anomaly" in notes:
-            self.logger.log(f"Anomaly active -> {self.model.active_anomaly} ({notes['anomaly']})")
+            self.logger.log(f"Anomaly active -> {self.model.active_anomaly} ({notes['anomaly']})", key="anomaly",
+                            anomaly=self.model.active_anomaly)
         if reasons:
             # keep it short
-            self.logger.log("Reasons: " + "; ".join(reasons[:3]))
+            self.logger.log("Reasons: " + "; ".join(reasons[:3]), key="reasons", category="control")
 
         # schedule next tick
         delay_ms = int(max(200, self.tick_interval_sec.get() * 1000))
@@ -766,6 +901,10 @@ class SmartGreenhouseApp(ctk.CTk):
             self._refresh_open_graphs()
             self._last_graph_refresh_ts = now
 
+        if self._log_window is not None and (now - self._last_log_refresh_ts).total_seconds() >= float(LOG_VIEW_REFRESH_SEC):
+            self._refresh_log_window()
+            self._last_log_refresh_ts = now
+
         self.after(int(1000 / UI_FPS), self._ui_loop)
 
     def _update_clock(self):
@@ -818,6 +957,20 @@ class SmartGreenhouseApp(ctk.CTk):
         if self._latest_notes.get("_maintenance"):
             msgs.append(self._latest_notes["_maintenance"])
 
+        ckpt = self.db.checkpoint_stats()
+        if ckpt.get("lagging") or ckpt.get("error"):
+            msgs.append(f"DB WAL {ckpt['wal_bytes'] / 1e6:.1f} MB, checkpoints behind ({ckpt.get('error') or 'busy'})")
+
+        # background backup: progress while it runs, one log line when it ends
+        job = self.db.backup_job
+        if job is not None:
+            if job.running:
+                msgs.append(f"Backup: {job.fraction:.0%}")
+            elif job is not self._backup_reported:
+                self._backup_reported = job
+                self.logger.log(f"Backup {job.state}: {job.path or job.error or ''}", category="backup",
+                                level="info" if job.state == "done" else "warning")
+
         self.diagnostics_text.set(" | ".join(msgs) if msgs else self._t("no_warnings"))
 
     # ---------------- graphs ----------------
@@ -851,31 +1004,51 @@ class SmartGreenhouseApp(ctk.CTk):
         top.protocol("WM_DELETE_WINDOW", on_close)
         self._draw_graph(gw)
 
-    def _fetch_series(self, sensor_key: str):
-        mode = self.graph_range_var.get()
-        if mode == "all":
-            rows = self.db.fetch_all()
-        elif mode == "last7":
-            rows = self.db.fetch_last_n(7)
-        else:
-            now = self.sim_clock.replace(microsecond=0)
-            hours = 6 if mode == "6h" else 24
-            since = now - dt.timedelta(hours=hours)
-            rows = self.db.fetch_since(fmt_dt(since))
-
-        xs = [parse_ts(r[0]) for r in rows]
+    @staticmethod
+    def _rows_to_arrays(rows, sensor_key: str) -> Tuple[np.ndarray, np.ndarray]:
         idx = {"temp": 1, "humidity": 2, "light": 3, "rain": 4, "soil": 5}[sensor_key]
-        ys = [float(r[idx]) for r in rows]
+        xs = np.array([parse_ts(r[0]) for r in rows], dtype="datetime64[s]")
+        ys = np.array([r[idx] for r in rows], dtype="f8")
         return xs, ys
 
+    def _fetch_series(self, sensor_key: str) -> Tuple[np.ndarray, np.ndarray]:
+        mode = self.graph_range_var.get()
+        if mode in ("24h", "all"):
+            # bucket averages: the whole history from the rollup tiers, the last day
+            # cut into GRAPH_MIN_POINTS buckets in SQL (as fine as the tick allows)
+            if mode == "all":
+                _, buckets = self.db.fetch_rollup(sensor_key)
+            else:
+                since = self.sim_clock.replace(microsecond=0) - dt.timedelta(hours=24)
+                buckets = self.db.fetch_bucketed(sensor_key, start=since)
+            xs = np.array([b[0] for b in buckets], dtype="datetime64[s]")
+            ys = np.array([b[3] for b in buckets], dtype="f8")
+            return xs, ys
+
+        if mode == "last7":
+            return self._rows_to_arrays(self.db.fetch_last_n(7), sensor_key)
+
+        since = self.sim_clock.replace(microsecond=0) - dt.timedelta(hours=6)
+        cols = self.db.fetch_columns([sensor_key], start=since)
+        return cols["t"], cols[sensor_key]
+
     def _draw_graph(self, gw: GraphWindow):
+        """Full reload: query the whole range and redraw the axes."""
         ax = gw.ax
         ax.clear()
 
-        xs, ys = self._fetch_series(gw.sensor_key)
-        ax.plot(xs, ys, linewidth=2)
+        gw.mode = self.graph_range_var.get()
+        gw.xs, gw.ys = self._fetch_series(gw.sensor_key)
+        if gw.mode in ("24h", "all"):
+            # bucket starts are not row timestamps: remember the newest raw row instead
+            last = self.db.fetch_last_n(1)
+            gw.cursor = parse_ts(last[-1][0]) if last else None
+        else:
+            gw.cursor = gw.xs[-1].astype(dt.datetime) if len(gw.xs) else None
+
+        (gw.line,) = ax.plot(gw.xs, gw.ys, linewidth=2)
 
-        ax.set_title(f"{gw.title} (range: {self.graph_range_var.get()})")
+        ax.set_title(f"{gw.title} (range: {gw.mode})")
         ax.grid(True, alpha=0.3)
 
         locator = mdates.AutoDateLocator()
@@ -885,9 +1058,51 @@ class SmartGreenhouseApp(ctk.CTk):
 
         gw.canvas.draw_idle()
 
+    def _update_graph(self, gw: GraphWindow):
+        """Incremental refresh: append rows newer than the cursor, evict what left the window."""
+        if gw.line is None or gw.mode != self.graph_range_var.get() or (gw.cursor and self.sim_clock < gw.cursor):
+            # range changed or the clock was moved back: start over
+            self._draw_graph(gw)
+            return
+
+        if gw.mode in ("24h", "all"):
+            # rollup-backed ranges: re-read the (few) buckets when a newer raw row exists
+            last = self.db.fetch_last_n(1)
+            if not last or (gw.cursor is not None and parse_ts(last[-1][0]) <= gw.cursor):
+                return
+            gw.cursor = parse_ts(last[-1][0])
+            gw.xs, gw.ys = self._fetch_series(gw.sensor_key)
+        else:
+            changed = False
+            # page through what is new after the cursor, evicting as we go (bounded even after a long pause)
+            while True:
+                rows = self.db.fetch_after(gw.cursor, limit=ITER_CHUNK_ROWS)
+                if not rows:
+                    break
+                gw.cursor = parse_ts(rows[-1][0])
+                new_x, new_y = self._rows_to_arrays(rows, gw.sensor_key)
+                xs = np.concatenate([gw.xs, new_x])
+                ys = np.concatenate([gw.ys, new_y])
+                if gw.mode == "last7":
+                    drop = max(0, len(xs) - 7)
+                else:
+                    since = self.sim_clock.replace(microsecond=0) - dt.timedelta(hours=6)
+                    drop = int(np.searchsorted(xs, np.datetime64(since, "s")))
+                gw.xs, gw.ys = xs[drop:], ys[drop:]
+                changed = True
+                if len(rows) < ITER_CHUNK_ROWS:
+                    break
+            if not changed:
+                return
+
+        gw.line.set_data(gw.xs, gw.ys)
+        gw.ax.relim()
+        gw.ax.autoscale_view()
+        gw.canvas.draw_idle()
+
     def _refresh_open_graphs(self):
         for k, gw in list(self._graph_windows.items()):
             try:
-                self._draw_graph(gw)
+                self._update_graph(gw)
             except Exception:
                 self._graph_windows.pop(k, None)
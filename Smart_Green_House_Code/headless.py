@@ -0,0 +1,235 @@
+# headless.py
+# Fast-forward simulation without the GUI (no Tk / matplotlib import): the same
+# model -> logic -> database steps as SmartGreenhouseApp._tick_loop, as fast as the
+# CPU allows, written in chunks through DatabaseManager.record_ticks.
+#
+#   python -m headless --days 365 --city Sofia --season SUMMER --plant TOMATO --anomaly HEAT_WAVE
+from __future__ import annotations
+
+import argparse
+import datetime as dt
+import random
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from config import (
+    CITIES, SEASONS, PLANTS, ANOMALIES,
+    DEFAULT_CITY_CODE, DEFAULT_SEASON_CODE, DEFAULT_PLANT_CODE, DEFAULT_VALUES,
+    MAINTENANCE_THRESHOLDS_H, RANDOM_FAULT_PROB, BULK_CHUNK_ROWS,
+    HEADLESS_DB_NAME, HEADLESS_MINUTES_PER_TICK, HEADLESS_ANOMALY_HOURS,
+)
+from analytics import summarize
+from database import DatabaseManager
+from logger import EventLogger
+from logic import GreenhouseLogic
+from simulator import EnvironmentModel
+
+Tick = Tuple[dt.datetime, Tuple[float, float, float, float, float], Dict[str, bool], Dict[str, float]]
+
+
+@dataclass
+class RunStats:
+    ticks: int = 0
+    start: Optional[dt.datetime] = None
+    end: Optional[dt.datetime] = None
+    elapsed_sec: float = 0.0
+    on_hours: Dict[str, float] = field(default_factory=dict)
+    faults: int = 0
+    anomalies: int = 0
+
+
+class HeadlessSim:
+    """
+    One greenhouse, stepped tick by tick on a simulated clock. `anomaly` is set at
+    the start (and again every anomaly_every_days, 0 = once) for anomaly_hours, like
+    the GUI's anomaly menu; random_faults injects faults with RANDOM_FAULT_PROB per
+    tick. Seeded, so a run can be repeated.
+    """
+
+    def __init__(
+        self,
+        city: str = DEFAULT_CITY_CODE,
+        season: str = DEFAULT_SEASON_CODE,
+        plant: str = DEFAULT_PLANT_CODE,
+        anomaly: str = "NORMAL",
+        anomaly_hours: float = HEADLESS_ANOMALY_HOURS,
+        anomaly_every_days: float = 0.0,
+        minutes_per_tick: int = HEADLESS_MINUTES_PER_TICK,
+        start: Optional[dt.datetime] = None,
+        rain_forecast: bool = False,
+        random_faults: bool = False,
+        seed: Optional[int] = None,
+        logger: Optional[EventLogger] = None,
+    ):
+        if anomaly not in ANOMALIES:
+            raise ValueError(f"Unknown anomaly: {anomaly}")
+        self.city = city
+        self.season = season
+        self.plant = next((p for p in PLANTS if p["code"] == plant), None)
+        if self.plant is None:
+            raise ValueError(f"Unknown plant: {plant}")
+        self.anomaly = anomaly
+        self.anomaly_hours = float(anomaly_hours)
+        self.anomaly_every = dt.timedelta(days=float(anomaly_every_days)) if anomaly_every_days else None
+        self.minutes_per_tick = max(1, int(minutes_per_tick))
+        self.rain_forecast = bool(rain_forecast)
+        self.random_faults = bool(random_faults)
+        self.rng = random.Random(seed)
+        self.logger = logger
+
+        self.clock = (start or dt.datetime.now()).replace(second=0, microsecond=0)
+        self.values: Dict[str, float] = dict(DEFAULT_VALUES)
+        self.model = EnvironmentModel()
+        self.logic = GreenhouseLogic()
+        self.runtime_h: Dict[str, float] = {k: 0.0 for k in MAINTENANCE_THRESHOLDS_H.keys()}
+        self._next_anomaly: Optional[dt.datetime] = self.clock if anomaly != "NORMAL" else None
+        self.stats = RunStats(start=self.clock)
+
+    def _log(self, msg: str, **kwargs) -> None:
+        if self.logger is not None:
+            self.logger.log(msg, **kwargs)
+
+    def step(self) -> Tick:
+        """Advance one tick; returns what the GUI would submit for it."""
+        self.clock += dt.timedelta(minutes=self.minutes_per_tick)
+        now = self.clock
+
+        if self._next_anomaly is not None and now >= self._next_anomaly:
+            self.model.set_anomaly(self.anomaly, now, duration_hours=self.anomaly_hours)
+            self.stats.anomalies += 1
+            self._log(f"Anomaly set -> {self.anomaly}", category="anomaly", anomaly=self.anomaly)
+            self._next_anomaly = now + self.anomaly_every if self.anomaly_every else None
+
+        faults = {
+            "fan_fault": self.model.faults.fan_fault,
+            "pump_fault": self.model.faults.pump_fault,
+            "mister_fault": self.model.faults.mister_fault,
+        }
+        rain_fc = self.rain_forecast or (self.model.active_anomaly == "RAIN_FORECAST")
+        actions, reasons = self.logic.compute(
+            values=self.values,
+            targets=GreenhouseLogic.targets_for(self.plant, now),
+            rain_forecast=rain_fc,
+            faults=faults,
+            now=now,
+        )
+
+        if self.random_faults and self.rng.random() < RANDOM_FAULT_PROB:
+            pick = self.rng.choice(["fan_fault", "pump_fault", "mister_fault"])
+            setattr(self.model.faults, pick, True)
+            self.stats.faults += 1
+            self._log(f"Random fault injected -> {pick}", level="warning", category="fault",
+                      actuator=pick.split("_")[0])
+
+        dt_h = self.minutes_per_tick / 60.0
+        deltas = {k: dt_h for k in self.runtime_h.keys() if actions.get(k, False)}
+        for k, h in deltas.items():
+            self.runtime_h[k] += h
+
+        new_vals, notes = self.model.apply_tick(
+            values=self.values,
+            actions=actions,
+            city_code=self.city,
+            season_code=self.season,
+            now=now,
+            minutes_per_tick=self.minutes_per_tick,
+            rain_forecast=rain_fc,
+        )
+        self.values.update(new_vals)
+
+        if self.logger is not None:
+            if self.model.active_anomaly != "NORMAL" and "anomaly" in notes:
+                self._log(f"Anomaly active -> {self.model.active_anomaly} ({notes['anomaly']})", key="anomaly",
+                          anomaly=self.model.active_anomaly)
+            if reasons:
+                self._log("Reasons: " + "; ".join(reasons[:3]), key="reasons", category="control")
+
+        v = self.values
+        self.stats.ticks += 1
+        self.stats.end = now
+        return now, (v["temp"], v["humidity"], v["light"], v["rain"], v["soil"]), actions, deltas
+
+    def ticks(self, n: int) -> Iterator[Tick]:
+        for _ in range(int(n)):
+            yield self.step()
+
+
+def run(db: DatabaseManager, sim: HeadlessSim, days: float, chunk_size: int = BULK_CHUNK_ROWS) -> RunStats:
+    """Simulate `days` of operation into `db`; ticks are generated while the database consumes them."""
+    n = int(round(float(days) * 24 * 60 / sim.minutes_per_tick))
+    st = time.perf_counter()
+    db.record_ticks(sim.ticks(n), chunk_size=chunk_size)
+    sim.stats.elapsed_sec = time.perf_counter() - st
+    sim.stats.on_hours = {k: round(h, 2) for k, h in sim.runtime_h.items()}
+    return sim.stats
+
+
+def _parse_start(text: str) -> dt.datetime:
+    try:
+        return dt.datetime.fromisoformat(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"not an ISO date/time: {text}")
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m headless", description="Fast-forward greenhouse simulation (no GUI).")
+    ap.add_argument("--days", type=float, default=365.0, help="simulated days (default: 365)")
+    ap.add_argument("--city", choices=[c["code"] for c in CITIES], default=DEFAULT_CITY_CODE)
+    ap.add_argument("--season", choices=[s["code"] for s in SEASONS], default=DEFAULT_SEASON_CODE)
+    ap.add_argument("--plant", choices=[p["code"] for p in PLANTS], default=DEFAULT_PLANT_CODE)
+    ap.add_argument("--anomaly", choices=ANOMALIES, default="NORMAL")
+    ap.add_argument("--anomaly-hours", type=float, default=HEADLESS_ANOMALY_HOURS)
+    ap.add_argument("--anomaly-every-days", type=float, default=0.0, help="repeat the anomaly (0 = once, at the start)")
+    ap.add_argument("--minutes-per-tick", type=int, default=HEADLESS_MINUTES_PER_TICK)
+    ap.add_argument("--start", type=_parse_start, default=None, help="simulated start, e.g. 2026-01-01T00:00")
+    ap.add_argument("--rain-forecast", action="store_true")
+    ap.add_argument("--random-faults", action="store_true")
+    ap.add_argument("--seed", type=int, default=None)
+    ap.add_argument("--db", default=HEADLESS_DB_NAME, help=f"database file (default: {HEADLESS_DB_NAME})")
+    ap.add_argument("--log", default=None, help="also write the event log to this file (slower)")
+    ap.add_argument("--housekeeping", action="store_true", help="archive / retention / vacuum after the run")
+    args = ap.parse_args(argv)
+
+    logger = None
+    if args.log:
+        # a fast-forward run spans many simulated days per write batch: rotate by size only
+        logger = EventLogger(args.log, events_path=args.log + ".events.jsonl", rate_limits={}, rotate_day="")
+    sim = HeadlessSim(
+        city=args.city, season=args.season, plant=args.plant,
+        anomaly=args.anomaly, anomaly_hours=args.anomaly_hours, anomaly_every_days=args.anomaly_every_days,
+        minutes_per_tick=args.minutes_per_tick, start=args.start,
+        rain_forecast=args.rain_forecast, random_faults=args.random_faults, seed=args.seed, logger=logger,
+    )
+
+    db = DatabaseManager(args.db, housekeeping=False)
+    try:
+        stats = run(db, sim, args.days)
+        # one streamed pass over what the run wrote
+        sensors = summarize(db.iter_range(stats.start, stats.end)) if stats.ticks else {}
+        if args.housekeeping:
+            db.housekeeping()
+    finally:
+        db.close()
+        if logger is not None:
+            logger.close()
+
+    rate = stats.ticks / stats.elapsed_sec if stats.elapsed_sec else 0.0
+    print(f"{stats.ticks} ticks ({stats.start:%Y-%m-%d %H:%M} .. {stats.end:%Y-%m-%d %H:%M}) "
+          f"in {stats.elapsed_sec:.2f} s, {rate:.0f} ticks/s -> {args.db}")
+    print("final: " + ", ".join(f"{k} {v:.1f}" for k, v in sim.values.items()))
+    for name, st in sensors.items():
+        if st.count:
+            print(f"{name}: mean {st.mean:.1f}, min {st.min:.1f}, max {st.max:.1f}, std {st.std:.1f}")
+    print("on hours: " + ", ".join(f"{k} {h:.0f}" for k, h in stats.on_hours.items()))
+    if stats.anomalies or stats.faults:
+        print(f"anomalies set: {stats.anomalies}, random faults: {stats.faults}")
+    warnings: List[str] = [k for k, thr in MAINTENANCE_THRESHOLDS_H.items() if stats.on_hours.get(k, 0.0) >= thr]
+    if warnings:
+        print("maintenance due: " + ", ".join(warnings))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
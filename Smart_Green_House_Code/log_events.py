@@ -0,0 +1,197 @@
+# log_events.py
+# Structured event log: one compact JSON object per line, "t" always first
+# ({"t":"YYYY-mm-dd HH:MM:SS","level":...,"category":...,"msg":...}), so a line's time
+# can be read without parsing it. Times never go backwards within the file.
+# Next to it, <file>.idx is a sparse index: every `index_every` records one
+# "<t>\t<byte offset>" line, so a query binary-searches the index, seeks to the
+# nearest entry before its start and reads at most index_every records it does not need.
+# A rotated log is read as its segments (each with its own index), oldest first.
+from __future__ import annotations
+
+import bisect
+import datetime as dt
+import json
+import os
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+TimeArg = Union[str, dt.datetime, None]
+Paths = Union[str, Sequence[str]]
+
+LEVELS = ("debug", "info", "warning", "error")
+_T = slice(6, 25)                 # {"t":"<19 chars>"
+
+
+def _t(value: TimeArg) -> Optional[str]:
+    if value is None or isinstance(value, str):
+        return value
+    return value.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def encode(record: Dict) -> bytes:
+    return (json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+
+
+def load_index(path: str) -> List[Tuple[str, int]]:
+    """(t, offset) entries of path's sparse index; [] when there is none."""
+    out: List[Tuple[str, int]] = []
+    try:
+        with open(path + ".idx", "r", encoding="utf-8") as f:
+            for line in f:
+                t, _, off = line.rstrip("\n").partition("\t")
+                if len(t) == 19 and off.isdigit():
+                    out.append((t, int(off)))
+    except OSError:
+        pass
+    return out
+
+
+def _first_t(path: str) -> Optional[str]:
+    # the first record is always indexed
+    try:
+        with open(path + ".idx", "r", encoding="utf-8") as f:
+            t = f.readline().partition("\t")[0]
+    except OSError:
+        return None
+    return t if len(t) == 19 else None
+
+
+class EventWriter:
+    """
+    Appends records to the events file and keeps its index. Not thread-safe: the
+    logger calls it from one writer at a time. Opening an existing file scans only
+    what follows its last index entry (or the whole file once when the index is
+    missing or does not match, e.g. after a crash between the two writes).
+    last_t carries the clamp over from the previous segment after a rotation.
+    """
+
+    def __init__(self, path: str, index_every: int, last_t: str = ""):
+        self.path = path
+        self.index_every = max(1, int(index_every))
+        self.last_t = last_t
+        self._since_index = 0
+        self._f = open(path, "ab")
+        self._idx = open(path + ".idx", "a", encoding="utf-8")
+        self._recover()
+
+    def _recover(self) -> None:
+        size = self._f.seek(0, os.SEEK_END)
+        if size:
+            with open(self.path, "rb") as f:
+                f.seek(size - 1)
+                torn = f.read(1) != b"\n"
+            if torn:
+                # a write cut short: end the partial line, queries skip it
+                self._f.write(b"\n")
+                size += 1
+        entries = load_index(self.path)
+        rebuild = not entries or entries[-1][1] >= size
+        if rebuild:
+            self._idx.close()
+            self._idx = open(self.path + ".idx", "w", encoding="utf-8")
+        start = 0 if rebuild else entries[-1][1]
+        with open(self.path, "rb") as f:
+            f.seek(start)
+            off = start
+            for line in f:
+                if len(line) > 25:
+                    t = line[_T].decode("ascii", errors="replace")
+                    # on resume the record at `start` is indexed already
+                    if self._since_index % self.index_every == 0 and (rebuild or off != start):
+                        self._idx.write(f"{t}\t{off}\n")
+                        self._since_index = 0
+                    self._since_index += 1
+                    self.last_t = max(self.last_t, t)
+                off += len(line)
+        self._idx.flush()
+
+    def append(self, records: List[Dict]) -> None:
+        data = []
+        off = self._f.tell()
+        for rec in records:
+            # clamp: a drained/held line may carry a slightly older stamp
+            t = max(str(rec.get("t") or ""), self.last_t)
+            self.last_t = t
+            line = encode({"t": t, **{k: v for k, v in rec.items() if k != "t"}})
+            if self._since_index % self.index_every == 0:
+                self._idx.write(f"{t}\t{off}\n")
+                self._since_index = 0
+            self._since_index += 1
+            data.append(line)
+            off += len(line)
+        self._f.write(b"".join(data))
+        self._f.flush()
+        self._idx.flush()
+
+    def close(self) -> None:
+        self._f.close()
+        self._idx.close()
+
+
+def _start_offset(path: str, start: Optional[str]) -> int:
+    if start is None:
+        return 0
+    entries = load_index(path)
+    # last entry strictly before start: everything before it is older than start
+    i = bisect.bisect_left(entries, (start, -1)) - 1
+    return entries[i][1] if i >= 0 else 0
+
+
+def iter_events(
+    paths: Paths,
+    start: TimeArg = None,
+    end: TimeArg = None,
+    category: Optional[str] = None,
+    level: Optional[str] = None,
+    actuator: Optional[str] = None,
+    anomaly: Optional[str] = None,
+) -> Iterator[Dict]:
+    """
+    Records with start <= t <= end matching every filter given, oldest first. paths
+    is one events file or the files of a rotated log, oldest first.
+    """
+    files = [paths] if isinstance(paths, str) else list(paths)
+    start_s, end_s = _t(start), _t(end)
+    want = {k: v for k, v in (("category", category), ("level", level), ("actuator", actuator),
+                              ("anomaly", anomaly)) if v is not None}
+    # cheap byte test before json.loads; the parsed record is checked exactly
+    needles = [encode({k: v})[1:-2] for k, v in want.items()]
+    for i, path in enumerate(files):
+        if start_s is not None and i + 1 < len(files):
+            # a segment ends where the next one starts: skip the ones wholly before start
+            nxt = _first_t(files[i + 1])
+            if nxt is not None and nxt < start_s:
+                continue
+        try:
+            f = open(path, "rb")
+        except OSError:
+            # pruned since it was listed
+            continue
+        with f:
+            f.seek(_start_offset(path, start_s))
+            for line in f:
+                if len(line) <= 25 or not line.endswith(b"\n"):
+                    continue
+                t = line[_T].decode("ascii", errors="replace")
+                if start_s is not None and t < start_s:
+                    continue
+                if end_s is not None and t > end_s:
+                    return
+                if any(n not in line for n in needles):
+                    continue
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    continue
+                if all(rec.get(k) == v for k, v in want.items()):
+                    yield rec
+
+
+def query(paths: Paths, start: TimeArg = None, end: TimeArg = None, category: Optional[str] = None,
+          level: Optional[str] = None, actuator: Optional[str] = None, anomaly: Optional[str] = None,
+          limit: Optional[int] = None) -> List[Dict]:
+    out: List[Dict] = []
+    for rec in iter_events(paths, start, end, category, level, actuator, anomaly):
+        out.append(rec)
+        if limit is not None and len(out) >= limit:
+            break
+    return out
@@ -1,35 +1,584 @@
 # logger.py
 from __future__ import annotations
 
+import atexit
 import datetime as dt
-from typing import List
-from config import LOG_FILE
+import gzip
+import os
+import shutil
+import threading
+import time
+from collections import deque
+from itertools import islice
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, List, Optional, Set, TextIO, Tuple
+from config import (
+    LOG_FILE, LOG_BUFFERED, LOG_QUEUE_MAX, LOG_OVERFLOW, LOG_FLUSH_MS,
+    LOG_ROTATE_BYTES, LOG_ROTATE_DAY, LOG_KEEP, LOG_COMPRESS,
+    LOG_COALESCE_REPEATS, LOG_REPEAT_SUMMARY_SEC, LOG_RATE_LIMITS_SEC,
+    LOG_STRUCTURED, LOG_EVENTS_FILE, LOG_EVENTS_INDEX_EVERY,
+)
+import log_events
+from log_events import LEVELS, EventWriter, TimeArg
+
+# (message, timestamp, event fields: level / category / actuator / anomaly / ...)
+_Event = Tuple[str, str, Dict[str, Any]]
+
+OVERFLOW_POLICIES = ("drop", "block", "coalesce")
+ROTATE_DAY_MODES = ("", "wall", "sim")
+
+
+def tail_lines(path: str, n: int, block_size: int = 8192) -> List[str]:
+    """
+    Last n lines of a UTF-8 text file, each ending in "\\n" (except an unterminated
+    last line), read backwards from the end in blocks: the cost depends on n, not on
+    the file size. Splitting on b"\\n" is safe for UTF-8 (that byte never occurs
+    inside a multi-byte character) and only whole lines are decoded.
+    """
+    if n <= 0:
+        return []
+    with open(path, "rb") as f:
+        end = f.seek(0, 2)
+        pos, data, found = end, b"", 0
+        need = n
+        while pos > 0:
+            step = min(block_size, pos)
+            pos -= step
+            f.seek(pos)
+            chunk = f.read(step)
+            if not data and chunk.endswith(b"\n"):
+                # the final newline ends the last line, it does not start one
+                need = n + 1
+            data = chunk + data
+            found += chunk.count(b"\n")
+            if found >= need:
+                break
+    if not data:
+        return []
+    terminated = data.endswith(b"\n")
+    lines = data.split(b"\n")
+    if terminated:
+        lines.pop()
+    if pos > 0:
+        # starts somewhere inside a line
+        lines = lines[1:]
+    lines = lines[-n:]
+    out = [line.decode("utf-8", errors="replace").rstrip("\r") + "\n" for line in lines]
+    if out and not terminated:
+        out[-1] = out[-1][:-1]
+    return out
+
+
+def segments(path: str) -> List[str]:
+    """Rotated segments of the log at `path` (path.<stamp>[.gz]), oldest first."""
+    folder, base = os.path.split(os.path.abspath(path))
+    prefix = base + "."
+    names = [
+        n for n in os.listdir(folder)
+        if n.startswith(prefix) and not n.endswith((".part", ".idx")) and n[len(prefix):len(prefix) + 1].isdigit()
+    ]
+    # the stamp sorts; ".gz" must not take part (x.gz vs x-1)
+    names.sort(key=lambda n: n[:-3] if n.endswith(".gz") else n)
+    return [os.path.join(folder, n) for n in names]
+
+
+def _segment_tail(path: str, n: int) -> List[str]:
+    if not path.endswith(".gz") and not os.path.exists(path):
+        # compressed since it was listed
+        path += ".gz"
+    if not path.endswith(".gz"):
+        return tail_lines(path, n)
+    # a gzip stream can only be read forwards; segments are small (rotate_bytes)
+    with gzip.open(path, "rt", encoding="utf-8", errors="replace") as f:
+        return list(deque(f, maxlen=n))
+
+
+@dataclass
+class _Streak:
+    # per log key: the message last written and what was held back since
+    msg: str
+    fields: Dict[str, Any]
+    emitted_at: float                    # monotonic time of the last line written for the key
+    repeats: int = 0                     # identical messages not written
+    first: str = ""                      # timestamps of the first / last of those
+    last: str = ""
+    held: int = 0                        # different messages held back by the rate limit
+    pending: Optional[_Event] = None     # the newest of them
+
 
 class EventLogger:
-    def __init__(self, file_path: str = LOG_FILE, keep_last: int = 400):
+    """
+    Event log: the newest keep_last lines in memory plus an append-only file.
+
+    With buffered=True, log() only queues the line; a background thread appends
+    queued lines in batches (one write + flush per batch, the file stays open),
+    so a caller never waits on the file. When queue_max lines are pending:
+      drop      the new line is dropped (a "... dropped" line is written later)
+      block     log() waits for the flusher
+      coalesce  lines are counted per message and each message is written once
+                with its count; lines with a message not counted yet are dropped
+                once queue_max messages are being counted
+    close() (also run at exit) writes everything still queued.
+
+    Rotation: before a batch is written, the file is moved aside to
+    <file>.<YYYYmmdd-HHMMSS-micros> when the batch would take it past rotate_bytes, or when
+    the day has changed since the segment was started (rotate_day "wall" uses the
+    wall clock, "sim" uses clock(), e.g. the simulated clock). A background thread
+    gzips moved segments and deletes all but the newest `keep`. tail() reads on into
+    the segments when the current file holds fewer than n lines. The events file
+    and its index are cut at the same time under the same stamp and pruned to
+    `keep` as well (not gzipped: queries seek into them).
+
+    Repeats: log(msg, key) compares msg with the last message written for the same
+    key (messages without a key form one stream). An identical message is only
+    counted; the count is written as one "(repeated xN, first .. last)" line when a
+    different message arrives, every repeat_summary_sec while the streak lasts, and
+    on flush() / close(). rate_limits {key: seconds} additionally hold back
+    *different* messages of a key (e.g. "Reasons: ..." with live readings) until
+    that long after its last line; the next line written says how many were held.
+
+    Structured: every line written is also appended to events_path as a typed JSON
+    record (t, level, category, actuator, anomaly, msg; repeat / held counts), with
+    a sparse offset index every index_every records. query() seeks straight to a
+    time range, across the rotated segments, and filters by category / level /
+    actuator / anomaly (log_events).
+    """
+
+    def __init__(self, file_path: str = LOG_FILE, keep_last: int = 400, buffered: bool = LOG_BUFFERED,
+                 queue_max: int = LOG_QUEUE_MAX, overflow: str = LOG_OVERFLOW, flush_ms: float = LOG_FLUSH_MS,
+                 rotate_bytes: int = LOG_ROTATE_BYTES, rotate_day: str = LOG_ROTATE_DAY, keep: int = LOG_KEEP,
+                 compress: bool = LOG_COMPRESS, clock: Optional[Callable[[], dt.datetime]] = None,
+                 coalesce_repeats: bool = LOG_COALESCE_REPEATS, repeat_summary_sec: float = LOG_REPEAT_SUMMARY_SEC,
+                 rate_limits: Optional[Dict[str, float]] = None, structured: bool = LOG_STRUCTURED,
+                 events_path: str = LOG_EVENTS_FILE, index_every: int = LOG_EVENTS_INDEX_EVERY):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {overflow}")
+        if rotate_day not in ROTATE_DAY_MODES:
+            raise ValueError(f"Unknown rotate_day: {rotate_day}")
         self.file_path = file_path
         self.keep_last = keep_last
-        self._buffer: List[str] = []
+        # newest keep_last lines as (seq, line, fields) for tail() and live viewers (since());
+        # starts with the end of the file (no fields) so a viewer also shows the previous run
+        self._buffer: Deque[Tuple[int, str, Dict[str, Any]]] = deque(maxlen=max(1, int(keep_last)))
+        self._buffer_lock = threading.Lock()
+        self._seq = 0
+        self.categories: Set[str] = set()        # seen so far, for filters
+        try:
+            for line in tail_lines(file_path, self.keep_last):
+                self._seq += 1
+                self._buffer.append((self._seq, line.rstrip("\n"), {}))
+        except OSError:
+            pass
+
+        self.buffered = bool(buffered)
+        self.queue_max = max(1, int(queue_max))
+        self.overflow = overflow
+        self.flush_sec = max(0.0, float(flush_ms) / 1000.0)
+
+        # rotation
+        self.rotate_bytes = max(0, int(rotate_bytes))
+        self.rotate_day = rotate_day
+        self.keep = max(0, int(keep))
+        self.compress = bool(compress)
+        self.clock = clock               # day source for rotate_day="sim" (wall clock until set)
+        self._seg_day: Optional[dt.date] = None
+        self._io_lock = threading.RLock()
+        self._gz_lock = threading.Lock()
+        self._gz_thread: Optional[threading.Thread] = None
+        self._gz_pending = False
+        self.rotations = 0
+
+        # repeats / rate limits
+        self.coalesce_repeats = bool(coalesce_repeats)
+        self.repeat_summary_sec = max(0.0, float(repeat_summary_sec))
+        self.rate_limits: Dict[str, float] = dict(LOG_RATE_LIMITS_SEC if rate_limits is None else rate_limits)
+        self._streaks: Dict[Optional[str], _Streak] = {}
+        self._streak_lock = threading.Lock()
+        self.repeats = 0
+        self.rate_limited = 0
+
+        # structured events
+        self.structured = bool(structured)
+        self.events_path = events_path
+        self.index_every = max(1, int(index_every))
+        self._events: Optional[EventWriter] = None
+        self._events_last_t = ""
+
+        self._q: Deque[Tuple[str, Optional[Dict[str, Any]]]] = deque()   # (line, event record)
+        # coalesce: message -> [count, first ts, last ts, fields] of lines that did not fit
+        self._repeats: Dict[str, List] = {}
+        self._cv = threading.Condition()
+        self._queued = 0
+        self._written = 0
+        self._closed = False
+        self._flush_now = False
 
-    def log(self, msg: str) -> None:
+        # stats
+        self.dropped = 0
+        self.coalesced = 0
+        self._dropped_reported = 0
+        self.last_error: Optional[BaseException] = None
+
+        self._thread: Optional[threading.Thread] = None
+        if self.buffered:
+            self._thread = threading.Thread(target=self._run, name="log-flusher", daemon=True)
+            self._thread.start()
+            atexit.register(self.close)
+
+    def log(self, msg: str, key: Optional[str] = None, level: str = "info", category: Optional[str] = None,
+            actuator: Optional[str] = None, anomaly: Optional[str] = None) -> None:
+        """
+        key groups messages for repeat coalescing and rate limits; level, category
+        (default: the key, else "general"), actuator and anomaly only go to the
+        structured event record.
+        """
+        if level not in LEVELS:
+            raise ValueError(f"Unknown level: {level}")
         ts = dt.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        fields: Dict[str, Any] = {"level": level, "category": category or key or "general"}
+        if actuator is not None:
+            fields["actuator"] = actuator
+        if anomaly is not None:
+            fields["anomaly"] = anomaly
+        if not self.coalesce_repeats and not self.rate_limits:
+            self._emit(msg, ts, fields)
+            return
+        with self._streak_lock:
+            out = self._coalesce(msg, key, ts, fields)
+        for m, t, f in out:
+            self._emit(m, t, f)
+
+    def _coalesce(self, msg: str, key: Optional[str], ts: str, fields: Dict[str, Any]) -> List[_Event]:
+        # called with _streak_lock held: the lines to write for one log() call
+        now = time.monotonic()
+        st = self._streaks.get(key)
+        if st is None:
+            self._streaks[key] = _Streak(msg, fields, now)
+            return [(msg, ts, fields)]
+        if self.coalesce_repeats and msg == st.msg:
+            self.repeats += 1
+            st.repeats += 1
+            st.first = st.first or ts
+            st.last = ts
+            if self.repeat_summary_sec and now - st.emitted_at >= self.repeat_summary_sec:
+                return self._streak_lines(st, now, final=False)
+            return []
+        limit = self.rate_limits.get(key, 0.0) if key is not None else 0.0
+        if limit and now - st.emitted_at < limit:
+            self.rate_limited += 1
+            st.held += 1
+            st.pending = (msg, ts, fields)
+            return []
+        out = self._streak_lines(st, now, final=False)
+        if st.held:
+            out.append((f"{msg} (+{st.held} held back)", ts, dict(fields, held=st.held, msg0=msg)))
+        else:
+            out.append((msg, ts, fields))
+        self._streaks[key] = _Streak(msg, fields, now)
+        return out
+
+    def _streak_lines(self, st: _Streak, now: float, final: bool) -> List[_Event]:
+        out = []
+        if st.repeats:
+            out.append((
+                f"{st.msg} (repeated x{st.repeats}, {st.first} .. {st.last})", st.last,
+                dict(st.fields, repeat=st.repeats, first=st.first, msg0=st.msg),
+            ))
+            st.repeats, st.first, st.last = 0, "", ""
+            st.emitted_at = now
+        if final and st.pending is not None:
+            msg, ts, fields = st.pending
+            if st.held > 1:
+                out.append((f"{msg} (+{st.held - 1} held back)", ts, dict(fields, held=st.held - 1, msg0=msg)))
+            else:
+                out.append((msg, ts, fields))
+            st.msg, st.fields, st.emitted_at, st.held, st.pending = msg, fields, now, 0, None
+        return out
+
+    def _drain_streaks(self) -> None:
+        # write what repeats / rate limits still hold
+        now = time.monotonic()
+        with self._streak_lock:
+            out = [ev for st in self._streaks.values() for ev in self._streak_lines(st, now, final=True)]
+        for m, t, f in out:
+            self._emit(m, t, f)
+
+    def _emit(self, msg: str, ts: str, fields: Dict[str, Any]) -> None:
         line = f"[{ts}] {msg}"
-        self._buffer.append(line)
-        if len(self._buffer) > self.keep_last:
-            self._buffer = self._buffer[-self.keep_last:]
+        with self._buffer_lock:
+            self._seq += 1
+            self._buffer.append((self._seq, line, fields))
+            self.categories.add(fields.get("category", "general"))
+
+        if self.buffered and self._enqueue(msg, ts, line, fields):
+            return
+        # unbuffered, or closed already: straight to the file
+        self._write_lines([line], records=[self._record(msg, ts, fields)] if self.structured else None)
+
+    @staticmethod
+    def _record(msg: str, ts: str, fields: Dict[str, Any]) -> Dict[str, Any]:
+        rec = {"t": ts}
+        rec.update(fields)
+        # repeat / held-back summaries keep the plain message: the text line has the counts in it
+        rec["msg"] = rec.pop("msg0", msg)
+        return rec
+
+    def _enqueue(self, msg: str, ts: str, line: str, fields: Dict[str, Any]) -> bool:
+        with self._cv:
+            if self._closed:
+                return False
+            if len(self._q) >= self.queue_max:
+                if self.overflow == "block":
+                    self._cv.wait_for(lambda: len(self._q) < self.queue_max or self._closed)
+                    if self._closed:
+                        return False
+                elif self.overflow == "coalesce" and (msg in self._repeats or len(self._repeats) < self.queue_max):
+                    # up to queue_max distinct messages are counted; a new one past that is dropped
+                    rep = self._repeats.setdefault(msg, [0, ts, ts, fields])
+                    rep[0] += 1
+                    rep[2] = ts
+                    self.coalesced += 1
+                    return True
+                else:
+                    self.dropped += 1
+                    return True
+            self._q.append((line, self._record(msg, ts, fields) if self.structured else None))
+            self._queued += 1
+            self._cv.notify_all()
+            return True
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until everything logged so far is in the file (no-op when not buffered)."""
+        self._drain_streaks()
+        return self._wait_written(timeout)
+
+    def _wait_written(self, timeout: Optional[float] = None) -> bool:
+        # the queue only: streaks still held stay open, so reading the log does not end them
+        if not self.buffered or self._thread is None:
+            return True
+        with self._cv:
+            target = self._queued
+            self._flush_now = True
+            self._cv.notify_all()
+            return self._cv.wait_for(lambda: self._written >= target or not self._thread.is_alive(), timeout)
+
+    def close(self) -> None:
+        self._drain_streaks()
+        with self._cv:
+            if self._closed:
+                return
+            self._closed = True
+            self._cv.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+        gz = self._gz_thread
+        if gz is not None:
+            gz.join()
+        with self._io_lock:
+            if self._events is not None:
+                self._events.close()
+                self._events = None
+        atexit.unregister(self.close)
 
+    def _write_lines(self, lines: List[str], f: Optional[TextIO] = None,
+                     records: Optional[List[Dict[str, Any]]] = None) -> Optional[TextIO]:
+        """Append lines (rotating first if due). Returns `f`, or None once it was closed by a rotation."""
+        text = "".join(line + "\n" for line in lines)
+        with self._io_lock:
+            try:
+                if self._rotation_due(len(text.encode("utf-8"))):
+                    if f is not None:
+                        f.close()
+                        f = None
+                    self._rotate()
+                if f is not None:
+                    f.write(text)
+                    f.flush()
+                else:
+                    with open(self.file_path, "a", encoding="utf-8") as out:
+                        out.write(text)
+                if records:
+                    if self._events is None:
+                        self._events = EventWriter(self.events_path, self.index_every, self._events_last_t)
+                    self._events.append(records)
+            except Exception as e:
+                # do not crash UI
+                self.last_error = e
+            return f
+
+    def query(self, start: TimeArg = None, end: TimeArg = None, category: Optional[str] = None,
+              level: Optional[str] = None, actuator: Optional[str] = None, anomaly: Optional[str] = None,
+              limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Structured events in [start, end] matching the filters, oldest first ([] unless structured)."""
+        self._wait_written(timeout=1.0)
+        with self._io_lock:
+            paths = segments(self.events_path) + [self.events_path]
+            return log_events.query(paths, start, end, category, level, actuator, anomaly, limit)
+
+    # ---------------- rotation ----------------
+    def _today(self) -> dt.date:
+        if self.rotate_day == "sim" and self.clock is not None:
+            return self.clock().date()
+        return dt.date.today()
+
+    def _rotation_due(self, nbytes: int) -> bool:
         try:
-            with open(self.file_path, "a", encoding="utf-8") as f:
-                f.write(line + "\n")
-        except Exception:
-            # do not crash UI
-            pass
+            size = os.path.getsize(self.file_path)
+        except OSError:
+            size = 0
+        if self.rotate_day:
+            today = self._today()
+            if self._seg_day is None:
+                self._seg_day = today
+                if size and self.rotate_day == "wall":
+                    # an existing file belongs to the day it was last written
+                    self._seg_day = dt.date.fromtimestamp(os.path.getmtime(self.file_path))
+            if today != self._seg_day:
+                self._seg_day = today
+                return size > 0
+        return bool(self.rotate_bytes) and size > 0 and size + nbytes > self.rotate_bytes
+
+    def _rotate(self) -> None:
+        # microseconds: names only ever increase, even after pruning freed an older one
+        stamp = dt.datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+        dest, i = f"{self.file_path}.{stamp}", 0
+        while os.path.exists(dest) or os.path.exists(dest + ".gz"):
+            i += 1
+            dest = f"{self.file_path}.{stamp}-{i}"
+        os.replace(self.file_path, dest)
+        self._rotate_events(dest[len(self.file_path):])
+        self.rotations += 1
+        with self._gz_lock:
+            self._gz_pending = True
+            if self._gz_thread is None:
+                self._gz_thread = threading.Thread(target=self._compress_segments, name="log-gzip", daemon=True)
+                self._gz_thread.start()
+
+    def _rotate_events(self, suffix: str) -> None:
+        # called with the io lock held, right after the text log was moved aside
+        if self._events is not None:
+            self._events_last_t = self._events.last_t
+            self._events.close()
+            self._events = None
+        if os.path.exists(self.events_path):
+            os.replace(self.events_path, self.events_path + suffix)
+            if os.path.exists(self.events_path + ".idx"):
+                os.replace(self.events_path + ".idx", self.events_path + suffix + ".idx")
+
+    def _compress_segments(self) -> None:
+        # gzip every plain segment (also ones left by an earlier run), then prune; again while rotations came in
+        while True:
+            with self._gz_lock:
+                if not self._gz_pending:
+                    self._gz_thread = None
+                    return
+                self._gz_pending = False
+            try:
+                for path in segments(self.file_path):
+                    if self.compress and not path.endswith(".gz"):
+                        with open(path, "rb") as src, gzip.open(path + ".gz.part", "wb") as dst:
+                            shutil.copyfileobj(src, dst)
+                        os.replace(path + ".gz.part", path + ".gz")
+                        os.remove(path)
+                old = segments(self.file_path)
+                for path in old[:-self.keep] if self.keep else old:
+                    os.remove(path)
+                old = segments(self.events_path)
+                for path in old[:-self.keep] if self.keep else old:
+                    os.remove(path)
+                    if os.path.exists(path + ".idx"):
+                        os.remove(path + ".idx")
+            except Exception as e:
+                self.last_error = e
+
+    def _take(self) -> Tuple[List[str], List[Dict[str, Any]], bool]:
+        # called with the lock held: everything queued, plus what overflowed, as lines (and records)
+        lines = [line for line, _ in self._q]
+        records = [rec for _, rec in self._q if rec is not None]
+        self._q.clear()
+        for msg, (n, first, last, fields) in self._repeats.items():
+            lines.append(f"[{first}] {msg}" if n == 1 else f"[{first}] {msg} (x{n}, last at {last})")
+            if self.structured:
+                records.append(self._record(msg, last, fields if n == 1 else dict(fields, repeat=n, first=first)))
+        self._repeats = {}
+        if self.dropped > self._dropped_reported:
+            ts = dt.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            msg = f"... {self.dropped - self._dropped_reported} log lines dropped (queue full)"
+            lines.append(f"[{ts}] {msg}")
+            if self.structured:
+                records.append(self._record(msg, ts, {"level": "warning", "category": "log"}))
+            self._dropped_reported = self.dropped
+        return lines, records, self._closed
+
+    def _run(self) -> None:
+        f: Optional[TextIO] = None
+        closed = False
+        while not closed:
+            with self._cv:
+                self._cv.wait_for(lambda: self._q or self._repeats or self._closed)
+                if not self._closed and self.flush_sec:
+                    # collect for up to flush_sec so a burst becomes one write
+                    self._cv.wait_for(
+                        lambda: len(self._q) >= self.queue_max or self._closed or self._flush_now, self.flush_sec
+                    )
+                self._flush_now = False
+                taken = len(self._q)
+                lines, records, closed = self._take()
+                # the queue has room again: wake producers blocked by the "block" policy
+                self._cv.notify_all()
+            if lines:
+                if f is None:
+                    try:
+                        f = open(self.file_path, "a", encoding="utf-8")
+                    except Exception as e:
+                        self.last_error = e
+                f = self._write_lines(lines, f, records)
+            with self._cv:
+                self._written += taken
+                self._cv.notify_all()
+        if f is not None:
+            f.close()
 
     def tail(self, n: int = 200) -> str:
         # prefer file tail if possible
+        self._wait_written(timeout=1.0)
         try:
-            with open(self.file_path, "r", encoding="utf-8") as f:
-                lines = f.readlines()
-            return "".join(lines[-n:])
+            with self._io_lock:
+                lines = tail_lines(self.file_path, n) if os.path.exists(self.file_path) else []
+                # not enough in the current file: read on into the rotated segments, newest first
+                for path in reversed(segments(self.file_path) if len(lines) < n else []):
+                    lines = _segment_tail(path, n - len(lines)) + lines
+                    if len(lines) >= n:
+                        break
+            return "".join(lines)
         except Exception:
-            return "\n".join(self._buffer[-n:])
+            with self._buffer_lock:
+                return "\n".join(line for _, line, _ in list(self._buffer)[-n:])
+
+    def since(self, seq: int = 0, min_level: Optional[str] = None,
+              category: Optional[str] = None) -> Tuple[int, int, List[str]]:
+        """
+        Lines logged after `seq` (from memory, oldest first), only those at min_level
+        or above and of `category` when given. Returns (newest seq, lines that fell
+        out of memory before they were read, lines). Lines read back from the file at
+        start have no level / category and only pass when no filter is set.
+        """
+        floor = LEVELS.index(min_level) if min_level is not None else 0
+        with self._buffer_lock:
+            last = self._seq
+            if not self._buffer or last <= seq:
+                return last, 0, []
+            skipped = max(0, self._buffer[0][0] - seq - 1)
+            # seqs in the buffer are consecutive: the new entries are the last (last - seq)
+            new = list(islice(reversed(self._buffer), last - seq))
+        new.reverse()
+        out = []
+        for _, line, fields in new:
+            if (min_level is not None or category is not None) and not fields:
+                continue
+            if min_level is not None and LEVELS.index(fields["level"]) < floor:
+                continue
+            if category is not None and fields["category"] != category:
+                continue
+            out.append(line)
+        return last, skipped, out
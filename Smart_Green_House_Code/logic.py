@@ -46,6 +46,18 @@ class GreenhouseLogic:
     def is_night(now: dt.datetime) -> bool:
         return now.hour >= 20 or now.hour < 6
 
+    @staticmethod
+    def targets_for(plant: Dict[str, float], now: dt.datetime) -> Dict[str, float]:
+        """compute() targets for a PLANTS entry at `now` (day / night temperature)."""
+        night = GreenhouseLogic.is_night(now)
+        t_target = plant["temp_night"] if night else plant["temp_day"]
+        return {
+            "temp_target": float(t_target),
+            "hum_target": float(plant["hum"]),
+            "light_min": float(plant["light_min"]),
+            "soil_min": float(plant["soil_min"]),
+        }
+
     def _min_on_ok(self, key: str, now: dt.datetime, min_sec: int) -> bool:
         started = self._on_since.get(key)
         if started is None:
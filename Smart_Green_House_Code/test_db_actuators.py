@@ -0,0 +1,78 @@
+# test_db_actuators.py
+from __future__ import annotations
+
+import datetime as dt
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from database import DatabaseManager, to_epoch
+
+START = dt.datetime(2026, 1, 1)
+TICK = dt.timedelta(minutes=15)
+
+
+class ActuatorIntervals(unittest.TestCase):
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self._dir.name, "greenhouse.db")
+        self.db = self._open()
+
+    def tearDown(self):
+        self.db.close()
+        self._dir.cleanup()
+
+    def _open(self) -> DatabaseManager:
+        return DatabaseManager(self.path, housekeeping=False)
+
+    def _run(self, n: int, on_ticks) -> None:
+        for i in range(n):
+            self.db.record_actuators({"Heating": i in on_ticks}, ts=START + i * TICK)
+
+    def _intervals(self):
+        with sqlite3.connect(self.path) as conn:
+            return conn.execute("SELECT on_t, off_t FROM actuator_interval ORDER BY on_t").fetchall()
+
+    def test_duty_cycle_and_switches(self):
+        self._run(100, set(range(0, 50)) | set(range(60, 100)))
+        end = START + 100 * TICK
+        self.assertAlmostEqual(self.db.actuator_duty_cycle("Heating", START, end), 0.9)
+        self.assertEqual(self.db.actuator_switches_per_day("Heating", START, end), [(START.date(), 2)])
+        self.assertTrue(self.db.actuator_state_at("Heating", START + 49 * TICK))
+        self.assertFalse(self.db.actuator_state_at("Heating", START + 50 * TICK))
+
+    def test_restart_rewinds_the_clock(self):
+        # the GUI's sim clock starts over on every launch
+        self._run(100, set(range(0, 50)) | set(range(60, 100)))
+        self.db.close()
+        self.db = self._open()
+        self._run(100, set(range(20, 30)) | set(range(70, 80)))
+        end = START + 100 * TICK
+        self.assertAlmostEqual(self.db.actuator_duty_cycle("Heating", START, end), 0.2)
+        self.assertEqual(self.db.actuator_switches_per_day("Heating", START, end), [(START.date(), 2)])
+        self.assertFalse(self.db.actuator_state_at("Heating", START + 5 * TICK))
+        self.assertTrue(self.db.actuator_state_at("Heating", START + 75 * TICK))
+        ivs = self._intervals()
+        self.assertTrue(all(a[1] is not None and a[1] <= b[0] for a, b in zip(ivs, ivs[1:])), ivs)
+
+    def test_restart_with_an_open_interval(self):
+        self._run(10, set(range(5, 10)))
+        self.db.close()
+        self.db = self._open()
+        # back to before it started: nothing of it is left, no zero-length stub
+        self._run(5, {2, 3})
+        self.assertEqual(self._intervals(), [(to_epoch(START + 2 * TICK), to_epoch(START + 4 * TICK))])
+
+    def test_rewind_into_an_open_interval(self):
+        self._run(10, set(range(5, 10)))
+        self.db.close()
+        self.db = self._open()
+        # still on where this run starts: the interval keeps its start
+        for i in range(8, 12):
+            self.db.record_actuators({"Heating": i < 11}, ts=START + i * TICK)
+        self.assertEqual(self._intervals(), [(to_epoch(START + 5 * TICK), to_epoch(START + 11 * TICK))])
+
+
+if __name__ == "__main__":
+    unittest.main()
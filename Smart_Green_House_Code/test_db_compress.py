@@ -0,0 +1,114 @@
+# test_db_compress.py
+from __future__ import annotations
+
+import datetime as dt
+import math
+import os
+import tempfile
+import unittest
+from bisect import bisect_right
+
+from config import COMPRESSION, COMPRESSION_MAX_GAP_SEC
+from database import DatabaseManager, SENSOR_NAMES
+from db_compress import SwingingDoor
+
+START = dt.datetime(2026, 1, 1)
+TICK = dt.timedelta(minutes=15)
+
+
+def _signal(i: int):
+    # (temp, humidity, light, rain, soil) at tick i: slow sines plus a rain step
+    return (
+        20.0 + 5.0 * math.sin(i / 30.0),
+        60.0 + 10.0 * math.sin(i / 40.0),
+        300.0 + 200.0 * math.sin(i / 48.0),
+        1.0 if 200 <= i < 260 else 0.0,
+        40.0 + 3.0 * math.sin(i / 90.0),
+    )
+
+
+def _tolerance(name: str) -> float:
+    deadband, deviation = COMPRESSION[name]
+    return deadband + deviation + 1e-9
+
+
+class SwingingDoorBound(unittest.TestCase):
+    def test_interpolation_stays_within_tolerance(self):
+        door = SwingingDoor(0.2, 0.5, max_gap=COMPRESSION_MAX_GAP_SEC)
+        ts = [900 * i for i in range(3000)]
+        vs = [60.0 + 10.0 * math.sin(i / 40.0) for i in range(3000)]
+        kept = [p for t, v in zip(ts, vs) for p in door.push(t, v)] + door.flush()
+        self.assertLess(len(kept), len(ts) // 4)
+        kt = [t for t, _ in kept]
+        for t, v in zip(ts, vs):
+            i = bisect_right(kt, t)
+            if kt[i - 1] == t:
+                got = kept[i - 1][1]
+            else:
+                (ta, va), (tb, vb) = kept[i - 1], kept[i]
+                got = va + (vb - va) * (t - ta) / (tb - ta)
+            self.assertLessEqual(abs(got - v), 0.7 + 1e-9)
+
+    def test_max_gap_keeps_flat_signal(self):
+        door = SwingingDoor(0.1, 0.1, max_gap=3600)
+        kept = [p for i in range(1, 25) for p in door.push(600 * i, 5.0)]
+        self.assertEqual([t for t, _ in kept], [600, 4200, 7800, 11400])
+
+
+class CompressedReads(unittest.TestCase):
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self._dir.name, "greenhouse.db")
+        self.db = self._open()
+
+    def tearDown(self):
+        self.db.close()
+        self._dir.cleanup()
+
+    def _open(self) -> DatabaseManager:
+        return DatabaseManager(self.path, housekeeping=False, compress=True)
+
+    def _write(self, n: int, values=_signal):
+        for i in range(n):
+            self.db.insert_reading(*values(i), ts=START + i * TICK)
+
+    def _check_within_tolerance(self, n: int):
+        rows = self.db.fetch_all()
+        self.assertLess(len(rows), n)
+        for row in rows:
+            i = int((row[0] - START) / TICK)
+            for name, got, want in zip(SENSOR_NAMES, row[1:], _signal(i)):
+                self.assertLessEqual(abs(got - want), _tolerance(name), (row[0], name))
+        return rows
+
+    def test_reads_within_tolerance(self):
+        self._write(2000)
+        self._check_within_tolerance(2000)
+        # again from SQLite alone, and after a restart
+        self.db.hot.invalidate()
+        self._check_within_tolerance(2000)
+        self.db.close()
+        self.db = self._open()
+        self._check_within_tolerance(2000)
+
+    def test_newest_sample_is_read_before_it_is_stored(self):
+        self._write(50, lambda i: (20.0 + 0.1 * i, 50.0, 100.0, 0.0, 30.0))
+        newest = START + 49 * TICK
+        self.db.hot.invalidate()
+        self.assertEqual(self.db.fetch_all()[-1][:2], (newest, 20.0 + 0.1 * 49))
+        self.assertEqual(self.db.fetch_last_n(1)[0][0], newest)
+        cols = self.db.fetch_columns(["temp"])
+        self.assertAlmostEqual(float(cols["temp"][-1]), 20.0 + 0.1 * 49)
+
+    def test_rewrite_after_clock_went_back(self):
+        self._write(40, lambda i: (25.0 if i % 2 else 35.0,) * 3 + (0.0, 30.0))
+        self._write(40, lambda i: (10.0,) * 3 + (0.0, 30.0))
+        self.assertEqual({row[1] for row in self.db.fetch_all()}, {10.0})
+        self.db.close()
+        self.db = self._open()
+        self.assertEqual({row[1] for row in self.db.fetch_all()}, {10.0})
+        self.assertEqual(self.db.fetch_last_n(1)[0][0], START + 39 * TICK)
+
+
+if __name__ == "__main__":
+    unittest.main()
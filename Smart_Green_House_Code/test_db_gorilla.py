@@ -0,0 +1,58 @@
+# test_db_gorilla.py
+from __future__ import annotations
+
+import math
+import random
+import struct
+import unittest
+
+import db_gorilla
+
+
+def _bits(vs):
+    # compare floats bit for bit (-0.0, NaN)
+    return [struct.pack(">d", v) for v in vs]
+
+
+class GorillaRoundTrip(unittest.TestCase):
+    def assert_round_trip(self, ts, vs):
+        out_ts, out_vs = db_gorilla.decode(db_gorilla.encode(ts, vs))
+        self.assertEqual(out_ts, list(ts))
+        self.assertEqual(_bits(out_vs), _bits(vs))
+
+    def test_empty_and_single(self):
+        self.assert_round_trip([], [])
+        self.assert_round_trip([1767225600], [21.5])
+
+    def test_fixed_tick_flat_signal_is_small(self):
+        ts = [1767225600 + 900 * i for i in range(1024)]
+        vs = [22.0] * 1024
+        self.assert_round_trip(ts, vs)
+        # after the header: one bit for the timestamp and one for the value per point
+        self.assertLess(len(db_gorilla.encode(ts, vs)), 20 + 1024 * 2 // 8 + 8)
+
+    def test_every_delta_of_delta_bucket(self):
+        deltas = [60, 60, 61, 0, 100, -50, 300, 255, 2000, -1500, 10 ** 9, 1, 10 ** 12]
+        ts, t = [], -10 ** 6
+        for d in deltas:
+            t += abs(d) + 1
+            ts.append(t)
+        self.assert_round_trip(ts, [float(i) for i in range(len(ts))])
+
+    def test_special_values(self):
+        vs = [0.0, -0.0, 1e-300, -1e300, math.inf, -math.inf, math.nan, 5e-324, 22.25, 22.25]
+        self.assert_round_trip(list(range(len(vs))), vs)
+
+    def test_random_walk(self):
+        rng = random.Random(7)
+        ts, vs, t, v = [], [], 1767225600, 20.0
+        for _ in range(5000):
+            t += rng.choice([60, 60, 60, 900, 1, 3600])
+            v = round(v + rng.uniform(-0.5, 0.5), rng.choice([1, 2, 6]))
+            ts.append(t)
+            vs.append(v)
+        self.assert_round_trip(ts, vs)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,43 @@
+# test_db_hot.py
+from __future__ import annotations
+
+import unittest
+
+from db_hot import HotTier
+
+
+def _rows(ts, v=1.0):
+    return [(t, v) for t in ts]
+
+
+class HotTierRewind(unittest.TestCase):
+    def setUp(self):
+        self.hot = HotTier(8, 1)
+        self.hot.load(_rows(range(0, 50, 10)), complete=True)
+
+    def test_rewind_keeps_the_older_rows(self):
+        self.hot.truncate(20)
+        self.hot.append(_rows([20, 25], 2.0))
+        self.assertTrue(self.hot.valid)
+        self.assertEqual(self.hot.last(4), [(0, 1.0), (10, 1.0), (20, 2.0), (25, 2.0)])
+        self.assertEqual(self.hot.view(0, 100), ([(0, 1.0), (10, 1.0), (20, 2.0), (25, 2.0)], None))
+
+    def test_rewound_span_is_read_from_disk(self):
+        # not truncated: the old rows from 20 to 40 may still be stored
+        self.hot.append(_rows([20, 25], 2.0))
+        self.assertTrue(self.hot.valid)
+        self.assertEqual(self.hot.view(0, 15), ([(0, 1.0), (10, 1.0)], None))
+        self.assertIsNone(self.hot.view(0, 20))
+        self.assertIsNone(self.hot.column_view(30, 40))
+        self.assertIsNone(self.hot.last(1))
+        self.hot.append(_rows(range(50, 100, 10), 3.0))
+        self.assertEqual(self.hot.view(50, 60)[0], [(50, 3.0), (60, 3.0)])
+        self.assertIsNone(self.hot.last(7))
+        # the rewritten span has left the buffer
+        self.hot.append(_rows([100, 110, 120], 3.0))
+        self.assertEqual(self.hot.last(8)[0], (50, 3.0))
+        self.assertFalse(self.hot.complete)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+# test_db_rollups.py
+from __future__ import annotations
+
+import datetime as dt
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from database import DatabaseManager, to_epoch
+
+START = dt.datetime(2026, 1, 1)
+
+
+class RollupTiers(unittest.TestCase):
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self._dir.name, "greenhouse.db")
+        self.db = DatabaseManager(self.path, housekeeping=False)
+
+    def tearDown(self):
+        self.db.close()
+        self._dir.cleanup()
+
+    def _write(self, n: int, tick: dt.timedelta, first: int = 0):
+        for i in range(first, first + n):
+            self.db.insert_reading(20.0 + i % 7, 50.0, 100.0, 0.0, 30.0, ts=START + i * tick)
+
+    def _tiers(self):
+        with sqlite3.connect(self.path) as conn:
+            return dict(conn.execute("SELECT tier, count(*) FROM rollup GROUP BY tier"))
+
+    def test_no_tier_as_fine_as_the_tick(self):
+        tick = dt.timedelta(minutes=15)
+        self._write(4 * 24 * 3, tick)
+        self.assertEqual(sorted(self._tiers()), [3600, 86400])
+        # spans too short for the hourly tier come from the raw rows
+        tier, rows = self.db.fetch_rollup("temp", start=START, end=START + dt.timedelta(hours=12))
+        self.assertEqual(tier, 0)
+        self.assertEqual(len(rows), 49)
+        self.assertEqual([r[1] for r in rows[:8]], [20.0 + i % 7 for i in range(8)])
+
+    def test_tick_gets_shorter(self):
+        self._write(4 * 24, dt.timedelta(minutes=15))
+        self.db.close()
+        self.db = DatabaseManager(self.path, housekeeping=False)
+        # the restart gap is downtime, not the tick
+        self.assertEqual(sorted(self._tiers()), [3600, 86400])
+        self._write(6 * 60, dt.timedelta(seconds=10), first=6 * 24 * 90)
+        self.assertEqual(sorted(self._tiers()), [60, 900, 3600, 86400])
+        # the finer tiers start with the short tick: before that, the raw rows stand in for them
+        switch = START + 6 * 24 * 90 * dt.timedelta(seconds=10)
+        end = switch + dt.timedelta(minutes=30)
+        tier, rows = self.db.fetch_rollup("temp", start=START, end=end, min_points=100)
+        self.assertEqual(tier, 900)
+        ts = [r[0] for r in rows]
+        self.assertEqual(ts, sorted(set(ts)))
+        self.assertEqual((ts[0], ts[-1]), (START, end))
+        self.assertEqual(ts.index(switch), 4 * 24)
+        self.assertEqual(rows[ts.index(switch)][4], 90)
+        self.assertEqual(rows[-1][4], 90)
+
+    def test_retention_keeps_only_the_coarse_tiers(self):
+        tick = dt.timedelta(seconds=10)
+        self._write(100, tick)
+        may = dt.datetime(2026, 5, 1)
+        self._write(100, tick, first=int((may - START) / tick))
+        self.assertEqual(self.db.apply_retention(2), [202601])
+        with sqlite3.connect(self.path) as conn:
+            first = dict(conn.execute("SELECT tier, min(bucket) FROM rollup GROUP BY tier"))
+        self.assertEqual(first[60], to_epoch(may))
+        self.assertEqual(first[900], to_epoch(may))
+        self.assertEqual(first[3600], to_epoch(START))
+        self.assertEqual(first[86400], to_epoch(START))
+
+
+if __name__ == "__main__":
+    unittest.main()
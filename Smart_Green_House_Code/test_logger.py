@@ -0,0 +1,78 @@
+# test_logger.py
+from __future__ import annotations
+
+import gzip
+import os
+import tempfile
+import unittest
+
+from logger import EventLogger, tail_lines
+
+
+class ReadPaths(unittest.TestCase):
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self._dir.name, "greenhouse.log")
+
+    def tearDown(self):
+        self._dir.cleanup()
+
+    def test_reading_does_not_end_a_streak(self):
+        lg = EventLogger(self.path, buffered=True, coalesce_repeats=True, structured=True,
+                         events_path=self.path + ".events")
+        try:
+            lg.log("start")
+            for _ in range(5):
+                lg.log("pump on")
+            self.assertEqual(lg.tail(10).count("pump on"), 1)
+            self.assertEqual(len(lg.query()), 2)
+            for _ in range(3):
+                lg.log("pump on")
+            lg.log("other")
+            lg.flush()
+            lines = lg.tail(10).splitlines()
+        finally:
+            lg.close()
+        self.assertEqual(len(lines), 4)
+        self.assertIn("repeated x7", lines[2])
+
+
+class Tail(unittest.TestCase):
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self._dir.name, "greenhouse.log")
+
+    def tearDown(self):
+        self._dir.cleanup()
+
+    def _write(self, path: str, lines, opener=open):
+        with opener(path, "wt", encoding="utf-8", newline="") as f:
+            f.writelines(line + "\n" for line in lines)
+
+    def test_multibyte_character_across_blocks(self):
+        lines = [f"{i} soil 31.5 \u00b0C \U0001F331 \u00e9t\u00e9" for i in range(40)]
+        self._write(self.path, lines)
+        # every block size lands the block edge inside one of the characters at some point
+        for block_size in range(1, 24):
+            for n in (1, 3, 17, 40, 50):
+                got = tail_lines(self.path, n, block_size=block_size)
+                self.assertEqual(got, [line + "\n" for line in lines[-n:]], (block_size, n))
+
+    def test_across_segments_and_gzip(self):
+        lines = [f"[2026-01-01 00:{i:02d}:00] pump \u00b0{i} \U0001F331" for i in range(30)]
+        self._write(self.path + ".20260101-000000-000000.gz", lines[:10], gzip.open)
+        self._write(self.path + ".20260101-001000-000000", lines[10:20])
+        self._write(self.path, lines[20:])
+        lg = EventLogger(self.path, buffered=False, compress=False, rotate_day="", keep=10,
+                         structured=False, events_path=self.path + ".events")
+        try:
+            self.assertEqual(lg.tail(5).splitlines(), lines[-5:])
+            self.assertEqual(lg.tail(15).splitlines(), lines[-15:])
+            self.assertEqual(lg.tail(25).splitlines(), lines[-25:])
+            self.assertEqual(lg.tail(100).splitlines(), lines)
+        finally:
+            lg.close()
+
+
+if __name__ == "__main__":
+    unittest.main()